@@ -1,20 +1,78 @@
-from chess.board_model import Board
-from chess.move_generator import MoveGenerator, find_move
-from chess.piece_model import ChessPiece
+import logging
+import re
+from typing import TYPE_CHECKING
+
+from chess.board_model import Board, WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE
+from chess.move_generator import MoveGenerator
+from chess.bitboard_model import BitboardBoard
+from chess.bitboard_generator import BitboardMoveGenerator
+from chess.piece_model import ChessPiece, Pawn, Knight, Bishop, Rook, Queen, King, PAWN, KING
+
+from chess.MoveTypes import Move, MoveType, MoveEffect, UndoRecord
+from chess.move_encoding import (
+    CASTLE, EN_PASSANT, DOUBLE_PAWN, PROMOTION, KIND_PIECES, PIECE_KINDS, SQUARE_MASK, SQUARES_MASK, TO_SHIFT,
+    FLAGS_SHIFT, PROMOTION_SHIFT, MoveList, encode_move, decode_move,
+)
+from chess.transposition import TranspositionTable, ReplacementPolicy
+from chess.position_history import PositionHistory
+from chess.instrumentation import STATS, timed
+
+if TYPE_CHECKING:
+    from chess.tablebase import Tablebases, TablebaseResult
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+FEN_PIECES: dict[str, type[ChessPiece]] = {
+    'p': Pawn, 'n': Knight, 'b': Bishop, 'r': Rook, 'q': Queen, 'k': King
+}
+CASTLING_LETTERS = {WHITE_KINGSIDE: "K", WHITE_QUEENSIDE: "Q", BLACK_KINGSIDE: "k", BLACK_QUEENSIDE: "q"}
+_FEN_RANK = re.compile(r"\d+|[a-zA-Z]")
+_FEN_SQUARE = re.compile(r"([a-z])(\d+)")
+
+logger = logging.getLogger(__name__)
+
+
+def fen_dimensions(fen: str) -> tuple[int, int]:
+    """Width and height of the board a FEN placement describes."""
+    ranks = fen.split()[0].split("/") if fen.strip() else [""]
+    width = sum(int(token) if token.isdigit() else 1 for token in _FEN_RANK.findall(ranks[0]))
+    return width or 8, len(ranks)
 
-from chess.MoveTypes import Move, MoveType, MoveEffect
 
 class GameState:
-    def __init__(self):
-        self.board_model = Board()
-        self.move_generator = MoveGenerator(self.board_model)
-        self.current_turn = "white"
-        self._valid_moves = list()
+    def __init__(self, board_type: type[Board] = Board, cache_size: int = 1 << 14,
+                 cache_policy: ReplacementPolicy = ReplacementPolicy.ALWAYS, width: int = 8, height: int | None = None):
+        self.board_model = board_type(width, height)
+        if isinstance(self.board_model, BitboardBoard):
+            self.move_generator = BitboardMoveGenerator(self.board_model)
+        else:
+            self.move_generator = MoveGenerator(self.board_model)
+        self._legal_moves: MoveList | None = None
+        self.undo_stack: list[UndoRecord] = []
+        self.halfmove_clock = 0  # moves since the last capture or pawn move
+        self.fullmove_number = 1
+        self.history = PositionHistory()
+        self.history.reset(self.board_model.hash)
+        
+        # positions coming back (repetitions, try_move lookahead) reuse earlier results
+        self.move_cache = TranspositionTable(cache_size, cache_policy)
+        self.final_state_cache = TranspositionTable(cache_size, cache_policy)
+    
+    @property
+    def current_turn(self) -> str:
+        return self.board_model.turn
+    
+    @current_turn.setter
+    def current_turn(self, color: str):
+        self.board_model.set_turn(color)
+        self._legal_moves = None
         
     def switch_turn(self):
         """Switch the turn between players."""
+        if self.current_turn == "black":
+            self.fullmove_number += 1
         self.current_turn = "black" if self.current_turn == "white" else "white"
-        print(f"It's now {self.current_turn}'s turn.")
+        self.history.push(self.board_model.hash, irreversible=self.halfmove_clock == 0)
+        logger.debug("%s to move", self.current_turn)
     
     def get_snapshot(self) -> list[list[ChessPiece | None]]:
         """Get the current state of the board."""
@@ -22,45 +80,197 @@ class GameState:
     
     
     def start(self, board) -> Board:
-        """Initialize the game state."""
-        for row in range(8):
-            for col in range(8):
+        """Initialize the game state, the board list must have the dimensions of the board model."""
+        if len(board) != self.board_model.height or len(board[0]) != self.board_model.width:
+            raise ValueError(f"Expected a {self.board_model.width}x{self.board_model.height} board, "
+                             f"got {len(board[0])}x{len(board)}.")
+        for col, row, _ in list(self.board_model.yield_all_pieces()):
+            self.board_model.remove_piece(col, row)
+        for row in range(self.board_model.height):
+            for col in range(self.board_model.width):
                 piece_model = board[row][col]
                 if piece_model is None:
                     continue
                 #data config
                 self.board_model.place_piece(piece_model, col, row)
+        self.board_model.set_castling(self.board_model.castling_rights())
         
-        print(self.board_model)
+        self.current_turn = "white"
+        self.move_generator.en_passant_position = None
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.undo_stack.clear()
+        self._legal_moves = None
+        self.history.reset(self.board_model.hash)
+        logger.debug("starting position\n%s", self.board_model)
         return self.board_model
+
+    def copy(self) -> "GameState":
+        """Independent game state on its own board, for searching away from the one the view uses."""
+        clone = GameState(type(self.board_model), width=self.board_model.width, height=self.board_model.height)
+        for col, row, piece in self.board_model.yield_all_pieces():
+            clone.board_model.place_piece(piece, col, row)
+        clone.board_model.set_castling(self.board_model.castling)
+        clone.current_turn = self.current_turn
+        clone.move_generator.en_passant_position = self.move_generator.en_passant_position
+        clone.halfmove_clock = self.halfmove_clock
+        clone.fullmove_number = self.fullmove_number
+        clone.history = self.history.copy()
+        return clone
+
+    @classmethod
+    def from_fen(cls, fen: str, board_type: type[Board] = Board) -> "GameState":
+        """Game state on a board of the dimensions the FEN placement describes."""
+        width, height = fen_dimensions(fen)
+        game_state = cls(board_type, width=width, height=height)
+        game_state.load_fen(fen)
+        return game_state
+
+    def load_fen(self, fen: str) -> Board:
+        """Set up the position of a FEN string in place of whatever is on the board."""
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"FEN needs at least 4 fields: {fen!r}")
+        placement, turn, castling, en_passant = fields[:4]
+        board = self.board_model
+        ranks = placement.split("/")
+        if len(ranks) != board.height or turn not in ("w", "b"):
+            raise ValueError(f"Invalid FEN: {fen!r}")
+        
+        # every field is read before the board changes, so an invalid FEN leaves the position as it was
+        pieces = []
+        for row, rank in enumerate(ranks):
+            col = 0
+            for token in _FEN_RANK.findall(rank):
+                if token.isdigit():
+                    col += int(token)
+                    continue
+                if token.lower() not in FEN_PIECES or col >= board.width:
+                    raise ValueError(f"Invalid FEN rank {rank!r}")
+                color = "white" if token.isupper() else "black"
+                pieces.append((FEN_PIECES[token.lower()](color), col, row))
+                col += 1
+            if col != board.width:
+                raise ValueError(f"Invalid FEN rank {rank!r}")
+        
+        en_passant_position = None
+        if en_passant != "-":
+            if (square := _FEN_SQUARE.fullmatch(en_passant)) is not None:
+                en_passant_position = (ord(square[1]) - ord("a"), board.height - int(square[2]))
+            if en_passant_position is None or not board.is_on_board(*en_passant_position):
+                raise ValueError(f"Invalid FEN en passant square {en_passant!r}")
+        try:
+            halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+            fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+        except ValueError:
+            raise ValueError(f"Invalid FEN move counters: {fen!r}") from None
+        
+        kings = {color: [(col, row) for piece, col, row in pieces if piece.kind == KING and piece.color == color]
+                 for color in ("white", "black")}
+        if any(len(squares) != 1 for squares in kings.values()):
+            raise ValueError(f"Invalid FEN, each side needs exactly one king: {fen!r}")
+        # the side that just moved cannot have left its king in check
+        scratch = Board(board.width, board.height)
+        for piece, col, row in pieces:
+            scratch.place_piece(piece, col, row)
+        mover, waiting = ("white", "black") if turn == "w" else ("black", "white")
+        if scratch.is_attacked(*kings[waiting][0], mover):
+            raise ValueError(f"Invalid FEN, the side not to move is in check: {fen!r}")
+        
+        for col, row, _ in list(board.yield_all_pieces()):
+            board.remove_piece(col, row)
+        for piece, col, row in pieces:
+            board.place_piece(piece, col, row)
+        
+        rights = sum(right for right, letter in CASTLING_LETTERS.items() if letter in castling)
+        board.set_castling(rights & board.castling_rights())
+        
+        self.current_turn = "white" if turn == "w" else "black"
+        self.move_generator.en_passant_position = en_passant_position
+        self.halfmove_clock = halfmove_clock
+        self.fullmove_number = fullmove_number
+        
+        self.undo_stack.clear()
+        self.history.reset(board.hash)
+        self._legal_moves = None
+        return board
+
+    def to_fen(self) -> str:
+        """FEN string of the current position."""
+        board = self.board_model
+        ranks = []
+        for row in board.board:
+            rank, empty = "", 0
+            for piece in row:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += repr(piece) if piece.color == "white" else repr(piece).lower()
+            ranks.append(rank + str(empty) if empty else rank)
+        
+        castling = "".join(letter for right, letter in CASTLING_LETTERS.items() if board.castling & right) or "-"
+        if board.en_passant is None:
+            en_passant = "-"
+        else:
+            en_passant = f"{chr(board.en_passant[0] + ord('a'))}{board.height - board.en_passant[1]}"
+        return f"{'/'.join(ranks)} {self.current_turn[0]} {castling} {en_passant} {self.halfmove_clock} {self.fullmove_number}"
+
+    def legal_moves(self) -> MoveList:
+        """All legal moves of the side to move, packed, generated once per position."""
+        if self._legal_moves is None:
+            key = self.board_model.position_key()
+            moves = self.move_cache.get(key)
+            STATS.count("legal_moves.cache_hit" if moves is not None else "legal_moves.cache_miss")
+            if moves is None:
+                moves = self.move_generator.legal_moves(self.current_turn)
+                self.move_cache.store(key, moves)
+            self._legal_moves = moves
+        return self._legal_moves
     
-    def generate_moves(self, col:int, row:int):
-        """Get valid moves for a piece at a given position."""
+    def generate_moves(self, col:int, row:int) -> list[Move]:
+        """Get valid moves for a piece at a given position, decoded for the board view."""
         piece = self.board_model.get_piece(col, row)
         if piece is None or piece.color != self.current_turn:
             return []
-        
-        self._valid_moves = self.move_generator.generate_moves(piece, col, row) 
-        #we save the moves, so it can be used when the piece is released
-        
-        return self._valid_moves
+        from_sq = row * self.board_model.width + col
+        return self.move_generator.decode_moves(
+            MoveList.of(move for move in self.legal_moves() if move & SQUARE_MASK == from_sq))
 
-    def evaluate_move(self, from_col:int, from_row:int, to_col:int, to_row:int) -> tuple[Move, MoveEffect]|None:
-        """Check if the piece and move are valid and return the move."""
+    def evaluate_move(self, from_col:int, from_row:int, to_col:int, to_row:int,
+                      promotion: type[ChessPiece] | None = None) -> tuple[Move, MoveEffect]|None:
+        """The legal move and its effect, looked ahead with the promotion piece when one is given."""
         piece = self.board_model.get_piece(from_col, from_row)
         if piece is None or piece.color != self.current_turn:
             return None
         
-        move = find_move(self._valid_moves, to_col, to_row)
-        if move is None:
+        width = self.board_model.width
+        packed = self.legal_moves().find(from_row * width + from_col, to_row * width + to_col)
+        if packed is None:
             return None
+        if promotion is not None and packed >> FLAGS_SHIFT & PROMOTION:
+            kind = PIECE_KINDS[promotion]
+            packed = next((move for move in self.legal_moves()
+                           if move & SQUARES_MASK == packed & SQUARES_MASK and move >> PROMOTION_SHIFT & 7 == kind), None)
+            if packed is None:
+                return None
         
-        move, move_effect = self._create_move_effect(move)
+        decoded = decode_move(packed, self.board_model.board, with_promotion=promotion is not None)
+        move, move_effect = self._create_move_effect(decoded)
 
         return move, move_effect
     
     def _create_move_effect(self, move: Move) -> tuple[Move, MoveEffect]:
         """Create a MoveEffect object based on the given move."""
+        move_effect = self.build_move_effect(move)
+        move, move_effect = self.try_move(move, move_effect)
+        
+        return move, move_effect
+
+    def build_move_effect(self, move: Move) -> MoveEffect:
+        """Translate a move into the board changes it causes, without looking at check."""
         from_pos = (move["from_col"], move["from_row"])
         to_pos = (move["to_col"], move["to_row"])
         moved = [(from_pos, to_pos)]
@@ -80,14 +290,11 @@ class GameState:
             move_effect.double_move = (to_pos)
 
         if MoveType.CASTLE & move_type:
-            if move["to_col"] == 6:  # Kingside
-                move_effect.moved_pieces.append( ( (7, move["from_row"]), (5, move["from_row"]) ) )
-            elif move["to_col"] == 2:  # Queenside
-                move_effect.moved_pieces.append( ( (0, move["from_row"]), (3, move["from_row"]) ) )
-        
-        move, move_effect = self.try_move(move, move_effect)
+            rule = self.board_model.tables.castling_rule(to_pos)
+            if rule is not None:
+                move_effect.moved_pieces.append((rule.rook, rule.rook_to))
         
-        return move, move_effect
+        return move_effect
 
     def update_board(self, move_effect: MoveEffect) -> None:
         """Update the board model based on the move effect."""
@@ -99,31 +306,57 @@ class GameState:
         else:
             self.move_generator.reset_en_passant()
         
+        moved = self.board_model.get_piece(*move_effect.moved_pieces[0][0])
+        if move_effect.captured or moved is not None and moved.kind == PAWN:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        
         for from_pos, to_pos in move_effect.moved_pieces:
             self.board_model.move_piece(*from_pos, *to_pos)
         
+        self._legal_moves = None
         return None
     
     def on_promotion(self, col:int, row:int, piece: ChessPiece):
         """Handle the promotion of a pawn to a new piece."""
         self.board_model.place_piece(piece, col, row)
+        self._legal_moves = None
     
     def is_selectable(self, col:int, row:int) -> bool:
         """Check if the piece at the given position can be selected."""
         piece = self.board_model.get_piece(col, row)
         return piece is not None and piece.color == self.current_turn
     
-    def check_final_state(self, color: str):
-        """Check if the given color is in check, checkmate, or stalemate."""
+    def check_final_state(self, color: str) -> MoveType:
+        """Check, mate, stalemate and the repetition and fifty-move draws of the color, the board part cached."""
+        key = self.board_model.position_key(color)
+        final_state = self.final_state_cache.get(key)
+        STATS.count("final_state.cache_hit" if final_state is not None else "final_state.cache_miss")
+        if final_state is None:
+            final_state = self._evaluate_final_state(color)
+            self.final_state_cache.store(key, final_state)
+        if MoveType.CHECKMATE & final_state:
+            return final_state  # mate on the last move still counts
+        if self.is_threefold_repetition():
+            final_state |= MoveType.REPETITION
+        if self.is_fifty_move_draw():
+            final_state |= MoveType.FIFTY_MOVES
+        return final_state
+    
+    def is_threefold_repetition(self) -> bool:
+        """Whether the current position occurred three times since the last capture or pawn move."""
+        return self.history.repetitions() >= 3
+    
+    def is_fifty_move_draw(self) -> bool:
+        """Whether fifty moves by each side went by without a capture or a pawn move."""
+        return self.halfmove_clock >= 100
+    
+    @timed("final_state")
+    def _evaluate_final_state(self, color: str) -> MoveType:
         in_check = self.move_generator.in_check(color)[0] > 0
-        legal_moves = [
-            move for col, row, piece in self.board_model.yield_all_pieces(color)
-            for move in self.move_generator.generate_moves(piece, col, row)
-        ]
-        print("IN CHECK:", in_check)
-        print("LEGAL MOVES:", len(legal_moves))
-        if len(legal_moves) < 5:
-            print(legal_moves)
+        legal_moves = self.move_generator.legal_moves(color)
+        logger.debug("%s: in check %s, %d legal moves", color, in_check, len(legal_moves))
 
         if not legal_moves:
             return MoveType.CHECKMATE if in_check else MoveType.STALEMATE
@@ -132,23 +365,100 @@ class GameState:
         else:
             return MoveType.NORMAL
     
-    def try_move(self, move: Move, effect: MoveEffect) -> tuple[Move, MoveEffect]:
-        move = move.copy()
-        this_piece = self.board_model.get_piece(move["from_col"], move["from_row"])
-        other_piece = self.board_model.get_piece(move["to_col"], move["to_row"])
-        self.board_model.move_piece(move["from_col"], move["from_row"], move["to_col"], move["to_row"])
+    def probe_tablebase(self, tablebases: "Tablebases | None" = None) -> "TablebaseResult | None":
+        """Exact result for the side to move when an endgame table covers the position, else None."""
+        from chess.tablebase import default_tablebases  # numpy is only needed once tables are used
+        return (tablebases or default_tablebases()).probe(self.board_model)
+    
+    def tablebase_move(self, tablebases: "Tablebases | None" = None) -> int | None:
+        """The perfect move from the endgame tables, None when they do not cover the position."""
+        from chess.tablebase import default_tablebases
+        return (tablebases or default_tablebases()).best_move(self)
+    
+    def make_move(self, move: int) -> UndoRecord:
+        """Play a legal packed move on the board and hand the side to move over, recording how to take it back."""
+        board = self.board_model
+        width = board.width
+        from_row, from_col = divmod(move & SQUARE_MASK, width)
+        to_row, to_col = divmod(move >> TO_SHIFT & SQUARE_MASK, width)
+        flags = move >> FLAGS_SHIFT & 31
+        piece: ChessPiece = board.board[from_row][from_col] #type: ignore
+        
+        undo = UndoRecord(move=move, piece=piece, castling=board.castling,
+                          en_passant=self.move_generator.en_passant_position, turn=self.current_turn,
+                          halfmove_clock=self.halfmove_clock)
         
+        if flags & EN_PASSANT:
+            undo.captured_pos = (to_col, from_row)
+            undo.captured = board.board[from_row][to_col]
+            board.remove_piece(to_col, from_row)
+        elif (captured := board.board[to_row][to_col]) is not None:
+            undo.captured_pos = (to_col, to_row)
+            undo.captured = captured
         
+        board.move_piece(from_col, from_row, to_col, to_row)
+        
+        if flags & CASTLE:
+            rule = board.tables.castling_rule((to_col, to_row))
+            undo.rook_move = (rule.rook, rule.rook_to) #type: ignore
+            board.move_piece(*rule.rook, *rule.rook_to) #type: ignore
+        if flags & PROMOTION and (kind := move >> PROMOTION_SHIFT & 7):
+            undo.promoted = True
+            board.place_piece(KIND_PIECES[kind](piece.color), to_col, to_row)
+        
+        if flags & DOUBLE_PAWN:
+            self.move_generator.set_en_passant(to_col, to_row, self.current_turn)
+        else:
+            self.move_generator.reset_en_passant()
+        
+        self.halfmove_clock = 0 if undo.captured is not None or piece.kind == PAWN else self.halfmove_clock + 1
+        if self.current_turn == "black":
+            self.fullmove_number += 1
+        self.current_turn = "black" if self.current_turn == "white" else "white"
+        self.history.push(board.hash, irreversible=self.halfmove_clock == 0)
+        self.undo_stack.append(undo)
+        return undo
+    
+    def unmake_move(self, undo: UndoRecord | None = None) -> None:
+        """Take back the last move played with make_move."""
+        top = self.undo_stack.pop()
+        if undo is not None and undo is not top:
+            raise ValueError("Moves must be unmade in the reverse order they were made.")
+        undo = top
+        self.history.pop()
+        board = self.board_model
+        from_row, from_col = divmod(undo.move & SQUARE_MASK, board.width)
+        to_row, to_col = divmod(undo.move >> TO_SHIFT & SQUARE_MASK, board.width)
+        
+        if undo.promoted:
+            board.place_piece(undo.piece, to_col, to_row)
+        if undo.rook_move:
+            (rook_col, rook_row), (rook_to_col, _) = undo.rook_move
+            board.move_piece(rook_to_col, rook_row, rook_col, rook_row)
+        board.move_piece(to_col, to_row, from_col, from_row)
+        if undo.captured is not None:
+            board.place_piece(undo.captured, *undo.captured_pos) #type: ignore
+        board.set_castling(undo.castling)
+        
+        self.move_generator.en_passant_position = undo.en_passant
+        self.current_turn = undo.turn
+        self.halfmove_clock = undo.halfmove_clock
+        if undo.turn == "black":
+            self.fullmove_number -= 1
+    
+    def try_move(self, move: Move, effect: MoveEffect) -> tuple[Move, MoveEffect]:
+        move = move.copy()
         other = "black" if self.current_turn == "white" else "white"
-
+        
+        undo = self.make_move(encode_move(move, self.board_model.width))
         move["type"] |= self.check_final_state(other)
+        self.unmake_move(undo)
 
         effect.check = bool(move["type"] & MoveType.CHECK)
         effect.checkmate = bool(move["type"] & MoveType.CHECKMATE)
         effect.stalemate = bool(move["type"] & MoveType.STALEMATE)
-        
-        self.board_model.place_piece(other_piece, move["to_col"], move["to_row"])
-        self.board_model.place_piece(this_piece, move["from_col"], move["from_row"])
+        effect.repetition = bool(move["type"] & MoveType.REPETITION)
+        effect.fifty_moves = bool(move["type"] & MoveType.FIFTY_MOVES)
         
         return move, effect
         
\ No newline at end of file
@@ -15,6 +15,8 @@ class MoveType(Flag):
     CHECK = auto()
     CHECKMATE = auto()
     STALEMATE = auto()
+    REPETITION = auto()  # threefold repetition
+    FIFTY_MOVES = auto()  # fifty-move rule
 
 class Move(TypedDict):
     """represents an input; what the user could do"""
@@ -37,3 +39,19 @@ class MoveEffect:
     check: bool = False
     checkmate: bool = False
     stalemate: bool = False
+    repetition: bool = False
+    fifty_moves: bool = False
+
+@dataclass(slots=True)
+class UndoRecord:
+    """everything make_move changed, so unmake_move can put it back"""
+    move: int  # packed, see chess.move_encoding
+    piece: ChessPiece
+    castling: int  # castling rights of the board before the move
+    captured: ChessPiece | None = None
+    captured_pos: Pos | None = None
+    rook_move: tuple[Pos, Pos] | None = None  # castling rook (from, to)
+    promoted: bool = False
+    en_passant: Pos | None = None
+    turn: str = "white"
+    halfmove_clock: int = 0
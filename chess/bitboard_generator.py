@@ -0,0 +1,412 @@
+from chess.piece_model import ChessPiece, WHITE, BLACK, COLORS, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+from chess.tables import QUEEN_DIRECTIONS, WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE
+from chess.bitboard_model import BitboardBoard, square
+from chess.move_generator import MoveGenerator
+from chess.MoveTypes import Move
+from chess.move_encoding import (
+    CAPTURE, DOUBLE_PAWN, EN_PASSANT, CASTLE, PROMOTION, PROMOTION_KINDS, MoveList,
+    SQUARE_MASK, TO_SHIFT, FLAGS_SHIFT, PROMOTION_SHIFT, KIND_SHIFT,
+)
+from chess.instrumentation import timed
+
+
+def _step_table(steps: list[tuple[int, int]]) -> list[int]:
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        for dx, dy in steps:
+            if 0 <= col + dx < 8 and 0 <= row + dy < 8:
+                mask |= 1 << square(col + dx, row + dy)
+        table.append(mask)
+    return table
+
+
+def _ray_table(dx: int, dy: int) -> list[int]:
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        col, row = col + dx, row + dy
+        while 0 <= col < 8 and 0 <= row < 8:
+            mask |= 1 << square(col, row)
+            col, row = col + dx, row + dy
+        table.append(mask)
+    return table
+
+
+KNIGHT_ATTACKS = _step_table([(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)])
+KING_ATTACKS = _step_table([(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)])
+# squares attacked by a pawn of the given color standing on the square
+PAWN_ATTACKS = (_step_table([(-1, -1), (1, -1)]), _step_table([(-1, 1), (1, 1)]))
+
+# rays running towards higher square indices take the lowest blocker, the others the highest
+ROOK_RAYS = ((_ray_table(1, 0), _ray_table(0, 1)), (_ray_table(-1, 0), _ray_table(0, -1)))
+BISHOP_RAYS = ((_ray_table(1, 1), _ray_table(-1, 1)), (_ray_table(1, -1), _ray_table(-1, -1)))
+
+# castling: (right, color, king from, king to, rook from, rook to, must be empty, must not be attacked)
+CASTLES = (
+    (WHITE_KINGSIDE, WHITE, 60, 62, 63, 61, (61, 62), (61, 62)),
+    (WHITE_QUEENSIDE, WHITE, 60, 58, 56, 59, (57, 58, 59), (59, 58)),
+    (BLACK_KINGSIDE, BLACK, 4, 6, 7, 5, (5, 6), (5, 6)),
+    (BLACK_QUEENSIDE, BLACK, 4, 2, 0, 3, (1, 2, 3), (3, 2)),
+)
+CASTLE_ROOKS = {king_to: (rook_from, rook_to) for _, _, _, king_to, rook_from, rook_to, _, _ in CASTLES}
+# per color: (right, king from, king to, the squares that must be empty as one bitboard, must not be attacked)
+COLOR_CASTLES = tuple(tuple((right, king_from, king_to, sum(1 << sq for sq in empty), safe)
+                            for right, side, king_from, king_to, _, _, empty, safe in CASTLES if side == color)
+                      for color in (WHITE, BLACK))
+
+# rights kept after a move touches the square
+CASTLING_MASK = [15] * 64
+CASTLING_MASK[60] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASK[63] &= ~WHITE_KINGSIDE
+CASTLING_MASK[56] &= ~WHITE_QUEENSIDE
+CASTLING_MASK[4] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_MASK[7] &= ~BLACK_KINGSIDE
+CASTLING_MASK[0] &= ~BLACK_QUEENSIDE
+
+
+def _slider_attacks(sq: int, occupied: int, rays) -> int:
+    attacks = 0
+    for table in rays[0]:
+        ray = table[sq]
+        if blockers := ray & occupied:
+            ray ^= table[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for table in rays[1]:
+        ray = table[sq]
+        if blockers := ray & occupied:
+            ray ^= table[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def _occupancy_tables(rays) -> tuple[list[int], list[dict[int, int]]]:
+    """Per square, the relevant blockers and the slider attacks for every subset of them."""
+    masks, tables = [], []
+    for sq in range(64):
+        mask = 0
+        for table in rays[0]:
+            ray = table[sq]
+            mask |= ray ^ (1 << ray.bit_length() - 1) if ray else 0
+        for table in rays[1]:
+            ray = table[sq]
+            mask |= ray ^ (ray & -ray)
+        attacks = {}
+        subset = 0
+        while True:
+            attacks[subset] = _slider_attacks(sq, subset, rays)
+            subset = (subset - mask) & mask
+            if not subset:
+                break
+        masks.append(mask)
+        tables.append(attacks)
+    return masks, tables
+
+
+ROOK_MASKS, ROOK_TABLES = _occupancy_tables(ROOK_RAYS)
+BISHOP_MASKS, BISHOP_TABLES = _occupancy_tables(BISHOP_RAYS)
+ROOK_LINES = [ROOK_TABLES[sq][0] for sq in range(64)]
+BISHOP_LINES = [BISHOP_TABLES[sq][0] for sq in range(64)]
+
+
+def _between_table() -> list[list[int]]:
+    between = [[0] * 64 for _ in range(64)]
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        for dx, dy in QUEEN_DIRECTIONS:
+            mask = 0
+            to_col, to_row = col + dx, row + dy
+            while 0 <= to_col < 8 and 0 <= to_row < 8:
+                between[sq][square(to_col, to_row)] = mask
+                mask |= 1 << square(to_col, to_row)
+                to_col, to_row = to_col + dx, to_row + dy
+    return between
+
+
+# BETWEEN[a][b]: the squares strictly between two squares on a line, 0 when they share none or touch
+BETWEEN = _between_table()
+FULL = (1 << 64) - 1
+NOT_LEFT_EDGE = FULL ^ sum(1 << square(0, row) for row in range(8))
+NOT_RIGHT_EDGE = FULL ^ sum(1 << square(7, row) for row in range(8))
+LAST_ROWS = sum(1 << sq for sq in range(8)) | sum(1 << sq for sq in range(56, 64))
+# per color: forward step, the row a single push from the start row lands on, captures towards the left and right
+PAWN_STEPS = ((-8, sum(1 << sq for sq in range(40, 48)), -9, -7), (8, sum(1 << sq for sq in range(16, 24)), 7, 9))
+
+
+def rook_attacks(sq: int, occupied: int) -> int:
+    return ROOK_TABLES[sq][occupied & ROOK_MASKS[sq]]
+
+
+def bishop_attacks(sq: int, occupied: int) -> int:
+    return BISHOP_TABLES[sq][occupied & BISHOP_MASKS[sq]]
+
+
+def is_attacked(bitboards: list[int], sq: int, by_color: int, occupied: int) -> bool:
+    """Whether any piece of by_color attacks the square."""
+    base = by_color * 6
+    if PAWN_ATTACKS[by_color ^ 1][sq] & bitboards[base + PAWN]:
+        return True
+    if KNIGHT_ATTACKS[sq] & bitboards[base + KNIGHT]:
+        return True
+    if KING_ATTACKS[sq] & bitboards[base + KING]:
+        return True
+    queens = bitboards[base + QUEEN]
+    if (bishops := bitboards[base + BISHOP] | queens) and BISHOP_TABLES[sq][occupied & BISHOP_MASKS[sq]] & bishops:
+        return True
+    if (rooks := bitboards[base + ROOK] | queens) and ROOK_TABLES[sq][occupied & ROOK_MASKS[sq]] & rooks:
+        return True
+    return False
+
+
+def make_move(bitboards: list[int], move: int, color: int, castling: int) -> tuple[list[int], int, int]:
+    """Copy-make: returns the new bitboards, castling rights and en passant square."""
+    from_sq = move & SQUARE_MASK
+    to_sq = move >> TO_SHIFT & SQUARE_MASK
+    flags = move >> FLAGS_SHIFT & 31
+    base = color * 6
+    to_bit = 1 << to_sq
+    bitboards = bitboards[:]
+    bitboards[base + (move >> KIND_SHIFT & 7)] ^= 1 << from_sq | to_bit
+
+    if flags & CAPTURE:
+        enemy = 6 - base
+        for idx in range(enemy, enemy + 6):
+            if bitboards[idx] & to_bit:
+                bitboards[idx] ^= to_bit
+                break
+    elif flags & EN_PASSANT:
+        bitboards[6 - base + PAWN] ^= 1 << (to_sq + 8 if color == WHITE else to_sq - 8)
+    if flags & PROMOTION:
+        bitboards[base + PAWN] ^= to_bit
+        bitboards[base + (move >> PROMOTION_SHIFT & 7)] |= to_bit
+    elif flags & CASTLE:
+        rook_from, rook_to = CASTLE_ROOKS[to_sq]
+        bitboards[base + ROOK] ^= 1 << rook_from | 1 << rook_to
+
+    castling &= CASTLING_MASK[from_sq] & CASTLING_MASK[to_sq]
+    en_passant = (from_sq + to_sq) // 2 if flags & DOUBLE_PAWN else -1
+    return bitboards, castling, en_passant
+
+
+# the flag and moving kind fields of a packed move, added to from | to << TO_SHIFT when the targets are expanded
+QUIET_BITS = [kind << KIND_SHIFT for kind in range(6)]
+CAPTURE_BITS = [CAPTURE << FLAGS_SHIFT | kind << KIND_SHIFT for kind in range(6)]
+PAWN_QUIET_BITS, PAWN_CAPTURE_BITS = QUIET_BITS[PAWN], CAPTURE_BITS[PAWN]
+PROMOTION_FLAG = PROMOTION << FLAGS_SHIFT
+PROMOTION_KIND_BITS = [kind << PROMOTION_SHIFT for kind in PROMOTION_KINDS]
+DOUBLE_PAWN_BITS = DOUBLE_PAWN << FLAGS_SHIFT | PAWN << KIND_SHIFT
+CASTLE_BITS = CASTLE << FLAGS_SHIFT | KING << KIND_SHIFT
+EN_PASSANT_BITS = EN_PASSANT << FLAGS_SHIFT | PAWN << KIND_SHIFT
+
+
+def checkers_and_pins(bitboards: list[int], color: int, king_sq: int, own: int,
+                      occupied: int) -> tuple[int, dict[int, int]]:
+    """Enemy pieces giving check, and for every pinned own piece the squares it may still move to."""
+    enemy = 6 - color * 6
+    checkers = PAWN_ATTACKS[color][king_sq] & bitboards[enemy + PAWN] | KNIGHT_ATTACKS[king_sq] & bitboards[enemy + KNIGHT]
+    pins = {}
+    queens = bitboards[enemy + QUEEN]
+    between = BETWEEN[king_sq]
+    for sliders in ((bitboards[enemy + ROOK] | queens) & ROOK_LINES[king_sq],
+                    (bitboards[enemy + BISHOP] | queens) & BISHOP_LINES[king_sq]):
+        while sliders:
+            low = sliders & -sliders
+            sliders ^= low
+            line = between[low.bit_length() - 1]
+            blockers = line & occupied
+            if not blockers:
+                checkers |= low
+            elif blockers & own and not blockers & (blockers - 1):
+                pins[blockers.bit_length() - 1] = line | low
+    return checkers, pins
+
+
+def legal_targets(bitboards: list[int], color: int, castling: int, en_passant: int) -> list[tuple[int, int, int, int]]:
+    """Legal moves as (targets, move bits, from square, step) groups; pawn sets start step squares behind the target."""
+    base = color * 6
+    enemy = color ^ 1
+    pawns, knights, bishops, rooks, queens, king = bitboards[base:base + 6]
+    own = pawns | knights | bishops | rooks | queens | king
+    opponent = 0
+    for bb in bitboards[6 - base:12 - base]:
+        opponent |= bb
+    occupied = own | opponent
+    empty = FULL ^ occupied
+    king_sq = king.bit_length() - 1
+    groups: list[tuple[int, int, int, int]] = []
+    append = groups.append
+
+    # the king looks each target up with itself lifted off the board, a checking slider sees through it
+    lifted = occupied ^ king
+    safe = 0
+    targets = KING_ATTACKS[king_sq] & ~own
+    while targets:
+        low = targets & -targets
+        targets ^= low
+        if not is_attacked(bitboards, low.bit_length() - 1, enemy, lifted):
+            safe |= low
+    if captures := safe & opponent:
+        append((captures, CAPTURE_BITS[KING], king_sq, 0))
+    if quiets := safe & empty:
+        append((quiets, QUIET_BITS[KING], king_sq, 0))
+
+    checkers, pins = checkers_and_pins(bitboards, color, king_sq, own, occupied)
+    if checkers & (checkers - 1):
+        return groups  # double check, only the king can move
+    if checkers:
+        # capture the checker or step in between
+        allowed = BETWEEN[king_sq][checkers.bit_length() - 1] | checkers
+    else:
+        allowed = FULL ^ own
+        if castling:
+            for right, king_from, king_to, path, safe_squares in COLOR_CASTLES[color]:
+                if castling & right and not occupied & path:
+                    for sq in safe_squares:
+                        if is_attacked(bitboards, sq, enemy, occupied):
+                            break
+                    else:
+                        append((1 << king_to, CASTLE_BITS, king_from, 0))
+    pinned = 0
+    for sq in pins:
+        pinned |= 1 << sq
+
+    # a pinned knight can never move, pinned sliders stay on the line of their pin
+    for kind, pieces in ((KNIGHT, knights & ~pinned), (BISHOP, bishops), (ROOK, rooks), (QUEEN, queens)):
+        while pieces:
+            low = pieces & -pieces
+            pieces ^= low
+            from_sq = low.bit_length() - 1
+            if kind == KNIGHT:
+                targets = KNIGHT_ATTACKS[from_sq] & allowed
+            elif kind == BISHOP:
+                targets = BISHOP_TABLES[from_sq][occupied & BISHOP_MASKS[from_sq]] & allowed
+            elif kind == ROOK:
+                targets = ROOK_TABLES[from_sq][occupied & ROOK_MASKS[from_sq]] & allowed
+            else:
+                targets = (BISHOP_TABLES[from_sq][occupied & BISHOP_MASKS[from_sq]]
+                           | ROOK_TABLES[from_sq][occupied & ROOK_MASKS[from_sq]]) & allowed
+            if low & pinned:
+                targets &= pins[from_sq]
+            if captures := targets & opponent:
+                append((captures, CAPTURE_BITS[kind], from_sq, 0))
+            if quiets := targets & empty:
+                append((quiets, QUIET_BITS[kind], from_sq, 0))
+
+    # the free pawns move as a set, each pinned one on its own
+    forward, push_row, left, right = PAWN_STEPS[color]
+    free = pawns & ~pinned
+    if color == WHITE:
+        single = free >> 8 & empty
+        double = (single & push_row) >> 8 & empty & allowed
+        left_captures = (free & NOT_LEFT_EDGE) >> 9 & opponent & allowed
+        right_captures = (free & NOT_RIGHT_EDGE) >> 7 & opponent & allowed
+    else:
+        single = free << 8 & empty
+        double = (single & push_row) << 8 & empty & allowed
+        left_captures = (free & NOT_LEFT_EDGE) << 7 & opponent & allowed
+        right_captures = (free & NOT_RIGHT_EDGE) << 9 & opponent & allowed
+    single &= allowed
+    if double:
+        append((double, DOUBLE_PAWN_BITS, 0, 2 * forward))
+    for targets, step, bits in ((single, forward, PAWN_QUIET_BITS), (left_captures, left, PAWN_CAPTURE_BITS),
+                                (right_captures, right, PAWN_CAPTURE_BITS)):
+        if promotions := targets & LAST_ROWS:
+            append((promotions, bits | PROMOTION_FLAG, 0, step))
+            targets ^= promotions
+        if targets:
+            append((targets, bits, 0, step))
+    for from_sq, line in pins.items():
+        if not pawns >> from_sq & 1:
+            continue
+        line &= allowed
+        to_sq = from_sq + forward
+        if empty >> to_sq & 1:
+            if push_row >> to_sq & 1 and (empty & line) >> (to_sq + forward) & 1:
+                append((1 << to_sq + forward, DOUBLE_PAWN_BITS, from_sq, 0))
+            quiets = 1 << to_sq & line
+            append((quiets & ~LAST_ROWS, PAWN_QUIET_BITS, from_sq, 0))
+            append((quiets & LAST_ROWS, PAWN_QUIET_BITS | PROMOTION_FLAG, from_sq, 0))
+        captures = PAWN_ATTACKS[color][from_sq] & opponent & line
+        append((captures & ~LAST_ROWS, PAWN_CAPTURE_BITS, from_sq, 0))
+        append((captures & LAST_ROWS, PAWN_CAPTURE_BITS | PROMOTION_FLAG, from_sq, 0))
+
+    # en passant can uncover the king along the rank of both pawns, it is played out
+    if en_passant >= 0:
+        takers = PAWN_ATTACKS[enemy][en_passant] & pawns
+        while takers:
+            low = takers & -takers
+            takers ^= low
+            from_sq = low.bit_length() - 1
+            after = make_move(bitboards, from_sq | en_passant << TO_SHIFT | EN_PASSANT_BITS, color, castling)[0]
+            after_occupied = 0
+            for bb in after:
+                after_occupied |= bb
+            if not is_attacked(after, king_sq, enemy, after_occupied):
+                append((1 << en_passant, EN_PASSANT_BITS, from_sq, 0))
+    return groups
+
+
+def legal_moves(bitboards: list[int], color: int, castling: int, en_passant: int) -> list[int]:
+    """The legal moves packed, one per target of each group of legal_targets."""
+    moves: list[int] = []
+    append = moves.append
+    for targets, bits, from_sq, step in legal_targets(bitboards, color, castling, en_passant):
+        while targets:
+            low = targets & -targets
+            targets ^= low
+            to_sq = low.bit_length() - 1
+            move = (to_sq - step if step else from_sq) | to_sq << TO_SHIFT | bits
+            if bits & PROMOTION_FLAG:
+                for kind_bits in PROMOTION_KIND_BITS:
+                    append(move | kind_bits)
+            else:
+                append(move)
+    return moves
+
+
+def count_legal_moves(bitboards: list[int], color: int, castling: int, en_passant: int) -> int:
+    """How many legal moves there are, counted off the target sets without packing them."""
+    count = 0
+    for targets, bits, _, _ in legal_targets(bitboards, color, castling, en_passant):
+        count += targets.bit_count() * len(PROMOTION_KINDS) if bits & PROMOTION_FLAG else targets.bit_count()
+    return count
+
+
+def perft(bitboards: list[int], color: int, castling: int, en_passant: int, depth: int) -> int:
+    """Count the leaf nodes of the legal move tree, the last ply by the size of the target sets."""
+    if depth <= 1:
+        return count_legal_moves(bitboards, color, castling, en_passant) if depth == 1 else 1
+    total = 0
+    for move in legal_moves(bitboards, color, castling, en_passant):
+        after, after_castling, after_en_passant = make_move(bitboards, move, color, castling)
+        total += perft(after, color ^ 1, after_castling, after_en_passant, depth - 1)
+    return total
+
+
+class BitboardMoveGenerator(MoveGenerator):
+    """MoveGenerator answering from the bitboards of a BitboardBoard."""
+    def __init__(self, board_state: BitboardBoard):
+        super().__init__(board_state)
+        self.board_state: BitboardBoard = board_state
+
+    def _en_passant_square(self) -> int:
+        if self.en_passant_position is None:
+            return -1
+        return square(*self.en_passant_position)
+
+    @timed("legal_moves")
+    def legal_moves(self, color: str) -> MoveList:
+        """All legal moves of the color as packed integers."""
+        return MoveList.of(legal_moves(self.board_state.bitboards, COLORS[color],
+                                       self.board_state.castling, self._en_passant_square()))
+
+    def generate_moves(self, piece: ChessPiece, col: int, row: int) -> list[Move]:
+        return [move for move in self.generate_all_moves(piece.color)
+                if move["from_col"] == col and move["from_row"] == row]
+
+    def perft(self, color: str, depth: int) -> int:
+        """Count the leaf nodes reachable in depth plies from the current board."""
+        return perft(self.board_state.bitboards, COLORS[color],
+                     self.board_state.castling, self._en_passant_square(), depth)
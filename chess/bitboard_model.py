@@ -0,0 +1,86 @@
+from chess.piece_model import ChessPiece, WHITE, BLACK, COLORS, KING
+from chess.board_model import Board
+
+
+
+def square(col: int, row: int) -> int:
+    return row * 8 + col
+
+
+def bb_index(piece: ChessPiece) -> int:
+    """Index of the bitboard holding the given piece (color * 6 + kind)."""
+    if piece.kind < 0:
+        raise TypeError(f"{type(piece).__name__} can't be stored on a bitboard.")
+    return piece.color_code * 6 + piece.kind
+
+
+def iter_bits(bb: int):
+    """Yield the square index of every set bit, lowest first."""
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+class BitboardBoard(Board):
+    """Board keeping twelve piece bitboards next to the square list, bit 0 is a8 (row * 8 + col)."""
+    def __init__(self, width: int = 8, height: int | None = None):
+        if (width, height or width) != (8, 8):
+            raise ValueError("BitboardBoard only supports 8x8 boards.")
+        self.bitboards = [0] * 12
+        self.occupancy = [0, 0]
+        super().__init__(width, height)
+
+    @property
+    def occupied(self) -> int:
+        return self.occupancy[WHITE] | self.occupancy[BLACK]
+
+    def _set_bit(self, piece: ChessPiece, sq: int):
+        idx = bb_index(piece)
+        self.bitboards[idx] |= 1 << sq
+        self.occupancy[idx // 6] |= 1 << sq
+
+    def _clear_bit(self, piece: ChessPiece, sq: int):
+        idx = bb_index(piece)
+        self.bitboards[idx] &= ~(1 << sq)
+        self.occupancy[idx // 6] &= ~(1 << sq)
+
+    def place_piece(self, piece, col: int, row: int):
+        if not self.is_on_board(col, row):
+            return
+        previous = self.board[row][col]
+        if previous is not None:
+            self._clear_bit(previous, square(col, row))
+        if piece is not None:
+            self._set_bit(piece, square(col, row))
+        super().place_piece(piece, col, row)
+
+    def remove_piece(self, col: int, row: int):
+        if self.is_on_board(col, row) and (piece := self.board[row][col]) is not None:
+            self._clear_bit(piece, square(col, row))
+        super().remove_piece(col, row)
+
+    def move_piece(self, prev_col: int, prev_row: int, next_col: int, next_row: int):
+        if self.is_on_board(prev_col, prev_row) and self.is_on_board(next_col, next_row):
+            piece = self.board[prev_row][prev_col]
+            captured = self.board[next_row][next_col]
+            if captured is not None:
+                self._clear_bit(captured, square(next_col, next_row))
+            if piece is not None:
+                self._clear_bit(piece, square(prev_col, prev_row))
+                self._set_bit(piece, square(next_col, next_row))
+        super().move_piece(prev_col, prev_row, next_col, next_row)
+
+    def find_king_position(self, color) -> tuple[int, int]:
+        kings = self.bitboards[COLORS[color] * 6 + KING]
+        if not kings:
+            raise ValueError(f"No {color} king found on the board.")
+        row, col = divmod((kings & -kings).bit_length() - 1, 8)
+        return col, row
+
+    def yield_all_pieces(self, color: str | None = None):
+        """Yield all pieces of the color on the board."""
+        occupied = self.occupied if color is None else self.occupancy[COLORS[color]]
+        for sq in iter_bits(occupied):
+            row, col = divmod(sq, 8)
+            yield (col, row, self.board[row][col])
@@ -1,25 +1,58 @@
 
-from chess.piece_model import ChessPiece, Pawn, Rook, King
+from chess.piece_model import ChessPiece, PAWN, BISHOP, ROOK, QUEEN, KING
+from chess.zobrist import zobrist_keys
+from chess.move_encoding import MAX_SQUARES
+from chess.tables import (
+    tables_for, mailbox_index, MAILBOX_WIDTH, OFF_BOARD,
+    WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE,
+)
+
+SLIDERS = frozenset((BISHOP, ROOK, QUEEN))
 
 class Board:
-    def __init__(self, size: int = 8):
-        self.size = size
-        self.board: list[list[ChessPiece | None]] = [[None for _ in range(size)] for _ in range(size)]
+    def __init__(self, width: int = 8, height: int | None = None):
+        height = height or width
+        if width * height > MAX_SQUARES:
+            raise ValueError(f"Boards are limited to {MAX_SQUARES} squares, {width}x{height} is too large.")
+        self.width = width
+        self.height = height
+        self.board: list[list[ChessPiece | None]] = [[None for _ in range(width)] for _ in range(height)]
+        self.tables = tables_for(width, height)
+        # pieces of each color by position, so walking the pieces costs their number and not the board size
+        self.pieces: dict[str, dict[tuple[int, int], ChessPiece]] = {"white": {}, "black": {}}
+        
+        self.keys = zobrist_keys(width, height)
+        self.hash = 0  # Zobrist key of the pieces, side to move, castling rights and en passant column
+        self.turn = "white"
+        self.castling = 0
+        self.en_passant: tuple[int, int] | None = None
+        
+        # attack_counts[color][row][col]: how many pieces of the color attack the square
+        self.attack_counts = {color: [[0] * width for _ in range(height)] for color in ("white", "black")}
+        self._attacks: dict[tuple[int, int], tuple[str, tuple[tuple[int, int], ...]]] = {}
+        self._attackers: list[list[set[tuple[int, int]]]] = [[set() for _ in range(width)] for _ in range(height)]
     
     def place_piece(self, piece, col: int, row: int):
-        if 0 <= col < self.size and 0 <= row < self.size:
+        if 0 <= col < self.width and 0 <= row < self.height:
+            affected = self._detach_attacks(((col, row),))
+            previous = self.board[row][col]
+            if previous is not None:
+                self.hash ^= self.keys.piece(previous, col, row)
+                del self.pieces[previous.color][(col, row)]
+            if piece is not None:
+                self.hash ^= self.keys.piece(piece, col, row)
+                self.pieces[piece.color][(col, row)] = piece
             self.board[row][col] = piece
+            self._attach_attacks(affected)
 
     def find_king_position(self, color) -> tuple[int, int]:
-        for row in range(self.size):
-            for col in range(self.size):
-                piece = self.get_piece(col, row)
-                if isinstance(piece, King) and piece.color == color:
-                    return col, row
+        for position, piece in self.pieces[color].items():
+            if piece.kind == KING:
+                return position
         raise ValueError(f"No {color} king found on the board.")
     
     def is_on_board(self, col: int, row: int) -> bool:
-        return 0 <= col < self.size and 0 <= row < self.size
+        return 0 <= col < self.width and 0 <= row < self.height
     
     def get_piece(self, col: int, row: int):
         if self.is_on_board(col, row):
@@ -28,31 +61,127 @@ class Board:
     
     def remove_piece(self, col: int, row: int):
         if self.is_on_board(col, row):
+            affected = self._detach_attacks(((col, row),))
+            piece = self.board[row][col]
             self.board[row][col] = None
+            self._attach_attacks(affected)
+            if piece is not None:
+                self.hash ^= self.keys.piece(piece, col, row)
+                del self.pieces[piece.color][(col, row)]
             return
         raise IndexError("Invalid board coordinates")
     
     def move_piece(self, prev_col:int, prev_row:int, next_col:int, next_row:int):
-        if 0 <= prev_col < self.size and 0 <= prev_row < self.size and \
-           0 <= next_col < self.size and 0 <= next_row < self.size:
+        if 0 <= prev_col < self.width and 0 <= prev_row < self.height and \
+           0 <= next_col < self.width and 0 <= next_row < self.height:
+            affected = self._detach_attacks(((prev_col, prev_row), (next_col, next_row)))
             piece = self.get_piece(prev_col, prev_row)
+            captured = self.board[next_row][next_col]
             self.board[next_row][next_col] = piece
             self.board[prev_row][prev_col] = None
+            self._attach_attacks(affected)
+            
+            if captured is not None:
+                self.hash ^= self.keys.piece(captured, next_col, next_row)
+                del self.pieces[captured.color][(next_col, next_row)]
+            if piece is not None:
+                self.hash ^= self.keys.piece(piece, prev_col, prev_row) ^ self.keys.piece(piece, next_col, next_row)
+                pieces = self.pieces[piece.color]
+                del pieces[(prev_col, prev_row)]
+                pieces[(next_col, next_row)] = piece
             
-            if isinstance(piece, (Pawn, King, Rook)):
-                piece.first_move = False
+            if self.castling:
+                masks = self.tables.castling_masks
+                lost = masks.get((prev_col, prev_row), 0) | masks.get((next_col, next_row), 0)
+                if self.castling & lost:
+                    self.set_castling(self.castling & ~lost)
             
             return 
         raise IndexError("Invalid board coordinates")
 
+    def is_attacked(self, col: int, row: int, by_color: str) -> bool:
+        """Whether any piece of by_color attacks the square, a lookup in the incremental attack map."""
+        return self.attack_counts[by_color][row][col] > 0
+
+    def attackers(self, col: int, row: int) -> set[tuple[int, int]]:
+        """Positions of the pieces of either color attacking the square."""
+        return self._attackers[row][col]
+
+    def _attack_squares(self, piece: ChessPiece, col: int, row: int) -> tuple[tuple[int, int], ...]:
+        if piece.kind == PAWN:
+            return self.tables.pawn_attacks[piece.color][row][col]
+        # every other piece attacks exactly the squares it could move to, own pieces included
+        return tuple(piece.get_valid_moves(self, col, row))
+
+    def _detach_attacks(self, squares) -> set[tuple[int, int]]:
+        """Take back the attacks of the pieces on the squares and of every slider reaching them."""
+        affected = set(squares)
+        for col, row in squares:
+            for attacker_col, attacker_row in self._attackers[row][col]:
+                if self.board[attacker_row][attacker_col].kind in SLIDERS:
+                    affected.add((attacker_col, attacker_row))
+        for position in affected:
+            if (entry := self._attacks.pop(position, None)) is not None:
+                color, attacked = entry
+                counts = self.attack_counts[color]
+                for col, row in attacked:
+                    counts[row][col] -= 1
+                    self._attackers[row][col].discard(position)
+        return affected
+
+    def _attach_attacks(self, affected: set[tuple[int, int]]):
+        """Recompute the attacks of the pieces now standing on the affected squares."""
+        for position in affected:
+            col, row = position
+            piece = self.board[row][col]
+            if piece is None:
+                continue
+            attacked = self._attack_squares(piece, col, row)
+            self._attacks[position] = (piece.color, attacked)
+            counts = self.attack_counts[piece.color]
+            for target_col, target_row in attacked:
+                counts[target_row][target_col] += 1
+                self._attackers[target_row][target_col].add(position)
+
+    def castling_rights(self) -> int:
+        """Castling rights the placement allows: a king and rook of the color on their home squares."""
+        rights = 0
+        for rule in self.tables.castling:
+            king = self.board[rule.king[1]][rule.king[0]]
+            rook = self.board[rule.rook[1]][rule.rook[0]]
+            if king is not None and rook is not None and king.kind == KING and rook.kind == ROOK \
+                and king.color == rook.color == rule.color:
+                rights |= rule.right
+        return rights
+
+    def set_castling(self, rights: int):
+        """Replace the castling rights, keeping the hash in step."""
+        self.hash ^= self.keys.castling[self.castling] ^ self.keys.castling[rights]
+        self.castling = rights
+
+    def set_turn(self, color: str):
+        if color != self.turn:
+            self.hash ^= self.keys.black_to_move
+            self.turn = color
+
+    def set_en_passant(self, position: tuple[int, int] | None):
+        if self.en_passant is not None:
+            self.hash ^= self.keys.en_passant[self.en_passant[0]]
+        if position is not None:
+            self.hash ^= self.keys.en_passant[position[0]]
+        self.en_passant = position
+
+    def position_key(self, color: str | None = None) -> int:
+        """Zobrist key of the position with the given side (default: the side on turn) to move."""
+        if color is None or color == self.turn:
+            return self.hash
+        return self.hash ^ self.keys.black_to_move
+
     def yield_all_pieces(self, color: str | None = None):
-        """Yield all pieces of the color on the board."""
-        for row in range(self.size):
-            for col in range(self.size):
-                piece = self.get_piece(col, row)
-                if piece is not None:
-                    if color is None or piece.color == color:
-                        yield (col, row, piece)
+        """Yield all pieces of the color (both colors by default) from the piece lists."""
+        for pieces in (self.pieces.values() if color is None else (self.pieces[color],)):
+            for (col, row), piece in pieces.items():
+                yield (col, row, piece)
 
     def __iter__(self):
         return iter(self.board)
@@ -62,4 +191,37 @@ class Board:
         for row in self:
             formatted_row = " ".join(str(piece) if piece else '.' for piece in row)
             formatted_board += formatted_row + "\n"
-        return formatted_board.strip()
\ No newline at end of file
+        return formatted_board.strip()
+
+
+class MailboxBoard(Board):
+    """Board mirroring its squares into a padded 10x12 list, get_piece and is_on_board are one lookup."""
+    def __init__(self, width: int = 8, height: int | None = None):
+        if (width, height or width) != (8, 8):
+            raise ValueError("MailboxBoard only supports 8x8 boards.")
+        self.cells: list = [OFF_BOARD] * (MAILBOX_WIDTH * 12)
+        for row in range(8):
+            for col in range(8):
+                self.cells[mailbox_index(col, row)] = None
+        super().__init__(width, height)
+
+    def is_on_board(self, col: int, row: int) -> bool:
+        return self.cells[mailbox_index(col, row)] is not OFF_BOARD
+
+    def get_piece(self, col: int, row: int):
+        piece = self.cells[mailbox_index(col, row)]
+        return None if piece is OFF_BOARD else piece
+
+    def place_piece(self, piece, col: int, row: int):
+        super().place_piece(piece, col, row)
+        if self.is_on_board(col, row):
+            self.cells[mailbox_index(col, row)] = piece
+
+    def remove_piece(self, col: int, row: int):
+        super().remove_piece(col, row)
+        self.cells[mailbox_index(col, row)] = None
+
+    def move_piece(self, prev_col: int, prev_row: int, next_col: int, next_row: int):
+        super().move_piece(prev_col, prev_row, next_col, next_row)
+        self.cells[mailbox_index(next_col, next_row)] = self.board[next_row][next_col]
+        self.cells[mailbox_index(prev_col, prev_row)] = None
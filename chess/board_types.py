@@ -0,0 +1,4 @@
+from chess.board_model import Board, MailboxBoard
+from chess.bitboard_model import BitboardBoard
+
+BOARD_TYPES: dict[str, type[Board]] = {"list": Board, "mailbox": MailboxBoard, "bitboard": BitboardBoard}
@@ -1,3 +1,5 @@
+import logging
+
 from PySide6 import QtCore as qtc, QtWidgets as qtw, QtGui as qtg
 
 BOARD_COLORS = [qtg.QColor("#ffd47d"), qtg.QColor("#f2ab1b")]
@@ -8,6 +10,43 @@ PREVIOUS_SQUARE_COLOR = qtg.QColor(102, 153, 153)
 AVAILABLE_OUTLINE = qtg.QPen(qtg.QColor(255, 255, 100), 2)
 AVAILABLE_SQUARE_COLOR = qtg.QColor(255, 255, 100, 40)
 
+WAVE_STAGGER = 100  # ms between the start of two neighbouring diagonals
+WAVE_DURATION = 700  # ms a square takes to fall into place
+WAVE_DROP = 50  # px a square falls from
+
+logger = logging.getLogger(__name__)
+
+
+def wave_progress(elapsed: float, col: int, row: int) -> float:
+    """How far a square is into its fall, from 0 to 1, elapsed milliseconds into the wave."""
+    return min(max((elapsed - WAVE_STAGGER * (row + col)) / WAVE_DURATION, 0.0), 1.0)
+
+
+def wave_animation(length: int, width: int, parent: qtc.QObject) -> qtc.QVariantAnimation:
+    """One animation counting the milliseconds of the whole wave, the boards place every square from it."""
+    total = WAVE_STAGGER * (length + width - 2) + WAVE_DURATION
+    animation = qtc.QVariantAnimation(parent)
+    animation.setStartValue(0.0)
+    animation.setEndValue(float(total))
+    animation.setDuration(total)
+    return animation
+
+
+def paint_square(painter: qtg.QPainter, rect: qtc.QRectF, base_color: qtg.QColor, highlighted: bool, previous: bool):
+    if highlighted:
+        outline = AVAILABLE_OUTLINE
+        color = base_color.lighter(110)
+    else:
+        outline = SQUARE_OUTLINE
+        color = base_color
+        
+    if previous:
+        color = PREVIOUS_SQUARE_COLOR
+    
+    painter.setPen(outline)
+    painter.setBrush(color)
+    painter.drawRect(rect)
+
 class ChessSquare(qtw.QGraphicsObject):
     def __init__(self, square_size: int, color, parent=None):
         super().__init__(parent)
@@ -19,21 +58,7 @@ class ChessSquare(qtw.QGraphicsObject):
         self.rect = qtc.QRectF(0, 0, square_size - 1, square_size - 1) #offset for border
     
     def paint(self, painter: qtg.QPainter, option: qtw.QStyleOptionGraphicsItem, widget: qtw.QWidget | None = None):
-
-        if self.highlighted:
-            outline = AVAILABLE_OUTLINE
-            color = self.base_color.lighter(110)
-        else:
-            outline = SQUARE_OUTLINE
-            color = self.base_color
-            
-        if self.previous:
-            color = PREVIOUS_SQUARE_COLOR
-        
-        
-        painter.setPen(outline)
-        painter.setBrush(color)
-        painter.drawRect(self.rect)
+        paint_square(painter, self.rect, self.base_color, self.highlighted, self.previous)
         
     def boundingRect(self) -> qtc.QRectF:
         return self.rect
@@ -56,6 +81,8 @@ class Chessboard(qtw.QGraphicsObject):
                 self.squares[row].append(square)
                 
         self.prev_square: ChessSquare | None = None
+        self.wave = wave_animation(length, width, self)
+        self.wave.valueChanged.connect(self._wave_step)
         
 
 
@@ -83,45 +110,174 @@ class Chessboard(qtw.QGraphicsObject):
         self.prev_square.previous = True
         self.update()
     
+    def reset(self):
+        """Clear the highlights and the previous move, for a new game."""
+        self.reset_highlight()
+        if self.prev_square:
+            self.prev_square.previous = False
+            self.prev_square = None
+        self.update()
+    
     def play_wave_animation(self):
-        print("play")
-        master_animation = qtc.QParallelAnimationGroup(self)
+        logger.debug("playing the wave animation")
+        self.wave.stop()
+        self._wave_step(0.0)
+        self.wave.start()
+    
+    def _wave_step(self, elapsed: float):
+        for row in range(self.width):
+            for col in range(self.length):
+                progress = wave_progress(elapsed, col, row)
+                square = self.squares[row][col]
+                square.setPos(col * self.square_size, row * self.square_size - WAVE_DROP * (1 - progress))
+                square.setOpacity(progress)
+
+
+class HighlightOverlay(qtw.QGraphicsItem):
+    """Highlighted and previous-move squares drawn over the board, repainting only the squares that change."""
+    def __init__(self, length: int, width: int, square_size: int, parent=None):
+        super().__init__(parent)
+        self.length = length
+        self.width = width
+        self.square_size = square_size
+        self.highlighted: set[tuple[int, int]] = set()
+        self.previous: tuple[int, int] | None = None
+
+    def square_rect(self, col: int, row: int) -> qtc.QRectF:
+        return qtc.QRectF(col * self.square_size, row * self.square_size, self.square_size - 1, self.square_size - 1)
+
+    def _dirty(self, col: int, row: int):
+        # the outline pen reaches a pixel past the square
+        self.update(self.square_rect(col, row).adjusted(-2, -2, 2, 2))
+
+    def highlight(self, col: int, row: int):
+        if (col, row) not in self.highlighted:
+            self.highlighted.add((col, row))
+            self._dirty(col, row)
+
+    def clear(self):
+        for col, row in self.highlighted:
+            self._dirty(col, row)
+        self.highlighted.clear()
+
+    def set_previous(self, col: int, row: int):
+        if self.previous is not None:
+            self._dirty(*self.previous)
+        self.previous = (col, row)
+        self._dirty(col, row)
+
+    def clear_previous(self):
+        if self.previous is not None:
+            self._dirty(*self.previous)
+            self.previous = None
+
+    def boundingRect(self) -> qtc.QRectF:
+        return qtc.QRectF(-1, -1, self.length * self.square_size + 2, self.width * self.square_size + 2)
+
+    def paint(self, painter: qtg.QPainter, option: qtw.QStyleOptionGraphicsItem, widget: qtw.QWidget | None = None):
+        squares = set(self.highlighted)
+        if self.previous is not None:
+            squares.add(self.previous)
+        exposed = option.exposedRect #type: ignore
+        for col, row in squares:
+            rect = self.square_rect(col, row)
+            if not exposed.intersects(rect.adjusted(-2, -2, 2, 2)):
+                continue
+            base_color = BOARD_COLORS[(row + col) % len(BOARD_COLORS)]
+            paint_square(painter, rect, base_color, (col, row) in self.highlighted, (col, row) == self.previous)
+
+
+class PixmapChessboard(qtw.QGraphicsObject):
+    """Chessboard drawn as one cached pixmap, the highlights on an overlay item."""
+    def __init__(self, length: int, width: int, square_size = 50, parent=None):
+        super().__init__(parent)
+        self.length = length
+        self.width = width
+        self.square_size = square_size
         
-        STAGGER_DELAY = 100
-        DURATION = 700
+        self.background = qtw.QGraphicsPixmapItem(self.render_background(), self)
+        self.background.setOffset(-1, -1)
+        self.overlay = HighlightOverlay(length, width, square_size, self)
+        self.overlay.setFlag(qtw.QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
         
+        # milliseconds into the intro wave, None once the squares are in place and the pixmap item shows them
+        self._elapsed: float | None = 0.0
+        self.background.hide()
+        self.wave = wave_animation(length, width, self)
+        self.wave.valueChanged.connect(self._wave_step)
+        self.wave.finished.connect(self._wave_finished)
+
+    def render_background(self) -> qtg.QPixmap:
+        pixmap = qtg.QPixmap(self.length * self.square_size + 2, self.width * self.square_size + 2)
+        pixmap.fill(qtg.QColor(0, 0, 0, 0))
+        painter = qtg.QPainter(pixmap)
+        painter.setRenderHint(qtg.QPainter.RenderHint.Antialiasing)
+        painter.translate(1, 1)
         for row in range(self.width):
             for col in range(self.length):
-                square = self.squares[row][col]
-                
-                delay = STAGGER_DELAY * (row + col)
-                
-                compounded_animation = qtc.QSequentialAnimationGroup(square)
-                compounded_animation.addPause(delay)
-                
-                animation = qtc.QParallelAnimationGroup(square)
-                
-                translate_animation = qtc.QPropertyAnimation(square, b"pos")
-                translate_animation.setDuration(DURATION)
-                translate_animation.setStartValue(square.pos() - qtc.QPointF(0, 50))
-                translate_animation.setEndValue(square.pos())
-                
-                fadein_animation = qtc.QPropertyAnimation(square, b"opacity")
-                fadein_animation.setDuration(DURATION)
-                fadein_animation.setStartValue(0)
-                fadein_animation.setEndValue(1)
-                
-                animation.addAnimation(translate_animation)
-                animation.addAnimation(fadein_animation)
-                compounded_animation.addAnimation(animation)
-                master_animation.addAnimation(compounded_animation)
+                rect = qtc.QRectF(col * self.square_size, row * self.square_size, self.square_size - 1, self.square_size - 1)
+                paint_square(painter, rect, BOARD_COLORS[(row + col) % len(BOARD_COLORS)], False, False)
+        painter.end()
+        return pixmap
 
-        master_animation.start()
+    def boundingRect(self) -> qtc.QRectF:
+        rect = qtc.QRectF(0, 0, self.length * self.square_size + 1, self.width * self.square_size + 1)
+        if self._elapsed is not None:
+            rect.adjust(-1, -WAVE_DROP - 1, 1, 1)
+        return rect
+
+    def paint(self, painter: qtg.QPainter, option: qtw.QStyleOptionGraphicsItem, widget: qtw.QWidget | None = None):
+        if self._elapsed is None:
+            return
+        # while the wave plays, every square is cut from the background pixmap and drawn where it is falling
+        pixmap = self.background.pixmap()
+        size = self.square_size + 1
+        for row in range(self.width):
+            for col in range(self.length):
+                progress = wave_progress(self._elapsed, col, row)
+                if progress <= 0:
+                    continue
+                source = qtc.QRectF(col * self.square_size, row * self.square_size, size, size)
+                painter.setOpacity(progress)
+                painter.drawPixmap(source.translated(-1, -1 - WAVE_DROP * (1 - progress)), pixmap, source)
+
+    def highlight_square(self, col: int, row: int):
+        self.overlay.highlight(col, row)
+
+    def reset_highlight(self):
+        self.overlay.clear()
+    
+    def highlight_previous(self, new_col: int, new_row: int):
+        self.overlay.set_previous(new_col, new_row)
+
+    def reset(self):
+        """Clear the highlights and the previous move, for a new game."""
+        self.overlay.clear()
+        self.overlay.clear_previous()
+
+    def play_wave_animation(self):
+        logger.debug("playing the wave animation")
+        self.wave.stop()
+        if self._elapsed is None:
+            self.prepareGeometryChange()
+            self.background.hide()
+        self._wave_step(0.0)
+        self.wave.start()
+
+    def _wave_step(self, elapsed: float):
+        self._elapsed = elapsed
+        self.update()
+
+    def _wave_finished(self):
+        self.prepareGeometryChange()
+        self._elapsed = None
+        self.background.show()
+        self.update()
 
 if __name__ == "__main__":
     import sys
     app = qtw.QApplication(sys.argv)
-    chessboard = Chessboard(8, 8, 50)
+    chessboard = PixmapChessboard(8, 8, 50) if "--pixmap" in sys.argv else Chessboard(8, 8, 50)
     scene = qtw.QGraphicsScene()
     scene.addItem(chessboard)
     
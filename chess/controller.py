@@ -1,13 +1,21 @@
+import logging
+import time
+
 from PySide6 import QtCore as qtc, QtWidgets as qtw
 
-from board_initializer import BOARD, board_parser
+from board_initializer import BOARD, PIECES, board_parser
 
 from chess.MoveTypes import Move, MoveEffect
-from chess.GameState import GameState
+from chess.GameState import GameState, fen_dimensions
+from chess.instrumentation import STATS, timed
+from chess.piece_model import ChessPiece
 from chess.piece_view import PieceView
 from chess.visual_manager import VisualManager
 
 from features.audio_master import AudioMaster
+from features.computer_player import ComputerPlayer
+
+logger = logging.getLogger(__name__)
 
 class GameController(qtc.QObject):
     """
@@ -16,8 +24,10 @@ class GameController(qtc.QObject):
     """
     second_passed = qtc.Signal()
     moved = qtc.Signal(Move, str)
+    started = qtc.Signal(int, int)  # board width and height
     
-    def __init__(self, scene: qtw.QGraphicsScene, square_size: int = 50):
+    def __init__(self, scene: qtw.QGraphicsScene, square_size: int = 50,
+                 computer_color: str | None = None, think_time: float = 2.0, book_path: str | None = None):
         super().__init__()
 
         
@@ -36,6 +46,17 @@ class GameController(qtc.QObject):
         self.remaining_time.timeout.connect(self.pass_time)
         self.remaining_time.start()
         
+        self.ended = False
+        # the engine answers on its own thread, its moves are played like a drag and drop
+        self.computer: ComputerPlayer | None = None
+        self._computer_promotion: type[ChessPiece] | None = None
+        self._thinking_since = 0.0
+        # bumped on every new game and every ply, a search answering an older token is stale
+        self._ply_token = 0
+        if computer_color is not None:
+            self.computer = ComputerPlayer(computer_color, think_time, book_path, self)
+            self.computer.move_found.connect(self.on_computer_move)
+        
     def pass_time(self):
         self.second_passed.emit()
         self.audio_master.play_tick_effect()
@@ -43,25 +64,69 @@ class GameController(qtc.QObject):
     def send_move_data(self, move: Move):
         self.moved.emit(move, self.game_state.current_turn)
     
-    def start_game(self, board=BOARD):
-        board = board_parser(board)
-        self.game_state.start(board)
+    def start_game(self, board: list[str] | str = BOARD):
+        """Start from a board layout, or from a FEN string when one is given."""
+        if isinstance(board, str):
+            self._resize(*fen_dimensions(board))
+            self.game_state.load_fen(board)
+            board = self.game_state.get_snapshot()
+        else:
+            board = board_parser(board)
+            self._resize(len(board[0]), len(board))
+            self.game_state.start(board)
         self.visual.start(board)
-        print("Game started. White's turn.")
+        self.ended = False
+        self._ply_token += 1
+        self.remaining_time.start()
+        self.started.emit(self.game_state.board_model.width, self.game_state.board_model.height)
+        logger.info("game started, %s to move", self.game_state.current_turn)
+        self._request_computer_move()
+    
+    def _resize(self, width: int, height: int):
+        """Put a fresh game state of the size in place, the board model is built for one geometry."""
+        board = self.game_state.board_model
+        if (board.width, board.height) != (width, height):
+            self.game_state = GameState(type(board), width=width, height=height)
+    
+    def is_computer_turn(self) -> bool:
+        return self.computer is not None and self.game_state.current_turn == self.computer.color
+    
+    def _request_computer_move(self):
+        if self.computer is not None and not self.ended and self.is_computer_turn():
+            self._thinking_since = time.perf_counter()
+            self.computer.think(self.game_state, self._ply_token)
     
     @qtc.Slot(int, int)
     def on_piece_clicked(self, col: int, row: int):
+        if self.is_computer_turn():
+            return
         self.visual.highlight_possible(self.game_state.generate_moves(col, row))
             
     @qtc.Slot(int, int, int, int)
     def on_piece_released(self, from_col: int, from_row: int, to_col: int, to_row: int):
+        if self.is_computer_turn():
+            # pieces stay draggable while the engine thinks, but only its own answer is played
+            self.visual.reset_pos(from_col, from_row)
+            return
+        self._play_move(from_col, from_row, to_col, to_row)
+
+    @timed("controller.move")
+    def _play_move(self, from_col: int, from_row: int, to_col: int, to_row: int):
         self.audio_master.play_place_effect()
 
 
         move_container = self.game_state.evaluate_move(from_col, from_row, to_col, to_row)
+        promotion_piece = None
+        if move_container is not None and (color := move_container[1].promotion):
+            # the piece is chosen before the move is looked ahead, a promotion can mate or stalemate
+            if self._computer_promotion is not None:
+                promotion_piece = self._computer_promotion(color)
+            else:
+                promotion_piece = self.visual.show_promotion_screen(color)
+            move_container = self.game_state.evaluate_move(from_col, from_row, to_col, to_row, type(promotion_piece))
 
         if move_container is None:
-            print("RESETIING!")
+            logger.debug("no legal move from %s to %s, piece put back", (from_col, from_row), (to_col, to_row))
             self.visual.reset_pos(from_col, from_row)
             return
         self.visual.highlight_previous(to_col, to_row)
@@ -69,26 +134,38 @@ class GameController(qtc.QObject):
         move, move_effect = move_container
         
         self.game_state.update_board(move_effect) #update model
-        self._update_turn(move_effect) #update view
+        self._update_turn(move_effect, promotion_piece) #update view
 
         self.send_move_data(move) #update history
 
 
         self.game_state.switch_turn()
-        
+        self._ply_token += 1
+        # the endgame tables call dead draws as soon as the position is reached
+        if not self.ended and (known := self.game_state.probe_tablebase()) is not None and not known.wdl:
+            self.end("draw")
+        self._request_computer_move()
+    
+    @qtc.Slot(int, int, int, int, str, int)
+    def on_computer_move(self, from_col: int, from_row: int, to_col: int, to_row: int, promotion: str, token: int):
+        """Play the engine's move the same way a dropped piece is played, unless it answers an earlier position."""
+        if token != self._ply_token or self.ended or not self.is_computer_turn():
+            return
+        if STATS.enabled:
+            STATS.record("controller.computer_move", time.perf_counter() - self._thinking_since)
+        self._computer_promotion = PIECES.get(promotion)
+        self._play_move(from_col, from_row, to_col, to_row)
+        self._computer_promotion = None
 
-    def _update_turn(self, move_effect: MoveEffect):
+    def _update_turn(self, move_effect: MoveEffect, promotion_piece: ChessPiece | None = None):
         if (target := move_effect.captured):
             self.visual.remove_piece(*target)
         for from_pos, to_pos in move_effect.moved_pieces:
             self.visual.move_piece(*from_pos, *to_pos)
-            if move_effect.promotion:
+            if promotion_piece is not None:
                 self.audio_master.play_promotion_effect()
-                color = move_effect.promotion
-                selected_piece = self.visual.show_promotion_screen(color)
-                
-                self.visual.change_piece(*to_pos, selected_piece)
-                self.game_state.on_promotion(*to_pos, selected_piece)
+                self.visual.change_piece(*to_pos, promotion_piece)
+                self.game_state.on_promotion(*to_pos, promotion_piece)
         if move_effect.checkmate or move_effect.stalemate:
             if move_effect.checkmate:
                 self.audio_master.play_fanfare_effect()
@@ -96,9 +173,16 @@ class GameController(qtc.QObject):
             else:
                 winner = "stalemate"
             self.end(winner)
+        elif move_effect.repetition:
+            self.end("repetition")
+        elif move_effect.fifty_moves:
+            self.end("fifty moves")
 
 
     def end(self, message: str):
+        self.ended = True
         self.remaining_time.stop()
+        if self.computer is not None:
+            self.computer.worker.engine.stop()
         self.visual.show_ending_screen(message)
         
@@ -0,0 +1,279 @@
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable
+
+from chess.GameState import GameState
+from chess.move_encoding import (
+    CAPTURE, EN_PASSANT, PROMOTION, KIND_PIECES, PIECE_KINDS, KEY_MASK,
+    SQUARE_MASK, TO_SHIFT, FLAGS_SHIFT, PROMOTION_SHIFT, KIND_SHIFT,
+)
+from chess.opening_book import OpeningBook
+from chess.piece_model import ChessPiece, Pawn, Knight, Bishop, Rook, Queen, King, WHITE
+from chess.transposition import TranspositionTable, ReplacementPolicy
+
+if TYPE_CHECKING:
+    from chess.tablebase import Tablebases
+
+MATE = 100_000
+INFINITY = 1_000_000
+
+PIECE_VALUES: dict[type[ChessPiece], int] = {Pawn: 100, Knight: 320, Bishop: 330, Rook: 500, Queen: 900, King: 0}
+PROMOTIONS: list[type[ChessPiece]] = [Queen, Knight]  # rook and bishop promotions never beat the queen
+PROMOTION_KINDS = frozenset(PIECE_KINDS[piece] for piece in PROMOTIONS)
+KIND_VALUES = [PIECE_VALUES[piece] for piece in KIND_PIECES]
+
+# piece-square bonuses seen from white (row 0 is the far rank), mirrored for black
+PAWN_TABLE = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [50, 50, 50, 50, 50, 50, 50, 50],
+    [10, 10, 20, 30, 30, 20, 10, 10],
+    [5, 5, 10, 25, 25, 10, 5, 5],
+    [0, 0, 0, 20, 20, 0, 0, 0],
+    [5, -5, -10, 0, 0, -10, -5, 5],
+    [5, 10, 10, -20, -20, 10, 10, 5],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+]
+KNIGHT_TABLE = [
+    [-50, -40, -30, -30, -30, -30, -40, -50],
+    [-40, -20, 0, 0, 0, 0, -20, -40],
+    [-30, 0, 10, 15, 15, 10, 0, -30],
+    [-30, 5, 15, 20, 20, 15, 5, -30],
+    [-30, 0, 15, 20, 20, 15, 0, -30],
+    [-30, 5, 10, 15, 15, 10, 5, -30],
+    [-40, -20, 0, 5, 5, 0, -20, -40],
+    [-50, -40, -30, -30, -30, -30, -40, -50],
+]
+CENTER_TABLE = [[10 - 3 * (abs(2 * col - 7) + abs(2 * row - 7)) // 2 for col in range(8)] for row in range(8)]
+KING_TABLE = [
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-20, -30, -30, -40, -40, -30, -30, -20],
+    [-10, -20, -20, -20, -20, -20, -20, -10],
+    [20, 20, 0, 0, 0, 0, 20, 20],
+    [20, 30, 10, 0, 0, 10, 30, 20],
+]
+PIECE_TABLES: dict[type[ChessPiece], list[list[int]]] = {
+    Pawn: PAWN_TABLE, Knight: KNIGHT_TABLE, Bishop: CENTER_TABLE, Rook: [[0] * 8 for _ in range(8)],
+    Queen: CENTER_TABLE, King: KING_TABLE,
+}
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+@lru_cache(maxsize=None)
+def piece_tables(width: int = 8, height: int = 8) -> dict[type[ChessPiece], list[list[int]]]:
+    """The 8x8 piece-square tables stretched over a width x height board."""
+    if (width, height) == (8, 8):
+        return PIECE_TABLES
+    return {
+        piece_type: [[table[row * 8 // height][col * 8 // width] for col in range(width)] for row in range(height)]
+        for piece_type, table in PIECE_TABLES.items()
+    }
+
+
+@dataclass
+class SearchResult:
+    move: int | None  # packed, see chess.move_encoding
+    score: int
+    depth: int
+    nodes: int
+    elapsed: float
+
+    @property
+    def nps(self) -> int:
+        return int(self.nodes / self.elapsed) if self.elapsed > 0 else 0
+
+
+def move_key(move: int) -> int:
+    """Identity of a move in its position, without the notation suffix."""
+    return move & KEY_MASK
+
+
+class Engine:
+    """Iterative deepening alpha-beta search over GameState.make_move/unmake_move."""
+    def __init__(self, tt_size: int = 1 << 16, book: OpeningBook | None = None,
+                 tablebases: "Tablebases | None" = None):
+        self.tt = TranspositionTable(tt_size, ReplacementPolicy.DEPTH)
+        self.book = book
+        self.tablebases = tablebases
+        self.stop_event = threading.Event()
+        self.nodes = 0
+        self._deadline = float("inf")
+        self._aborted = False
+
+    def stop(self):
+        """Ask a running search to return its best move so far."""
+        self.stop_event.set()
+
+    def evaluate(self, game_state: GameState) -> int:
+        """Material and piece-square score from the point of view of the side to move."""
+        score = 0
+        board = game_state.board_model
+        tables = piece_tables(board.width, board.height)
+        last_row = board.height - 1
+        for col, row, piece in board.yield_all_pieces():
+            piece_type = type(piece)
+            table = tables.get(piece_type)
+            if piece.color_code == WHITE:
+                score += PIECE_VALUES.get(piece_type, 0) + (table[row][col] if table else 0)
+            else:
+                score -= PIECE_VALUES.get(piece_type, 0) + (table[last_row - row][col] if table else 0)
+        return score if game_state.current_turn == "white" else -score
+
+    def ordered_moves(self, game_state: GameState, best: int | None = None, captures_only: bool = False) -> list[int]:
+        """Legal moves, best move first, then captures by MVV-LVA."""
+        board = game_state.board_model.board
+        width = game_state.board_model.width
+        scored = []
+        for move in game_state.move_generator.legal_moves(game_state.current_turn):
+            flags = move >> FLAGS_SHIFT & 31
+            is_capture = flags & (CAPTURE | EN_PASSANT)
+            if flags & PROMOTION:
+                if move >> PROMOTION_SHIFT & 7 not in PROMOTION_KINDS:
+                    continue
+            elif captures_only and not is_capture:
+                continue
+            order = 0
+            if is_capture:
+                to_row, to_col = divmod(move >> TO_SHIFT & SQUARE_MASK, width)
+                victim = board[to_row][to_col]
+                victim_value = PIECE_VALUES.get(type(victim), 100) if victim is not None else 100
+                order = 10 * victim_value - KIND_VALUES[move >> KIND_SHIFT & 7] // 10
+            if flags & PROMOTION:
+                order += KIND_VALUES[move >> PROMOTION_SHIFT & 7]
+            if best is not None and move & KEY_MASK == best:
+                order = INFINITY
+            scored.append((order, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored]
+
+    def search(self, game_state: GameState, time_limit: float | None = None, max_depth: int = 64,
+               on_iteration: Callable[[SearchResult], None] | None = None) -> SearchResult:
+        """Book or tablebase move if known, else iterative deepening until the depth or time runs out."""
+        self.nodes = 0
+        self._aborted = False
+        start = time.perf_counter()
+        if self.book is not None and (book_move := self.book.choose_move(game_state)) is not None:
+            result = SearchResult(book_move, 0, 0, 0, time.perf_counter() - start)
+            if on_iteration is not None:
+                on_iteration(result)
+            return result
+        if self.tablebases is not None and (known := game_state.probe_tablebase(self.tablebases)) is not None:
+            if (table_move := game_state.tablebase_move(self.tablebases)) is not None:
+                score = known.wdl * (MATE - known.dtm) if known.wdl else 0
+                result = SearchResult(table_move, score, known.dtm, 0, time.perf_counter() - start)
+                if on_iteration is not None:
+                    on_iteration(result)
+                return result
+        self._deadline = start + time_limit if time_limit is not None else float("inf")
+
+        result = SearchResult(None, 0, 0, 0, 0.0)
+        for depth in range(1, max_depth + 1):
+            score, move = self._root(game_state, depth)
+            if self._aborted:
+                break
+            result = SearchResult(move, score, depth, self.nodes, time.perf_counter() - start)
+            if on_iteration is not None:
+                on_iteration(result)
+            if move is None or abs(score) >= MATE - max_depth:
+                break  # no legal moves, or a forced mate was found
+
+        if result.move is None:  # not even depth one finished, take any legal move
+            moves = self.ordered_moves(game_state)
+            result.move = moves[0] if moves else None
+        result.nodes = self.nodes
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def _root(self, game_state: GameState, depth: int) -> tuple[int, int | None]:
+        entry = self.tt.get(game_state.board_model.hash)
+        best_key = entry[3] if entry else None
+        alpha, best_move = -INFINITY, None
+        for move in self.ordered_moves(game_state, best_key):
+            game_state.make_move(move)
+            score = -self._negamax(game_state, depth - 1, -INFINITY, -alpha, 1)
+            game_state.unmake_move()
+            if self._aborted:
+                break
+            if score > alpha:
+                alpha, best_move = score, move
+        if best_move is None:
+            return (-MATE if self._in_check(game_state) else 0), None
+        if not self._aborted:
+            self.tt.store(game_state.board_model.hash, (depth, alpha, EXACT, move_key(best_move)), depth)
+        return alpha, best_move
+
+    def _in_check(self, game_state: GameState) -> bool:
+        return game_state.move_generator.in_check(game_state.current_turn)[0] > 0
+
+    def _time_up(self) -> bool:
+        # a stop request is honoured on the next node, the clock is only read every 1024
+        if self.stop_event.is_set() or self.nodes & 1023 == 0 and time.perf_counter() > self._deadline:
+            self._aborted = True
+        return self._aborted
+
+    def _negamax(self, game_state: GameState, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self._time_up():
+            return 0
+        # a position seen before on the way here can be repeated forever, score it as the draw it leads to
+        if game_state.history.repetitions() >= 2 or game_state.is_fifty_move_draw():
+            return 0
+        if depth <= 0:
+            return self._quiescence(game_state, alpha, beta)
+
+        key = game_state.board_model.hash
+        best_key = None
+        if (entry := self.tt.get(key)) is not None:
+            entry_depth, score, bound, best_key = entry
+            if entry_depth >= depth:
+                score = score - ply if score > MATE - 1000 else score + ply if score < -MATE + 1000 else score
+                if bound == EXACT or bound == LOWER and score >= beta or bound == UPPER and score <= alpha:
+                    return score
+
+        original_alpha = alpha
+        best_score, best_move = -INFINITY, None
+        for move in self.ordered_moves(game_state, best_key):
+            game_state.make_move(move)
+            score = -self._negamax(game_state, depth - 1, -beta, -alpha, ply + 1)
+            game_state.unmake_move()
+            if self._aborted:
+                return 0
+            if score > best_score:
+                best_score, best_move = score, move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best_move is None:
+            return -MATE + ply if self._in_check(game_state) else 0
+
+        bound = UPPER if best_score <= original_alpha else LOWER if best_score >= beta else EXACT
+        # mate scores are stored relative to this node, not the root
+        stored = best_score + ply if best_score > MATE - 1000 else best_score - ply if best_score < -MATE + 1000 else best_score
+        self.tt.store(key, (depth, stored, bound, move_key(best_move)), depth)
+        return best_score
+
+    def _quiescence(self, game_state: GameState, alpha: int, beta: int) -> int:
+        """Only follow captures and promotions until the position is quiet."""
+        self.nodes += 1
+        if self._time_up():
+            return 0
+        stand_pat = self.evaluate(game_state)
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        for move in self.ordered_moves(game_state, captures_only=True):
+            game_state.make_move(move)
+            score = -self._quiescence(game_state, -beta, -alpha)
+            game_state.unmake_move()
+            if self._aborted:
+                return 0
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
@@ -0,0 +1,147 @@
+"""
+Switchable instrumentation: counters and timing histograms for the hot paths, and cProfile capture.
+Everything is off by default and costs one attribute check per instrumented call.
+
+Environment variables, read by main.configure():
+    CHESS_LOG=DEBUG          log level of the "chess" loggers (WARNING by default)
+    CHESS_STATS=1            collect counters and timings, logged at exit
+    CHESS_PROFILE=out.prof   profile the whole run with cProfile, written at exit
+
+cProfile only sees the thread that started it: in the GUI the engine searches on a worker
+thread, so a capture started from the main window covers the UI side of a move.
+"""
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import time
+from typing import Callable, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = 24  # powers of two of microseconds, the last one also holds everything slower
+
+
+class Histogram:
+    """Call durations in power of two buckets of microseconds."""
+    def __init__(self):
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, seconds: float):
+        micros = int(seconds * 1_000_000)
+        self.buckets[min(micros.bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound in seconds of the bucket holding the given fraction of the calls."""
+        seen = 0
+        for bucket, calls in enumerate(self.buckets):
+            seen += calls
+            if seen >= fraction * self.count:
+                return (1 << bucket) / 1_000_000
+        return self.maximum
+
+    def summary(self) -> str:
+        if not self.count:
+            return "no calls"
+        mean = self.total / self.count
+        return (f"{self.count} calls, {self.total:.3f}s total, mean {mean * 1e6:.1f}us, "
+                f"p50 <{self.percentile(0.5) * 1e6:.0f}us, p99 <{self.percentile(0.99) * 1e6:.0f}us, "
+                f"max {self.maximum * 1e6:.0f}us")
+
+
+class Stats:
+    def __init__(self):
+        self.enabled = False
+        self.counters: dict[str, int] = {}
+        self.timings: dict[str, Histogram] = {}
+
+    def count(self, name: str, amount: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record(self, name: str, seconds: float):
+        histogram = self.timings.get(name)
+        if histogram is None:
+            histogram = self.timings[name] = Histogram()
+        histogram.add(seconds)
+
+    def reset(self):
+        self.counters.clear()
+        self.timings.clear()
+
+    def report(self) -> str:
+        lines = [f"{name}: {value}" for name, value in sorted(self.counters.items())]
+        lines += [f"{name}: {histogram.summary()}" for name, histogram in sorted(self.timings.items())]
+        return "\n".join(lines) if lines else "no statistics collected"
+
+
+STATS = Stats()
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator recording the duration of every call under name while STATS is enabled."""
+    def decorator(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not STATS.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                STATS.record(name, time.perf_counter() - start)
+        return wrapper #type: ignore
+    return decorator
+
+
+class Profiler:
+    """cProfile capture that can be started and stopped at any time, e.g. from a shortcut."""
+    def __init__(self):
+        self._profile: cProfile.Profile | None = None
+        self.path = "profile.prof"
+
+    @property
+    def running(self) -> bool:
+        return self._profile is not None
+
+    def start(self, path: str | None = None):
+        if self._profile is not None:
+            return
+        self.path = path or self.path
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        logger.info("profiling started, writing to %s when stopped", self.path)
+
+    def stop(self) -> str | None:
+        """Stop capturing, write the profile and log the top functions; returns the path written."""
+        if self._profile is None:
+            return None
+        self._profile.disable()
+        self._profile.dump_stats(self.path)
+        text = io.StringIO()
+        pstats.Stats(self._profile, stream=text).sort_stats("cumulative").print_stats(20)
+        logger.info("profile written to %s\n%s", self.path, text.getvalue())
+        self._profile = None
+        return self.path
+
+    def toggle(self) -> bool:
+        """Start or stop capturing, True when it is now running."""
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+        return self.running
+
+
+PROFILER = Profiler()
+
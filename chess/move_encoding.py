@@ -0,0 +1,156 @@
+"""
+Moves packed into one integer, the form the move generators, GameState and the engine pass around.
+Move dicts (chess.MoveTypes.Move) are only built for the board view and the history, by decode_move.
+
+layout: from (8 bits) | to (8) | flags (5) | promotion kind (3) | moving kind (3) | notation suffix (2)
+Squares are row * width + col, so boards up to 256 squares (16x16) fit.
+A promotion with kind 0 is a pawn move whose piece is still to be chosen.
+"""
+from array import array
+from itertools import islice
+from typing import Iterable, Iterator
+
+from chess.MoveTypes import Move, MoveType
+from chess.piece_model import ChessPiece, Pawn, Knight, Bishop, Rook, Queen, King, KNIGHT, BISHOP, ROOK, QUEEN
+
+CAPTURE, DOUBLE_PAWN, EN_PASSANT, CASTLE, PROMOTION = 1, 2, 4, 8, 16
+KIND_PIECES: tuple[type[ChessPiece], ...] = (Pawn, Knight, Bishop, Rook, Queen, King)
+PIECE_KINDS: dict[type, int] = {piece: piece.kind for piece in KIND_PIECES}
+PROMOTION_KINDS = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+FLAG_TYPES = (
+    (CAPTURE, MoveType.CAPTURE),
+    (DOUBLE_PAWN, MoveType.DOUBLE_PAWN_MOVE),
+    (EN_PASSANT, MoveType.EN_PASSANT),
+    (CASTLE, MoveType.CASTLE),
+    (PROMOTION, MoveType.PROMOTION),
+)
+
+TO_SHIFT, FLAGS_SHIFT, PROMOTION_SHIFT, KIND_SHIFT = 8, 16, 21, 24
+SQUARE_MASK = 255
+MAX_SQUARES = SQUARE_MASK + 1
+
+# what the move did to the opponent, only filled in for moves that were played (history, notation)
+SUFFIX_SHIFT = 27
+CHECK_SUFFIX, CHECKMATE_SUFFIX, DRAW_SUFFIX = 1, 2, 3
+
+KEY_MASK = (1 << KIND_SHIFT) - 1  # from, to, flags and promotion: tells the moves of a position apart
+SQUARES_MASK = (1 << FLAGS_SHIFT) - 1  # from and to
+NULL_MOVE = 0  # square 0 to itself, never legal
+MAX_MOVES = 256  # more than the legal moves of any 8x8 position, the list grows past it on larger boards
+
+
+def pack_move(from_sq: int, to_sq: int, flags: int = 0, promotion: int = 0, kind: int = 0) -> int:
+    return from_sq | to_sq << TO_SHIFT | flags << FLAGS_SHIFT | promotion << PROMOTION_SHIFT | kind << KIND_SHIFT
+
+
+def from_square(move: int) -> int:
+    return move & SQUARE_MASK
+
+
+def to_square(move: int) -> int:
+    return move >> TO_SHIFT & SQUARE_MASK
+
+
+def move_flags(move: int) -> int:
+    return move >> FLAGS_SHIFT & 31
+
+
+def promotion_kind(move: int) -> int:
+    return move >> PROMOTION_SHIFT & 7
+
+
+def moving_kind(move: int) -> int:
+    return move >> KIND_SHIFT & 7
+
+
+def move_type(move: int) -> MoveType:
+    """The MoveType flags of a packed move, without check or game end."""
+    result = MoveType.NORMAL
+    flags = move >> FLAGS_SHIFT & 31
+    for flag, flag_type in FLAG_TYPES:
+        if flags & flag:
+            result |= flag_type
+    return result
+
+
+def encode_move(move: Move, width: int = 8) -> int:
+    """Pack a move dict of a board width squares wide, keeping its check, mate or draw flag as the notation suffix."""
+    flags = 0
+    for flag, flag_type in FLAG_TYPES:
+        if flag_type & move["type"]:
+            flags |= flag
+    if MoveType.CHECKMATE & move["type"]:
+        suffix = CHECKMATE_SUFFIX
+    elif (MoveType.STALEMATE | MoveType.REPETITION | MoveType.FIFTY_MOVES) & move["type"]:
+        suffix = DRAW_SUFFIX
+    elif MoveType.CHECK & move["type"]:
+        suffix = CHECK_SUFFIX
+    else:
+        suffix = 0
+    return pack_move(move["from_row"] * width + move["from_col"], move["to_row"] * width + move["to_col"], flags,
+                     PIECE_KINDS.get(type(move["promotion_piece"]), 0), PIECE_KINDS.get(type(move["piece"]), 0)) \
+        | suffix << SUFFIX_SHIFT
+
+
+def decode_move(move: int, board: list[list[ChessPiece | None]], with_promotion: bool = True) -> Move:
+    """Move dict of a packed move for the UI, the promotion piece left to choose without with_promotion."""
+    width = len(board[0])
+    from_row, from_col = divmod(move & SQUARE_MASK, width)
+    to_row, to_col = divmod(move >> TO_SHIFT & SQUARE_MASK, width)
+    piece = board[from_row][from_col]
+    kind = move >> PROMOTION_SHIFT & 7
+    promotion = KIND_PIECES[kind](piece.color) if with_promotion and kind and piece is not None else None
+    return Move(type=move_type(move), piece=piece, from_col=from_col, from_row=from_row, #type: ignore
+                to_col=to_col, to_row=to_row, promotion_piece=promotion)
+
+
+class MoveList:
+    """Packed moves in a preallocated array, looked up by their squares through a lazily built index."""
+    __slots__ = ("moves", "count", "_index")
+
+    def __init__(self, capacity: int = MAX_MOVES):
+        self.moves = array("I", bytes(4 * capacity))
+        self.count = 0
+        self._index: dict[int, int] | None = None
+
+    @classmethod
+    def of(cls, moves: Iterable[int]) -> "MoveList":
+        move_list = cls(0)
+        move_list.moves.extend(moves)
+        move_list.count = len(move_list.moves)
+        return move_list
+
+    def append(self, move: int):
+        if self.count < len(self.moves):
+            self.moves[self.count] = move
+        else:
+            self.moves.append(move)
+        self.count += 1
+        self._index = None
+
+    def clear(self):
+        self.count = 0
+        self._index = None
+
+    def find(self, from_sq: int, to_sq: int) -> int | None:
+        """The first move between the two squares; promotions share their squares, the queen comes first."""
+        if self._index is None:
+            self._index = {}
+            for move in self:
+                self._index.setdefault(move & SQUARES_MASK, move)
+        return self._index.get(from_sq | to_sq << TO_SHIFT)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[int]:
+        return islice(self.moves, self.count)
+
+    def __getitem__(self, index: int) -> int:
+        if not -self.count <= index < self.count:
+            raise IndexError("move index out of range")
+        return self.moves[index % self.count]
+
+    def __repr__(self) -> str:
+        return f"MoveList({list(self)})"
@@ -1,22 +1,32 @@
-from chess.piece_model import ChessPiece, Knight, Bishop, Rook, Queen, Pawn, King
-from chess.board_model import Board
+from chess.piece_model import ChessPiece, COLORS, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+from chess.board_model import Board, SLIDERS
 
-from chess.MoveTypes import Move, MoveType
+from chess.MoveTypes import Move
+from chess.move_encoding import (
+    CAPTURE, DOUBLE_PAWN, EN_PASSANT, CASTLE, PROMOTION, PROMOTION_KINDS, SQUARES_MASK,
+    MoveList, pack_move, decode_move,
+)
+from chess.tables import QUEEN_DIRECTIONS
+from chess.instrumentation import timed
 
+STRAIGHT_SLIDERS = frozenset((ROOK, QUEEN))
+DIAGONAL_SLIDERS = frozenset((BISHOP, QUEEN))
 
-    
-def find_move(valid_moves: list[Move], to_col: int, to_row: int):
-    """Helper function to find the move object in valid moves."""
-    for move in valid_moves:
-        if move["to_col"] == to_col and move["to_row"] == to_row:
-            return move
-    return None
 
 class MoveGenerator:
     def __init__(self, board_state: Board):
         self.board_state = board_state
         self.en_passant_position = None
     
+    @property
+    def en_passant_position(self) -> tuple[int, int] | None:
+        """The square a pawn can capture en passant on, kept on the board so it is part of the hash."""
+        return self.board_state.en_passant
+    
+    @en_passant_position.setter
+    def en_passant_position(self, position: tuple[int, int] | None):
+        self.board_state.set_en_passant(position)
+    
     def reset_en_passant(self):
         """Reset the en passant position."""
         self.en_passant_position = None
@@ -26,25 +36,23 @@ class MoveGenerator:
         self.en_passant_position = (col, row + (1 if piece_color == "white" else -1))
     
     def castles_valid(self, king_col: int, king_row: int) -> set[tuple[int, int]]:
-        king = self.board_state.get_piece(king_col, king_row)
+        """Castling targets of the king, the rights on the board say whether king and rook are unmoved."""
         valid_castles = set()
-        if not king.first_move: #type: ignore
+        rights = self.board_state.castling
+        if not rights:
             return valid_castles
         
-        # King-side castle (short)
-        kingside_rook = self.board_state.get_piece(king_col + 3, king_row)
-        if isinstance(kingside_rook, Rook) and kingside_rook.first_move:
-            if self.board_state.get_piece(king_col + 1, king_row) is None \
-                and self.board_state.get_piece(king_col + 2, king_row) is None:
-                valid_castles.add((king_col + 2, king_row))
-        
-        # Queen-side castle (long)
-        queenside_rook = self.board_state.get_piece(king_col - 4, king_row) if king_col - 4 >= 0 else None
-        if isinstance(queenside_rook, Rook) and queenside_rook.first_move:
-            if self.board_state.get_piece(king_col - 1, king_row) is None \
-                and self.board_state.get_piece(king_col - 2, king_row) is None \
-                and self.board_state.get_piece(king_col - 3, king_row) is None:
-                valid_castles.add((king_col - 2, king_row))
+        king = self.board_state.get_piece(king_col, king_row)
+        enemy = "black" if king.color == "white" else "white" #type: ignore
+        board = self.board_state.board
+        attacked = self.board_state.is_attacked
+        
+        for rule in self.board_state.tables.castling:
+            if not rights & rule.right or rule.king != (king_col, king_row) or rule.color != king.color: #type: ignore
+                continue
+            if all(board[row][col] is None for col, row in rule.empty) \
+                and not any(attacked(col, row, enemy) for col, row in rule.safe[1:]):
+                valid_castles.add(rule.king_to)
         return valid_castles
 
 
@@ -61,107 +69,80 @@ class MoveGenerator:
     def find_pins(self, king_col: int, king_row: int, color: str) -> dict[tuple[int, int], frozenset[tuple[int, int]]]:
         """Finds all pieces that are pinning the king."""
         pins = {}
-        sliding_directions = [
-            (-1, 0), (1, 0), (0, -1), (0, 1),  # horizontal and vertical
-            (-1, -1), (1, -1), (-1, 1), (1, 1)  # diagonal  
-        ]
+        board = self.board_state.board
+        rays = self.board_state.tables.rays
+        code = COLORS[color]
         
-        for dx, dy in sliding_directions:
+        for direction in QUEEN_DIRECTIONS:
+            sliders = STRAIGHT_SLIDERS if 0 in direction else DIAGONAL_SLIDERS
             pinned_position = None
             blocking_squares = set()
-            col, row = king_col + dx, king_row + dy
-            while self.board_state.is_on_board(col, row):
-                piece = self.board_state.get_piece(col, row)
+            for col, row in rays[direction][king_row][king_col]:
+                piece = board[row][col]
                 blocking_squares.add((col, row))
-                if not piece:
-                    col += dx
-                    row += dy
+                if piece is None:
                     continue
-                if piece.color == color:
+                if piece.color_code == code:
                     if pinned_position is None:
                         pinned_position = (col, row)
-                    else:
-                        break
-                else:
-                    if isinstance(piece, (Queen, Rook)) and (dx == 0 or dy == 0) or \
-                        isinstance(piece, (Queen, Bishop)) and (dx != 0 and dy != 0):
-                        if pinned_position:
-                            pins[pinned_position] = blocking_squares
+                        continue
                     break
-                col += dx
-                row += dy
+                if piece.kind in sliders and pinned_position:
+                    pins[pinned_position] = blocking_squares
+                break
         return pins
     
     def _knight_check(self, king_col: int, king_row: int, color: str) -> tuple[int, set[tuple[int, int]]]:
         """if the king is in check by a knight."""
-        knight_moves = [
-            (2, 1), (2, -1), (-2, 1), (-2, -1),
-            (1, 2), (1, -2), (-1, 2), (-1, -2)
-        ]
-        
-        check_count = 0
-        blocking_squares = set()
-        
-        for dx, dy in knight_moves:
-            col, row = king_col + dx, king_row + dy
-            if self.board_state.is_on_board(col, row):
-                piece = self.board_state.get_piece(col, row)
-                if isinstance(piece, Knight) and piece.color != color:
-                    check_count += 1
-                    blocking_squares.add((col, row))
-        return (check_count, blocking_squares)
-    
+        return self._step_check(self.board_state.tables.knight[king_row][king_col], KNIGHT, color)
 
     def _sliding_check(self, king_col: int, king_row: int, color: str) -> tuple[int, set[tuple[int, int]]]:
-        sliding_directions = [
-            (-1, 0), (1, 0), (0, -1), (0, 1),  # horizontal and vertical
-            (-1, -1), (1, -1), (-1, 1), (1, 1)  # diagonal
-        ]
+        board = self.board_state.board
+        rays = self.board_state.tables.rays
         
+        code = COLORS[color]
         check_count = 0
         blocking_squares = set()
         
-        for dx, dy in sliding_directions:
-            col, row = king_col + dx, king_row + dy
-            potential_blocking = {(col, row)}
-            
-            while self.board_state.is_on_board(col, row):
-                piece = self.board_state.get_piece(col, row)
-                if piece is None or isinstance(piece, King):
-                    col += dx
-                    row += dy
-                    potential_blocking.add((col, row))
+        for direction in QUEEN_DIRECTIONS:
+            sliders = STRAIGHT_SLIDERS if 0 in direction else DIAGONAL_SLIDERS
+            potential_blocking = set()
+            for col, row in rays[direction][king_row][king_col]:
+                piece = board[row][col]
+                potential_blocking.add((col, row))
+                if piece is None or piece.kind == KING and piece.color_code == code:
                     continue
-                if piece.color == color:
-                    break
-                if isinstance(piece, (Queen, Rook)) and (dx == 0 or dy == 0) or \
-                    isinstance(piece, (Queen, Bishop)) and (dx != 0 and dy != 0):
+                if piece.color_code != code and piece.kind in sliders:
                     blocking_squares |= potential_blocking
                     check_count += 1
-                    break
                 break
         
         return (check_count, blocking_squares)
 
     def _pawn_check(self, king_col: int, king_row: int, color: str) -> tuple[int, set[tuple[int, int]]]:
         """if the king is in check by a pawn."""
-        if color == "white":
-            pawn_moves = [(-1, -1), (1, -1)]
-        else:
-            pawn_moves = [(-1, 1), (1, 1)]
+        # enemy pawns attack the king from where a pawn of its own color would capture
+        return self._step_check(self.board_state.tables.pawn_attacks[color][king_row][king_col], PAWN, color)
+
+    def _king_check(self, king_col: int, king_row: int, color: str) -> tuple[int, set[tuple[int, int]]]:
+        """if the square is next to the enemy king (only relevant for king destinations)."""
+        return self._step_check(self.board_state.tables.king[king_row][king_col], KING, color)
+    
+    def _step_check(self, squares, kind: int, color: str) -> tuple[int, set[tuple[int, int]]]:
+        board = self.board_state.board
+        code = COLORS[color]
         
         check_count = 0
         blocking_squares = set()
         
-        for dx, dy in pawn_moves:
-            col, row = king_col + dx, king_row + dy
-            if self.board_state.is_on_board(col, row):
-                piece = self.board_state.get_piece(col, row)
-                if isinstance(piece, Pawn) and piece.color != color:
-                    check_count += 1
-                    blocking_squares.add((col, row))
+        for col, row in squares:
+            piece = board[row][col]
+            if piece is not None and piece.kind == kind and piece.color_code != code:
+                check_count += 1
+                blocking_squares.add((col, row))
         return (check_count, blocking_squares)
         
+    @timed("in_check")
     def in_check(self, color: str, king_col=None, king_row=None) -> tuple[int, set[tuple[int, int]]]:
         """Returns the number of checks on the king and the blocking squares."""
         if king_col is None or king_row is None:
@@ -170,80 +151,141 @@ class MoveGenerator:
         checks = (f(king_col, king_row, color) for f in [
             self._sliding_check,
             self._knight_check,
-            self._pawn_check
+            self._pawn_check,
+            self._king_check
         ])
         
         check_count, blocking_squares = zip(*checks)
         total_checks = sum(check_count)
         total_blocking_squares = set().union(*blocking_squares)
 
-        print("CHECK OWO", total_checks, total_blocking_squares)
         return total_checks, total_blocking_squares
     
-    def _filter_moves(self, piece: ChessPiece, col: int, row: int) -> set[tuple[int, int]]:
+    def analyze_king(self, color: str) -> tuple[tuple[int, int], int, set[tuple[int, int]], dict]:
+        """King position, number of checks, squares that stop the check and pinned pieces, computed once per side."""
+        king_col, king_row = self.board_state.find_king_position(color)
+        check_count, blocking_squares = self.in_check(color, king_col, king_row)
+        pins = self.find_pins(king_col, king_row, color) if check_count < 2 else {}
+        return (king_col, king_row), check_count, blocking_squares, pins
+
+    def _filter_moves(self, piece: ChessPiece, col: int, row: int, analysis=None) -> set[tuple[int, int]]:
         valid_moves = piece.get_valid_moves(self.board_state, col, row)
         
-        king_col, king_row = self.board_state.find_king_position(piece.color)
-        check_count, blocking_squares = self.in_check(piece.color, king_col, king_row)
+        if analysis is None:
+            analysis = self.analyze_king(piece.color)
+        (king_col, king_row), check_count, blocking_squares, pins = analysis
         
-        if not isinstance(piece, King):
+        if piece.kind != KING:
             match check_count:
                 case 0:    
-                    pins = self.find_pins(king_col, king_row, piece.color)
                     if (col, row) in pins:
                         blockable = pins[(col, row)]
                         valid_moves = valid_moves & blockable
                 case 1:
                     valid_moves = {move for move in valid_moves if move in blocking_squares}
+                    if (col, row) in pins:
+                        valid_moves &= pins[(col, row)]
                 case _:
                     valid_moves = set()
         else:
-            valid_moves = self._handle_king(piece.color, valid_moves)
+            valid_moves = self._handle_king(piece.color, valid_moves, col, row)
             if check_count == 0:
                 valid_moves |= self.castles_valid(king_col, king_row)
         
-        if isinstance(piece, Pawn):
-            valid_moves |= self.en_passant(col, row, piece.color)
+        if piece.kind == PAWN and check_count < 2:
+            valid_moves |= {
+                move for move in self.en_passant(col, row, piece.color)
+                if self._en_passant_safe(col, row, *move, king_col, king_row)
+            }
         
         return valid_moves
+
+    def _en_passant_safe(self, col: int, row: int, to_col: int, to_row: int, king_col: int, king_row: int) -> bool:
+        """Scan the king's lines as if the en passant capture were played, it can uncover a rank or a diagonal."""
+        board = self.board_state.board
+        rays = self.board_state.tables.rays
+        color = board[row][col].color #type: ignore
+        code = COLORS[color]
+        vacated = ((col, row), (to_col, row))
+        
+        for direction in QUEEN_DIRECTIONS:
+            sliders = STRAIGHT_SLIDERS if 0 in direction else DIAGONAL_SLIDERS
+            for ray_col, ray_row in rays[direction][king_row][king_col]:
+                if (ray_col, ray_row) == (to_col, to_row):
+                    break
+                if (ray_col, ray_row) in vacated or (piece := board[ray_row][ray_col]) is None:
+                    continue
+                if piece.color_code != code and piece.kind in sliders:
+                    return False
+                break
+        
+        # knights and pawns stay where they are, only the captured pawn stops giving check
+        pawn_checkers = self._pawn_check(king_col, king_row, color)[1]
+        return self._knight_check(king_col, king_row, color)[0] == 0 and pawn_checkers <= {(to_col, row)}
     
-    def _format_moves(self, valid_moves: set[tuple[int, int]], piece: ChessPiece, col: int, row: int) -> list[Move]:
-        formatted_moves: list[Move] = []
+    def _pack_moves(self, valid_moves: set[tuple[int, int]], piece: ChessPiece, col: int, row: int, moves: MoveList):
+        kind = piece.kind
+        width = self.board_state.width
+        promotion_row = self.board_state.tables.promotion_rows[piece.color]
+        from_sq = row * width + col
         
         for to_col, to_row in valid_moves:
-            move = Move(type=MoveType.NORMAL, piece=piece, from_col=col, from_row=row, to_col=0, to_row=0, promotion_piece=None)
-            if isinstance(piece, King) and abs(to_col - col) == 2:
-                move['type'] |= MoveType.CASTLE
-            elif isinstance(piece, Pawn) and abs(to_row - row) == 2:
-                move['type'] |= MoveType.DOUBLE_PAWN_MOVE
-            elif (to_col, to_row) == self.en_passant_position:
-                move['type'] |= MoveType.EN_PASSANT
+            flags = 0
+            if kind == KING and abs(to_col - col) == 2:
+                flags = CASTLE
+            elif kind == PAWN and abs(to_row - row) == 2:
+                flags = DOUBLE_PAWN
+            elif kind == PAWN and (to_col, to_row) == self.en_passant_position:
+                flags = EN_PASSANT
             else:
-                if isinstance(piece, Pawn) and (to_row == 0 or to_row == 7):
-                   move['type'] |= MoveType.PROMOTION
                 if (captured_piece := self.board_state.get_piece(to_col, to_row)) is not None:
-                    if captured_piece.color == piece.color:
+                    if captured_piece.color_code == piece.color_code:
                         continue
-                    move['type'] |= MoveType.CAPTURE
-
-
-                
-
-            move['to_col'] = to_col
-            move['to_row'] = to_row
-            formatted_moves.append(move)
-        return formatted_moves
-        
-    def _handle_king(self, color: str, moves: set[tuple[int, int]]) -> set[tuple[int, int]]:
-        """Check if the king is in check after a move."""
-        new_moves = set()
-        for col, row in moves:
-            if self.in_check(color, col, row)[0] == 0:
-                new_moves.add((col, row))
-        return new_moves
+                    flags = CAPTURE
+                if kind == PAWN and to_row == promotion_row:
+                    for promotion in PROMOTION_KINDS:
+                        moves.append(pack_move(from_sq, to_row * width + to_col, flags | PROMOTION, promotion, kind))
+                    continue
+            moves.append(pack_move(from_sq, to_row * width + to_col, flags, 0, kind))
+        
+    def _handle_king(self, color: str, moves: set[tuple[int, int]], king_col: int, king_row: int) -> set[tuple[int, int]]:
+        """King steps to squares the enemy does not attack, nor would once the king leaves its own square."""
+        enemy = "black" if color == "white" else "white"
+        board = self.board_state.board
+        # a slider checking the king also covers the square behind it, which the king itself hides in the attack map
+        behind = set()
+        for col, row in self.board_state.attackers(king_col, king_row):
+            piece = board[row][col]
+            if piece.color == enemy and piece.kind in SLIDERS: #type: ignore
+                behind.add((king_col + (king_col > col) - (king_col < col), king_row + (king_row > row) - (king_row < row)))
+        attacked = self.board_state.is_attacked
+        return {(col, row) for col, row in moves if (col, row) not in behind and not attacked(col, row, enemy)}
+    
+    @timed("legal_moves")
+    def legal_moves(self, color: str) -> MoveList:
+        """Every legal move of the color, packed, sharing one king, check and pin analysis between the pieces."""
+        analysis = self.analyze_king(color)
+        moves = MoveList()
+        for col, row, piece in list(self.board_state.yield_all_pieces(color)):
+            self._pack_moves(self._filter_moves(piece, col, row, analysis), piece, col, row, moves)
+        return moves
+    
+    def decode_moves(self, moves: MoveList) -> list[Move]:
+        """Move dicts for the board view, one per destination, promotions still to be chosen."""
+        board = self.board_state.board
+        decoded: list[Move] = []
+        seen = set()
+        for move in moves:
+            if move & SQUARES_MASK in seen:
+                continue
+            seen.add(move & SQUARES_MASK)
+            decoded.append(decode_move(move, board, with_promotion=False))
+        return decoded
     
     def generate_moves(self, piece: ChessPiece, col: int, row: int) -> list[Move]:
-        filtered_moves = self._filter_moves(piece, col, row)
-        formatted_moves = self._format_moves(filtered_moves, piece, col, row)
-        
-        return formatted_moves
\ No newline at end of file
+        moves = MoveList()
+        self._pack_moves(self._filter_moves(piece, col, row), piece, col, row, moves)
+        return self.decode_moves(moves)
+
+    def generate_all_moves(self, color: str) -> list[Move]:
+        return self.decode_moves(self.legal_moves(color))
@@ -0,0 +1,135 @@
+"""
+Polyglot .bin opening books: 16 byte big-endian entries (key, move, weight, learn) sorted by key.
+The file is memory-mapped and searched in place, nothing is read into memory up front.
+"""
+import mmap
+import random
+import struct
+from typing import Iterator, NamedTuple
+
+from chess.GameState import GameState
+from chess.board_model import Board, WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE
+from chess.move_encoding import PROMOTION, PIECE_KINDS, SQUARES_MASK, TO_SHIFT, PROMOTION_SHIFT, move_flags
+from chess.piece_model import ChessPiece, Pawn, Knight, Bishop, Rook, Queen, King
+from chess.polyglot_keys import POLYGLOT_RANDOM
+
+ENTRY = struct.Struct(">QHHI")
+KEY = struct.Struct(">Q")
+
+# polyglot piece index: 2 * kind + 1 for white
+POLYGLOT_KINDS: dict[type[ChessPiece], int] = {Pawn: 0, Knight: 1, Bishop: 2, Rook: 3, Queen: 4, King: 5}
+CASTLING_OFFSET, EN_PASSANT_OFFSET, TURN_OFFSET = 768, 772, 780
+CASTLING_KEYS = ((WHITE_KINGSIDE, 0), (WHITE_QUEENSIDE, 1), (BLACK_KINGSIDE, 2), (BLACK_QUEENSIDE, 3))
+PROMOTION_PIECES: dict[int, type[ChessPiece]] = {1: Knight, 2: Bishop, 3: Rook, 4: Queen}
+
+
+class BookEntry(NamedTuple):
+    key: int
+    move: int  # to file, to rank, from file, from rank and promotion in 3 bit fields
+    weight: int
+    learn: int
+
+
+def polyglot_key(board: Board) -> int:
+    """The Polyglot hash of the position, which differs from the board's own Zobrist hash."""
+    key = 0
+    for col, row, piece in board.yield_all_pieces():
+        kind = POLYGLOT_KINDS[type(piece)] * 2 + (piece.color == "white")
+        key ^= POLYGLOT_RANDOM[64 * kind + 8 * (7 - row) + col]
+    for right, index in CASTLING_KEYS:
+        if board.castling & right:
+            key ^= POLYGLOT_RANDOM[CASTLING_OFFSET + index]
+    # the en passant file only counts when a pawn of the side to move can take
+    if board.en_passant is not None:
+        ep_col, ep_row = board.en_passant
+        pawn_row = ep_row + (1 if board.turn == "white" else -1)
+        for col in (ep_col - 1, ep_col + 1):
+            piece = board.get_piece(col, pawn_row)
+            if isinstance(piece, Pawn) and piece.color == board.turn:
+                key ^= POLYGLOT_RANDOM[EN_PASSANT_OFFSET + ep_col]
+                break
+    if board.turn == "white":
+        key ^= POLYGLOT_RANDOM[TURN_OFFSET]
+    return key
+
+
+class OpeningBook:
+    """Polyglot book searched in place, a lookup is a binary search over the mapped entries."""
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._map = None
+        self.size = len(self._map) // ENTRY.size if self._map is not None else 0
+
+    def _lower_bound(self, key: int) -> int:
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(self._map, middle * ENTRY.size)[0] < key: #type: ignore
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def entries(self, key: int) -> Iterator[BookEntry]:
+        """Book entries of the key, best weighted first as the format stores them."""
+        index = self._lower_bound(key)
+        while index < self.size:
+            entry = BookEntry(*ENTRY.unpack_from(self._map, index * ENTRY.size)) #type: ignore
+            if entry.key != key:
+                return
+            yield entry
+            index += 1
+
+    def book_moves(self, game_state: GameState) -> list[tuple[int, int]]:
+        """Legal moves the book knows for the position, with their weights. Polyglot books are 8x8 only."""
+        found = []
+        if (game_state.board_model.width, game_state.board_model.height) != (8, 8):
+            return found
+        for entry in self.entries(polyglot_key(game_state.board_model)):
+            move = self._decode(game_state, entry.move)
+            if move is not None:
+                found.append((move, entry.weight))
+        return found
+
+    def choose_move(self, game_state: GameState, rng: random.Random | None = None) -> int | None:
+        """A book move picked at random in proportion to its weight, None when out of book."""
+        moves = [(move, weight) for move, weight in self.book_moves(game_state) if weight > 0]
+        if not moves:
+            return None
+        return (rng or random).choices([move for move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+    def _decode(self, game_state: GameState, raw: int) -> int | None:
+        to_col, to_row = raw & 7, 7 - (raw >> 3 & 7)
+        from_col, from_row = raw >> 6 & 7, 7 - (raw >> 9 & 7)
+        promotion = PROMOTION_PIECES.get(raw >> 12 & 7)
+        king = game_state.board_model.get_piece(from_col, from_row)
+        rook = game_state.board_model.get_piece(to_col, to_row)
+        if isinstance(king, King) and isinstance(rook, Rook) and king.color == rook.color:
+            # castling is stored as the king taking its own rook
+            to_col = from_col + (2 if to_col > from_col else -2)
+        squares = from_row * 8 + from_col | (to_row * 8 + to_col) << TO_SHIFT
+        for move in game_state.legal_moves():
+            if move & SQUARES_MASK != squares:
+                continue
+            if bool(move_flags(move) & PROMOTION) != (promotion is not None):
+                return None
+            if promotion is None or move >> PROMOTION_SHIFT & 7 == PIECE_KINDS[promotion]:
+                return move
+        return None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "OpeningBook":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
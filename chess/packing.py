@@ -0,0 +1,62 @@
+"""
+Fixed size binary encoding of an 8x8 position: 32 bytes of 4 bit square codes, one flag byte
+(side to move and castling rights) and one en passant byte, PACKED_SIZE bytes in total.
+"""
+from chess.board_model import Board
+from chess.piece_model import ChessPiece, Pawn, Knight, Bishop, Rook, Queen, King, WHITE
+
+PACKED_SIZE = 34
+NO_EN_PASSANT = 0xFF
+BLACK_TO_MOVE = 0x10  # flag byte bit, the low four bits are the castling rights
+
+# square codes: 0 empty, 1-6 white pawn to king, 9-14 black
+PIECE_CODES: dict[type[ChessPiece], int] = {Pawn: 1, Knight: 2, Bishop: 3, Rook: 4, Queen: 5, King: 6}
+CODE_PIECES: dict[int, type[ChessPiece]] = {code: piece for piece, code in PIECE_CODES.items()}
+
+
+def _code(piece: ChessPiece | None) -> int:
+    if piece is None:
+        return 0
+    code = PIECE_CODES.get(type(piece))
+    if code is None:
+        raise ValueError(f"{type(piece).__name__} has no packed code.")
+    return code if piece.color_code == WHITE else code | 8
+
+
+def pack_board(board: Board) -> bytes:
+    """Encode the pieces, side to move, castling rights and en passant column of the board."""
+    if (board.width, board.height) != (8, 8):
+        raise ValueError("Only 8x8 boards can be packed.")
+    packed = bytearray(PACKED_SIZE)
+    index = 0
+    for row in board.board:
+        for col in range(0, 8, 2):
+            packed[index] = _code(row[col]) << 4 | _code(row[col + 1])
+            index += 1
+    packed[32] = board.castling | (BLACK_TO_MOVE if board.turn == "black" else 0)
+    packed[33] = board.en_passant[0] if board.en_passant is not None else NO_EN_PASSANT
+    return bytes(packed)
+
+
+def unpack_board(data: bytes, board: Board | None = None) -> Board:
+    """Set up the packed position on an empty board, a new Board by default."""
+    if len(data) != PACKED_SIZE:
+        raise ValueError(f"Packed positions are {PACKED_SIZE} bytes, got {len(data)}.")
+    if board is None:
+        board = Board()
+    flags = data[32]
+    castling = flags & 0xF
+    for index in range(32):
+        byte = data[index]
+        row, col = divmod(index * 2, 8)
+        for offset, code in ((0, byte >> 4), (1, byte & 0xF)):
+            if not code:
+                continue
+            board.place_piece(CODE_PIECES[code & 7]("black" if code & 8 else "white"), col + offset, row)
+    board.set_castling(castling & board.castling_rights())
+
+    turn = "black" if flags & BLACK_TO_MOVE else "white"
+    board.set_turn(turn)
+    if data[33] != NO_EN_PASSANT:
+        board.set_en_passant((data[33], 2 if turn == "white" else 5))
+    return board
@@ -0,0 +1,99 @@
+"""
+Root splitting over a process pool: every legal move at the root becomes one task, and the
+worker only receives the position after that move as a small Snapshot tuple.
+"""
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, NamedTuple
+
+from chess.GameState import GameState, FEN_PIECES
+from chess.board_model import Board
+from chess.engine import Engine, SearchResult, PROMOTION_KINDS
+from chess.move_encoding import PROMOTION, PROMOTION_SHIFT, move_flags
+from chess.piece_model import WHITE
+from chess.opening_book import OpeningBook
+
+
+class Snapshot(NamedTuple):
+    placement: str  # one letter per square row by row, upper case white, "." empty
+    turn: str
+    en_passant: tuple[int, int] | None
+    castling: int  # castling rights bits of the board
+    board_type: type[Board]
+    width: int = 8
+    height: int = 8
+
+
+def snapshot(game_state: GameState) -> Snapshot:
+    """Compact picklable copy of the position, without the piece objects and caches of the game state."""
+    board = game_state.board_model
+    squares = []
+    for row in range(board.height):
+        for col in range(board.width):
+            piece = board.board[row][col]
+            if piece is None:
+                squares.append(".")
+                continue
+            letter = repr(piece)
+            squares.append(letter if piece.color_code == WHITE else letter.lower())
+    return Snapshot("".join(squares), game_state.current_turn,
+                    game_state.move_generator.en_passant_position, board.castling, type(board),
+                    board.width, board.height)
+
+
+def restore(snap: Snapshot) -> GameState:
+    """Rebuild a game state from a snapshot."""
+    game_state = GameState(snap.board_type, width=snap.width, height=snap.height)
+    board = game_state.board_model
+    for index, letter in enumerate(snap.placement):
+        if letter == ".":
+            continue
+        row, col = divmod(index, board.width)
+        board.place_piece(FEN_PIECES[letter.lower()]("white" if letter.isupper() else "black"), col, row)
+    board.set_castling(snap.castling)
+    game_state.current_turn = snap.turn
+    game_state.move_generator.en_passant_position = snap.en_passant
+    return game_state
+
+
+def split_root(executor: Executor, game_state: GameState, moves: list[int],
+               task: Callable[..., Any], *args) -> list[Any]:
+    """Results of task(snapshot after move, *args) for every root move, in order; task must pickle."""
+    futures = []
+    for move in moves:
+        undo = game_state.make_move(move)
+        futures.append(executor.submit(task, snapshot(game_state), *args))
+        game_state.unmake_move(undo)
+    return [future.result() for future in futures]
+
+
+def _search_task(snap: Snapshot, time_limit: float | None, max_depth: int) -> tuple[int, int, int]:
+    result = Engine().search(restore(snap), time_limit, max_depth)
+    return result.score, result.depth, result.nodes
+
+
+def parallel_search(executor: Executor, game_state: GameState, workers: int,
+                    time_limit: float | None = None, max_depth: int = 64,
+                    book: OpeningBook | None = None) -> SearchResult:
+    """Search every root move in its own task, sharing out time_limit, and keep the best."""
+    start = time.perf_counter()
+    if book is not None and (book_move := book.choose_move(game_state)) is not None:
+        return SearchResult(book_move, 0, 0, 0, time.perf_counter() - start)
+    moves = [move for move in game_state.move_generator.legal_moves(game_state.current_turn)
+             if not move_flags(move) & PROMOTION or move >> PROMOTION_SHIFT & 7 in PROMOTION_KINDS]
+    if not moves:
+        return SearchResult(None, 0, 0, 0, time.perf_counter() - start)
+
+    rounds = -(-len(moves) // workers)
+    child_time = time_limit / rounds if time_limit is not None else None
+    results = split_root(executor, game_state, moves, _search_task, child_time, max(max_depth - 1, 1))
+
+    # the children score for the side that replies
+    best = max(range(len(moves)), key=lambda index: -results[index][0])
+    return SearchResult(
+        move=moves[best],
+        score=-results[best][0],
+        depth=min(depth for _, depth, _ in results) + 1,
+        nodes=sum(nodes for _, _, nodes in results),
+        elapsed=time.perf_counter() - start,
+    )
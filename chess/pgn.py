@@ -0,0 +1,205 @@
+"""
+Streaming PGN reader: games are parsed one at a time from any iterable of lines,
+so only the game being read is ever held in memory. Also writes moves as SAN and games as PGN text.
+"""
+import re
+from typing import Iterable, Iterator, NamedTuple
+
+from chess.GameState import GameState, FEN_PIECES, START_FEN
+from chess.move_encoding import (
+    CASTLE, PROMOTION, KIND_PIECES, PIECE_KINDS, from_square, to_square, move_flags, promotion_kind,
+)
+from chess.piece_model import Pawn, King
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+_TAG = re.compile(r'^\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]\s*$')
+_TOKEN = re.compile(r"""
+    \{[^}]*\}?          # comment, may span lines
+    | ;[^\n]*           # rest of line comment
+    | [()]              # variation
+    | \$\d+             # numeric annotation glyph
+    | 1-0 | 0-1 | 1/2-1/2 | \*
+    | \d+\.+            # move number
+    | [^\s{}();$]+      # move
+""", re.VERBOSE)
+# files and ranks run up to p16, the largest board the move encoding holds
+_SAN = re.compile(r"^([NBRQK])?([a-p])?(\d{1,2})?x?([a-p])(\d{1,2})(?:=?([NBRQ]))?[+#]?[!?]*$")
+_CASTLE = re.compile(r"^([O0]-[O0](-[O0])?)[+#]?[!?]*$")
+
+
+class PgnGame(NamedTuple):
+    index: int  # position of the game in the stream, from 0
+    headers: dict[str, str]
+    moves: list[str]  # SAN of the main line
+    result: str
+
+
+def tokenize(movetext: str) -> Iterator[str]:
+    """Yield the main line moves and the result, skipping comments, glyphs, move numbers and variations."""
+    depth = 0
+    for match in _TOKEN.finditer(movetext):
+        token = match.group()
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth = max(depth - 1, 0)
+        elif depth or token[0] in "{;$" or token[-1] == ".":
+            continue
+        else:
+            yield token
+
+
+def _make_game(index: int, headers: dict[str, str], movetext: list[str]) -> PgnGame:
+    moves, result = [], headers.get("Result", "*")
+    for token in tokenize("\n".join(movetext)):
+        if token in RESULTS:
+            result = token
+        else:
+            moves.append(token)
+    return PgnGame(index, headers, moves, result)
+
+
+def read_games(lines: Iterable[str]) -> Iterator[PgnGame]:
+    """Parse games from an iterable of lines, such as an open file."""
+    index = 0
+    headers: dict[str, str] = {}
+    movetext: list[str] = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("%"):
+            continue
+        if line.startswith("[") and (tag := _TAG.match(line)):
+            if movetext:  # a tag after moves starts the next game
+                yield _make_game(index, headers, movetext)
+                index += 1
+                headers, movetext = {}, []
+            headers[tag.group(1)] = tag.group(2).replace('\\"', '"')
+            continue
+        movetext.append(line)
+    if movetext or headers:
+        yield _make_game(index, headers, movetext)
+
+
+def resolve_san(game_state: GameState, san: str) -> int:
+    """Find the legal move of the side to move written as san, raising ValueError if there is not exactly one."""
+    width, height = game_state.board_model.width, game_state.board_model.height
+    board = game_state.board_model.board
+    candidates = []
+    if castle := _CASTLE.match(san):
+        kingside = castle.group(2) is None
+        candidates = [
+            move for move in game_state.legal_moves()
+            if move_flags(move) & CASTLE and (to_square(move) > from_square(move)) == kingside
+        ]
+    elif parsed := _SAN.match(san):
+        piece_letter, from_file, from_rank, to_file, to_rank, promotion = parsed.groups()
+        piece_type = FEN_PIECES[piece_letter.lower()] if piece_letter else Pawn
+        to_col, to_row = ord(to_file) - ord("a"), height - int(to_rank)
+        for move in game_state.legal_moves():
+            if to_square(move) != to_row * width + to_col:
+                continue
+            from_row, from_col = divmod(from_square(move), width)
+            if type(board[from_row][from_col]) is not piece_type:
+                continue
+            if from_file and from_col != ord(from_file) - ord("a"):
+                continue
+            if piece_type is Pawn and not from_file and from_col != to_col:
+                continue  # pawn captures always name their file
+            if from_rank and from_row != height - int(from_rank):
+                continue
+            if piece_type is King and move_flags(move) & CASTLE:
+                continue
+            if bool(move_flags(move) & PROMOTION) != bool(promotion):
+                continue
+            if promotion and promotion_kind(move) != PIECE_KINDS[FEN_PIECES[promotion.lower()]]:
+                continue
+            candidates.append(move)
+    else:
+        raise ValueError(f"unreadable move {san!r}")
+
+    if not candidates:
+        raise ValueError(f"illegal move {san!r}")
+    if len(candidates) > 1:
+        raise ValueError(f"ambiguous move {san!r}")
+    return candidates[0]
+
+
+def replay(game_state: GameState, game: PgnGame) -> int:
+    """Play the game from its FEN tag or the start and return the number of moves, ValueError on a bad one."""
+    game_state.load_fen(game.headers.get("FEN", START_FEN))
+    for san in game.moves:
+        try:
+            move = resolve_san(game_state, san)
+        except ValueError as error:
+            number = game_state.fullmove_number
+            raise ValueError(f"move {number}{'.' if game_state.current_turn == 'white' else '...'}: {error}") from None
+        game_state.make_move(move)
+    game_state.undo_stack.clear()
+    return len(game.moves)
+
+
+def move_to_san(game_state: GameState, move: int) -> str:
+    """SAN of a legal packed move of the side to move, written before the move is played."""
+    board = game_state.board_model
+    width, height = board.width, board.height
+    from_row, from_col = divmod(from_square(move), width)
+    to_row, to_col = divmod(to_square(move), width)
+    piece = board.board[from_row][from_col]
+    target = f"{chr(to_col + ord('a'))}{height - to_row}"
+    if move_flags(move) & CASTLE:
+        san = "O-O" if to_col > from_col else "O-O-O"
+    elif isinstance(piece, Pawn):
+        san = target
+        if from_col != to_col:
+            san = f"{chr(from_col + ord('a'))}x{target}"
+        if move_flags(move) & PROMOTION and promotion_kind(move):
+            san += f"={repr(KIND_PIECES[promotion_kind(move)](piece.color))}"
+    else:
+        # name the file, else the rank, else both when another piece of the kind reaches the square
+        others = [
+            divmod(from_square(other), width) for other in game_state.legal_moves()
+            if to_square(other) == to_square(move) and from_square(other) != from_square(move)
+            and type(board.board[from_square(other) // width][from_square(other) % width]) is type(piece)
+        ]
+        origin = ""
+        if others:
+            file, rank = chr(from_col + ord("a")), str(height - from_row)
+            if all(other_col != from_col for _, other_col in others):
+                origin = file
+            elif all(other_row != from_row for other_row, _ in others):
+                origin = rank
+            else:
+                origin = file + rank
+        capture = "x" if board.board[to_row][to_col] is not None else ""
+        san = f"{repr(piece)}{origin}{capture}{target}"
+
+    game_state.make_move(move)
+    if game_state.move_generator.in_check(game_state.current_turn)[0] > 0:
+        san += "#" if not game_state.legal_moves() else "+"
+    game_state.unmake_move()
+    return san
+
+
+def format_game(headers: dict[str, str], moves: list[str], result: str, width: int = 79) -> str:
+    """PGN text of a game from its tags and SAN moves, with the move text wrapped at width."""
+    lines = []
+    for name, value in headers.items():
+        escaped = value.replace('"', '\\"')
+        lines.append(f'[{name} "{escaped}"]')
+    lines.append("")
+    tokens = []
+    for ply, san in enumerate(moves):
+        if ply % 2 == 0:
+            tokens.append(f"{ply // 2 + 1}.")
+        tokens.append(san)
+    tokens.append(result)
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > width:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    return "\n".join(lines) + "\n\n"
@@ -2,27 +2,56 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 from abc import abstractmethod, ABC
 
+from chess.tables import ROOK_DIRECTIONS, BISHOP_DIRECTIONS, QUEEN_DIRECTIONS
+
 if TYPE_CHECKING:
     from chess.board_model import Board
 
-class FirstMoveMixin:
-    """
-    Mixin class to handle the first move logic for chess pieces.
-    This can be used to implement special rules for pieces that have a different behavior on their first move.
-    """
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.first_move = True
-    
-    def update_pos(self, **kwargs):
-        """Updates the position of the piece based on its coordinates in the board state."""
-        starting = kwargs.get('starting', False)
-        if not starting:
-            self.first_move = False  # After the first move, set first_move to False
-
+WHITE, BLACK = 0, 1
+COLORS = {"white": WHITE, "black": BLACK}
+COLOR_NAMES = ("white", "black")
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+def sliding_moves(board_state: Board, this_col: int, this_row: int, directions) -> set[tuple[int, int]]:
+    """Squares along the rays up to and including the first piece hit."""
+    valid_moves = set()
+    board = board_state.board
+    rays = board_state.tables.rays
+    for direction in directions:
+        for col, row in rays[direction][this_row][this_col]:
+            valid_moves.add((col, row))
+            if board[row][col] is not None:
+                break
+    return valid_moves
 
 class ChessPiece(ABC):
-    
+    """Immutable flyweight: Pawn("white") is always the same instance, whether it moved is read from the board."""
+    __slots__ = ("color", "color_code")
+    kind = -1  # PAWN to KING, -1 for pieces the packed encodings do not know
+    _instances: dict[tuple[type, str], "ChessPiece"] = {}
+
+    def __new__(cls, color: str | int):
+        name = COLOR_NAMES[color] if isinstance(color, int) else color
+        piece = ChessPiece._instances.get((cls, name))
+        if piece is None:
+            piece = super().__new__(cls)
+            object.__setattr__(piece, "color", name)
+            object.__setattr__(piece, "color_code", COLORS[name])
+            ChessPiece._instances[(cls, name)] = piece
+        return piece
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} pieces are shared and cannot be changed")
+
+    def __reduce__(self):
+        return (type(self), (self.color,))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
     @abstractmethod
     def get_valid_moves(self, board_state: Board, this_col: int, this_row: int) -> set[tuple[int, int]]:
         """
@@ -30,124 +59,69 @@ class ChessPiece(ABC):
         :return: A list of valid moves.
         """ 
         pass
-    
-    def __init__(self, color: str):
-        self.color = color
 
-class Rook(FirstMoveMixin, ChessPiece):
+class Rook(ChessPiece):
+    __slots__ = ()
+    kind = ROOK
 
     def get_valid_moves(self, board_state: Board, this_col: int, this_row: int) -> set[tuple[int, int]]:
-        valid_moves = set()
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # left, right, up, down
-
-        for dx, dy in directions:
-            col, row = this_col + dx, this_row + dy
-            while board_state.is_on_board(col, row) and board_state.get_piece(col, row) is None:
-                valid_moves.add((col, row))
-                col += dx
-                row += dy
-            if board_state.is_on_board(col, row):
-                valid_moves.add((col, row))
-                
-
-        return valid_moves
+        return sliding_moves(board_state, this_col, this_row, ROOK_DIRECTIONS)
     def __repr__(self):
         return "R"
 
 class Knight(ChessPiece):
-    
+    __slots__ = ()
+    kind = KNIGHT
     def get_valid_moves(self, board_state: Board, this_col: int, this_row: int) -> set[tuple[int, int]]:
-        moves = {
-            (2, 1), (2, -1), (-2, 1), (-2, -1),
-            (1, 2), (1, -2), (-1, 2), (-1, -2)
-        }
-        valid_moves = set()
-        for dx, dy in moves:
-            col, row = this_col + dx, this_row + dy
-            if board_state.is_on_board(col, row):
-                valid_moves.add((col, row))
-        
-        return valid_moves
+        return set(board_state.tables.knight[this_row][this_col])
     def __repr__(self):
         return "N"
 
 class Bishop(ChessPiece):
-    
+    __slots__ = ()
+    kind = BISHOP
     def get_valid_moves(self, board_state: Board, this_col: int, this_row: int) -> set[tuple[int, int]]:
-        valid_moves = set()
-        directions = [(-1, -1), (1, -1), (-1, 1), (1, 1)]  # diagonal
-
-        for dx, dy in directions:
-            col, row = this_col + dx, this_row + dy
-            while board_state.is_on_board(col, row) and board_state.get_piece(col, row) is None:
-                valid_moves.add((col, row))
-                col += dx
-                row += dy
-            if board_state.is_on_board(col, row):
-                valid_moves.add((col, row))
-        return valid_moves
+        return sliding_moves(board_state, this_col, this_row, BISHOP_DIRECTIONS)
     def __repr__(self):
         return "B"
 
 class Queen(ChessPiece):
-    
+    __slots__ = ()
+    kind = QUEEN
     def get_valid_moves(self, board_state: Board, this_col: int, this_row: int) -> set[tuple[int, int]]:
-        valid_moves = set()
-        directions = [
-            (-1, 0), (1, 0), (0, -1), (0, 1),  # horizontal and vertical
-            (-1, -1), (1, -1), (-1, 1), (1, 1)  # diagonal
-        ]
-        for dx, dy in directions:
-            col, row = this_col + dx, this_row + dy
-            while board_state.is_on_board(col, row) and board_state.get_piece(col, row) is None:
-                valid_moves.add((col, row))
-                col += dx
-                row += dy
-            if board_state.is_on_board(col, row):
-                valid_moves.add((col, row))
-        return valid_moves
+        return sliding_moves(board_state, this_col, this_row, QUEEN_DIRECTIONS)
     def __repr__(self):
         return "Q"
 
 
 class Pawn(ChessPiece):
-    def __init__(self, color):
-        super().__init__(color)
-        self.first_move = True
+    __slots__ = ()
+    kind = PAWN
     
     def get_valid_moves(self, board_state: Board, this_col: int, this_row: int) -> set[tuple[int, int]]:
         valid_moves = set()
-        direction = 1 if self.color == "black" else -1
-        if board_state.get_piece(this_col, this_row + direction) is None:
-            valid_moves.add((this_col, this_row + direction))
-            if self.first_move and board_state.get_piece(this_col,this_row + 2 * direction) is None:
-                valid_moves.add((this_col, this_row + 2 * direction))
-        
-        if 0 <= this_row + direction < 8 and 0 <= this_col - 1 < 8 \
-            and board_state.get_piece(this_col - 1, this_row + direction) is not None:
-            valid_moves.add((this_col - 1, this_row + direction))
-        if 0 <= this_row + direction < 8 and 0 <= this_col + 1 < 8 \
-            and board_state.get_piece(this_col + 1, this_row + direction) is not None:
-            valid_moves.add((this_col + 1, this_row + direction)) 
+        board = board_state.board
+        tables = board_state.tables
+        pushes = tables.pawn_pushes[self.color][this_row][this_col]
+        if pushes and board[pushes[0][1]][pushes[0][0]] is None:
+            valid_moves.add(pushes[0])
+            if len(pushes) > 1 and board[pushes[1][1]][pushes[1][0]] is None:
+                valid_moves.add(pushes[1])
         
-
+        for col, row in tables.pawn_attacks[self.color][this_row][this_col]:
+            if board[row][col] is not None:
+                valid_moves.add((col, row))
         
         return valid_moves
     def __repr__(self):
         return "P"
 
-class King(FirstMoveMixin, ChessPiece):    
+class King(ChessPiece):
+    __slots__ = ()
+    kind = KING
 
     def get_valid_moves(self, board_state: Board, this_col: int, this_row: int) -> set[tuple[int, int]]:
-        valid_moves = set()
-        moves = [
-            (1, 0), (-1, 0), (0, 1),
-            (0, -1), (1, 1), (1, -1),
-            (-1, 1), (-1, -1)]
-        for dx, dy in moves:
-            col, row = this_col + dx, this_row + dy
-            if board_state.is_on_board(col, row):
-                valid_moves.add((col, row))
+        valid_moves = set(board_state.tables.king[this_row][this_col])
         
         #valid_moves |= self.castles_valid()
         
@@ -156,11 +130,12 @@ class King(FirstMoveMixin, ChessPiece):
         return "K"
     
 class TestPiece(ChessPiece):
+    __slots__ = ()
     sprite_path = "images/{color}/test.png"
 
     def get_valid_moves(self, board_state: Board, this_col: int, this_row: int) -> set[tuple[int, int]]:
         # Placeholder implementation for valid moves
-        return {(i, j) for i in range(8) for j in range(8)}
+        return {(i, j) for i in range(board_state.width) for j in range(board_state.height)}
 
     def __repr__(self):
         return "T"
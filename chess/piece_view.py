@@ -1,8 +1,12 @@
+import logging
+
 from PySide6 import QtCore as qtc, QtWidgets as qtw, QtGui as qtg
 from PySide6.QtCore import Qt
 
 import chess.piece_model as piece_model
 
+logger = logging.getLogger(__name__)
+
 SPRITE_PATHS = {
     piece_model.Knight: "data/{color}/knight.png",
     piece_model.Rook: "data/{color}/rook.png",
@@ -12,6 +16,39 @@ SPRITE_PATHS = {
     piece_model.King: "data/{color}/king.png",
     piece_model.TestPiece: "data/{color}/test.png"
 }
+COLORS = ("white", "black")
+
+_images: dict[str, qtg.QImage] = {}  # decoded sprite files, scaled copies live in QPixmapCache
+
+
+def _image(piece_class: type[piece_model.ChessPiece], color: str) -> qtg.QImage:
+    path = SPRITE_PATHS.get(piece_class, "data/{color}/test.png").format(color=color)
+    image = _images.get(path)
+    if image is None:
+        image = _images[path] = qtg.QImage(path)
+        if image.isNull():
+            logger.warning("could not load sprite %s", path)
+    return image
+
+
+def sprite(piece_class: type[piece_model.ChessPiece], color: str, size: int) -> qtg.QPixmap:
+    """The sprite of a piece scaled to size, cached and shared by every view."""
+    key = f"sprite/{piece_class.__name__}/{color}/{size}"
+    pixmap = qtg.QPixmapCache.find(key)
+    if pixmap is None:
+        pixmap = qtg.QPixmap.fromImage(_image(piece_class, color).scaled(
+            size, size, Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation))
+        qtg.QPixmapCache.insert(key, pixmap)
+    return pixmap
+
+
+def preload_sprites(*sizes: int):
+    """Read every sprite file and scale them to the given sizes, so later requests never touch the disk."""
+    for piece_class in SPRITE_PATHS:
+        for color in COLORS:
+            for size in sizes:
+                sprite(piece_class, color, size)
+
 
 class ChessSignals(qtc.QObject):
     """
@@ -43,12 +80,9 @@ class PieceView(qtw.QGraphicsPixmapItem):
 
     def set_pixmap(self, piece: piece_model.ChessPiece, square_size: int):
         """
-        Returns a QPixmap for the given piece and square size.
+        Show the sprite of the given piece at the given square size.
         """
-        sprite_path = SPRITE_PATHS.get(piece.__class__, "data/{color}/test.png")
-        pixmap = qtg.QPixmap(sprite_path.format(color=piece.color))
-        scaled_pixmap = pixmap.scaled(square_size, square_size, Qt.AspectRatioMode.IgnoreAspectRatio)
-        self.setPixmap(scaled_pixmap)
+        self.setPixmap(sprite(piece.__class__, piece.color, square_size))
     
     def reset_pos(self):
         """Return the piece back to its previous position."""
@@ -88,7 +122,7 @@ class PieceView(qtw.QGraphicsPixmapItem):
         
         col = round((pos.x() - self.square_size // 2 ) / self.square_size)
         row = round((pos.y() - self.square_size // 2 ) / self.square_size)
-        print("POSITION", col, row)
+        logger.debug("piece dropped on %s", (col, row))
         
         self.setZValue(1)
         # Accept the event to prevent default handling
@@ -0,0 +1,114 @@
+"""
+On-disk position store: a memory-mapped open addressing hash table of fixed size records,
+keyed by the Zobrist hash of the position, with the packed position kept to rule out collisions.
+"""
+import mmap
+import os
+import struct
+from typing import NamedTuple
+
+from chess.board_model import Board
+from chess.packing import PACKED_SIZE, pack_board
+
+MAGIC = b"UCPOSDB1"
+HEADER = struct.Struct("<8sQQI")  # magic, capacity, count, record size
+HEADER_SIZE = 64
+RECORD = struct.Struct(f"<BQ{PACKED_SIZE}sHbi")  # used, key, packed position, legal moves, result, eval
+USED = 1
+
+UNKNOWN_RESULT = -128
+WHITE_WINS, DRAW, BLACK_WINS = 1, 0, -1
+
+
+class PositionRecord(NamedTuple):
+    key: int
+    packed: bytes
+    legal_moves: int
+    result: int
+    evaluation: int  # centipawns from white's point of view
+
+
+class PositionDB:
+    """Memory-mapped position store of fixed capacity, lookups read straight out of the mapping."""
+    def __init__(self, path: str, capacity: int | None = None):
+        """Open the database at path, creating it with room for capacity positions if it does not exist."""
+        if not os.path.exists(path):
+            if capacity is None:
+                raise FileNotFoundError(f"{path} does not exist and no capacity was given to create it.")
+            self._create(path, capacity)
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self.capacity, self._count, record_size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not a position database.")
+
+    @staticmethod
+    def _create(path: str, capacity: int):
+        # a power of two, so the slot is the low bits of the key
+        capacity = 1 << max(capacity - 1, 1).bit_length()
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, capacity, 0, RECORD.size).ljust(HEADER_SIZE, b"\0"))
+            file.truncate(HEADER_SIZE + capacity * RECORD.size)  # sparse, zero filled
+
+    def _find(self, key: int) -> tuple[int, bool]:
+        """Offset of the record holding key, or of the empty slot it would go to."""
+        mask = self.capacity - 1
+        slot = key & mask
+        for _ in range(self.capacity):
+            offset = HEADER_SIZE + slot * RECORD.size
+            used = self._map[offset]
+            if not used:
+                return offset, False
+            if struct.unpack_from("<Q", self._map, offset + 1)[0] == key:
+                return offset, True
+            slot = (slot + 1) & mask
+        return -1, False
+
+    def put(self, board: Board, legal_moves: int = 0, result: int = UNKNOWN_RESULT, evaluation: int = 0):
+        """Store or overwrite the data of the position on the board."""
+        self.put_packed(board.hash, pack_board(board), legal_moves, result, evaluation)
+
+    def put_packed(self, key: int, packed: bytes, legal_moves: int = 0, result: int = UNKNOWN_RESULT,
+                   evaluation: int = 0):
+        offset, found = self._find(key)
+        if offset < 0:
+            raise OverflowError("Position database is full.")
+        RECORD.pack_into(self._map, offset, USED, key, packed, legal_moves, result, evaluation)
+        if not found:
+            self._count += 1
+            HEADER.pack_into(self._map, 0, MAGIC, self.capacity, self._count, RECORD.size)
+
+    def get_key(self, key: int) -> PositionRecord | None:
+        offset, found = self._find(key)
+        if not found:
+            return None
+        return PositionRecord(*RECORD.unpack_from(self._map, offset)[1:])
+
+    def get(self, board: Board) -> PositionRecord | None:
+        """The record of the position on the board, None if it is missing or only its hash matches."""
+        record = self.get_key(board.hash)
+        if record is None or record.packed != pack_board(board):
+            return None
+        return record
+
+    def __contains__(self, board: Board) -> bool:
+        return self.get(board) is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "PositionDB":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,56 @@
+"""
+Zobrist keys of the positions a game went through, for repetition checks without comparing boards.
+"""
+
+
+class PositionHistory:
+    """Position keys in windows split at captures and pawn moves, with O(1) push, pop and repetition count."""
+    def __init__(self):
+        self.keys: list[int] = []
+        self._starts: list[bool] = []  # whether each position opened a new window
+        self._windows: list[dict[int, int]] = []
+
+    def reset(self, key: int):
+        """Forget the game so far and start from the position with the key."""
+        self.keys.clear()
+        self._starts.clear()
+        self._windows.clear()
+        self.push(key, irreversible=True)
+
+    def push(self, key: int, irreversible: bool = False):
+        """Record the position reached by a move, irreversible when it was a capture or a pawn move."""
+        if irreversible or not self._windows:
+            self._windows.append({})
+            irreversible = True
+        counts = self._windows[-1]
+        counts[key] = counts.get(key, 0) + 1
+        self.keys.append(key)
+        self._starts.append(irreversible)
+
+    def pop(self) -> int:
+        """Drop the last position, when its move is taken back."""
+        key = self.keys.pop()
+        counts = self._windows[-1]
+        if counts[key] == 1:
+            del counts[key]
+        else:
+            counts[key] -= 1
+        if self._starts.pop():
+            self._windows.pop()
+        return key
+
+    def repetitions(self, key: int | None = None) -> int:
+        """How many times the position (the current one by default) occurred since the last irreversible move."""
+        if not self.keys:
+            return 0
+        return self._windows[-1].get(self.keys[-1] if key is None else key, 0)
+
+    def copy(self) -> "PositionHistory":
+        clone = PositionHistory()
+        clone.keys = self.keys.copy()
+        clone._starts = self._starts.copy()
+        clone._windows = [window.copy() for window in self._windows]
+        return clone
+
+    def __len__(self) -> int:
+        return len(self.keys)
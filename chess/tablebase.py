@@ -0,0 +1,366 @@
+"""
+Retrograde endgame tables for a lone king against a king and one or two pieces (KQK, KRK, KPK, KBNK).
+
+Positions are indexed by their placement: every piece contributes its square (row * 8 + col) as one
+base 64 digit, in the order white king, black king, then the pieces named in the material after the
+first K. Each table is an int8 array of shape (2, 64 ** pieces), [0] with white to move and [1] with
+black to move, holding the plies to mate (white mates, or black gets mated), DRAW or ILLEGAL.
+The strong side is always white in the table; positions with the pieces on the other side are mirrored.
+"""
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING, NamedTuple
+
+import numpy as np
+
+from chess.board_model import Board
+from chess.piece_model import ChessPiece, Pawn, Knight, Bishop, Rook, Queen, King
+from chess.tables import TABLES, ROOK_DIRECTIONS, BISHOP_DIRECTIONS, QUEEN_DIRECTIONS
+
+if TYPE_CHECKING:
+    from chess.GameState import GameState
+
+DRAW = -1
+ILLEGAL = -2
+MATERIALS = ("KQK", "KRK", "KPK", "KBNK")
+TABLEBASE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "tablebases")
+
+LETTERS: dict[str, type[ChessPiece]] = {"P": Pawn, "N": Knight, "B": Bishop, "R": Rook, "Q": Queen, "K": King}
+SLIDER_DIRECTIONS = {Rook: ROOK_DIRECTIONS, Bishop: BISHOP_DIRECTIONS, Queen: QUEEN_DIRECTIONS}
+NONE = 64  # off board entry of the step tables
+
+
+def _square(col: int, row: int) -> int:
+    return row * 8 + col
+
+
+def _step_table(targets) -> np.ndarray:
+    table = np.full((64, 8), NONE, dtype=np.int64)
+    for row in range(8):
+        for col in range(8):
+            for k, (to_col, to_row) in enumerate(targets[row][col]):
+                table[_square(col, row), k] = _square(to_col, to_row)
+    return table
+
+
+def _adjacency(steps: np.ndarray) -> np.ndarray:
+    adjacent = np.zeros((65, 65), dtype=bool)
+    for square in range(64):
+        adjacent[square, steps[square][steps[square] != NONE]] = True
+    return adjacent
+
+
+def _ray_table(direction) -> np.ndarray:
+    table = np.full((64, 7), NONE, dtype=np.int64)
+    for square in range(64):
+        for k, pos in enumerate(TABLES.rays[direction][square // 8][square % 8]):
+            table[square, k] = _square(*pos)
+    return table
+
+
+def _line_tables(rays) -> tuple[dict[type[ChessPiece], np.ndarray], np.ndarray]:
+    """Which squares each slider sees from each square on an empty board, and the squares in between."""
+    lines = {piece: np.zeros((65, 65), dtype=bool) for piece in SLIDER_DIRECTIONS}
+    between = np.zeros((65, 65), dtype=np.uint64)
+    for piece, directions in SLIDER_DIRECTIONS.items():
+        for direction in directions:
+            for square in range(64):
+                mask = 0
+                for target in rays[direction][square]:
+                    if target == NONE:
+                        break
+                    lines[piece][square, target] = True
+                    between[square, target] = mask
+                    mask |= 1 << int(target)
+    return lines, between
+
+
+# everything below comes from the same move tables MoveGenerator uses
+KING_STEPS = _step_table(TABLES.king)
+KNIGHT_STEPS = _step_table(TABLES.knight)
+KING_ADJACENT = _adjacency(KING_STEPS)
+KNIGHT_ADJACENT = _adjacency(KNIGHT_STEPS)
+PAWN_ATTACKS = _adjacency(_step_table(TABLES.pawn_attacks["white"]))
+RAYS = {direction: _ray_table(direction) for direction in QUEEN_DIRECTIONS}
+LINES, BETWEEN = _line_tables(RAYS)
+
+
+class TablebaseResult(NamedTuple):
+    wdl: int  # 1 the side to move wins, 0 draw, -1 it loses
+    dtm: int  # plies until mate with best play, 0 for draws
+
+
+class _Placement:
+    """Squares of the pieces of a batch of positions, decoded from their indexes."""
+    def __init__(self, pieces: list[type[ChessPiece]], index: np.ndarray):
+        count = len(pieces)
+        self.pieces = pieces
+        self.index = index
+        self.squares = [(index >> (6 * (count - 1 - j))) & 63 for j in range(count)]
+
+    def attacked(self, target: np.ndarray, exclude: np.ndarray | None = None) -> np.ndarray:
+        """Whether white attacks target with the black king lifted, exclude masks a piece being captured there."""
+        squares = self.squares
+        attacked = KING_ADJACENT[squares[0], target]
+        for j in range(2, len(squares)):
+            piece, square = self.pieces[j], squares[j]
+            if piece is Knight:
+                hits = KNIGHT_ADJACENT[square, target]
+            elif piece is Pawn:
+                hits = PAWN_ATTACKS[square, target]
+            else:
+                hits = LINES[piece][square, target]
+                between = BETWEEN[square, target]
+                for blocker in [squares[0]] + squares[2:]:
+                    hits &= (between >> blocker.astype(np.uint64)) & np.uint64(1) == 0
+            if exclude is not None:
+                hits &= ~(exclude == j)
+            attacked = attacked | hits
+        return attacked
+
+    def occupied(self, square: np.ndarray, ignore: int | None = None) -> np.ndarray:
+        hit = np.zeros(square.shape, dtype=bool)
+        for j, other in enumerate(self.squares):
+            if j != ignore:
+                hit |= other == square
+        return hit
+
+    def black_moves(self):
+        """Yield (target, legal, captured piece or -1) for the eight king steps of black."""
+        king = self.squares[1]
+        for k in range(8):
+            target = KING_STEPS[king, k]
+            captured = np.full(target.shape, -1, dtype=np.int64)
+            for j in range(2, len(self.squares)):
+                captured[self.squares[j] == target] = j
+            legal = (target != NONE) & (target != self.squares[0])
+            legal &= ~self.attacked(target, exclude=captured)
+            yield target, legal, captured
+
+
+def _legal(placement: _Placement) -> np.ndarray:
+    squares = placement.squares
+    legal = ~KING_ADJACENT[squares[0], squares[1]]
+    for j in range(len(squares)):
+        for other in range(j + 1, len(squares)):
+            legal &= squares[j] != squares[other]
+    for j, piece in enumerate(placement.pieces):
+        if piece is Pawn:
+            legal &= (squares[j] >= 8) & (squares[j] < 56)
+    return legal
+
+
+class Generator:
+    """Retrograde analysis of one material set, see generate_table."""
+    def __init__(self, material: str, tables: dict[str, np.ndarray]):
+        self.material = material
+        self.pieces: list[type[ChessPiece]] = [King, King] + [LETTERS[letter] for letter in material[1:-1]]
+        self.count = len(self.pieces)
+        self.size = 64 ** self.count
+        self.tables = tables
+        self.values = np.full((2, self.size), ILLEGAL, dtype=np.int8)
+
+    def _shift(self, j: int) -> int:
+        return 6 * (self.count - 1 - j)
+
+    def _initialize(self, chunk: int = 1 << 20) -> np.ndarray:
+        """Mark legal positions as undecided, and find the checkmates."""
+        mates = []
+        for start in range(0, self.size, chunk):
+            placement = _Placement(self.pieces, np.arange(start, min(start + chunk, self.size), dtype=np.int64))
+            legal = _legal(placement)
+            in_check = placement.attacked(placement.squares[1])
+            white_to_move = legal & ~in_check
+            self.values[0, placement.index[white_to_move]] = DRAW
+
+            has_move = np.zeros(legal.shape, dtype=bool)
+            for _, move_legal, _ in placement.black_moves():
+                has_move |= move_legal
+            self.values[1, placement.index[legal]] = DRAW
+            mated = legal & in_check & ~has_move
+            self.values[1, placement.index[mated]] = 0
+            mates.append(placement.index[mated])
+        return np.concatenate(mates)
+
+    def _promotions(self) -> dict[int, list[np.ndarray]]:
+        """White to move wins reached by promoting the pawn, looked up in the queen and rook tables."""
+        seeds: dict[int, list[np.ndarray]] = {}
+        if Pawn not in self.pieces:
+            return seeds
+        pawn = self.pieces.index(Pawn)
+        index = np.flatnonzero(self.values[0] != ILLEGAL)
+        placement = _Placement(self.pieces, index)
+        square = placement.squares[pawn]
+        target = square - 8
+        ready = (square < 16) & ~placement.occupied(target, ignore=pawn)
+        index, target = index[ready], target[ready]
+        best = np.full(index.shape, 127, dtype=np.int64)
+        for letter in ("Q", "R"):
+            table = self.tables[self.material.replace("P", letter)][1]
+            promoted = index - (8 << self._shift(pawn))
+            value = table[promoted].astype(np.int64)
+            best = np.where(value >= 0, np.minimum(best, value + 1), best)
+        for ply in np.unique(best[best < 127]):
+            seeds.setdefault(int(ply), []).append(index[best == ply])
+        return seeds
+
+    def _white_unmoves(self, index: np.ndarray) -> np.ndarray:
+        """White to move positions one white move before the positions."""
+        placement = _Placement(self.pieces, index)
+        found = []
+        for j, piece in enumerate(self.pieces):
+            if j == 1:
+                continue
+            square = placement.squares[j]
+            sources = []
+            if piece is King:
+                sources = [KING_STEPS[square, k] for k in range(8)]
+            elif piece is Knight:
+                sources = [KNIGHT_STEPS[square, k] for k in range(8)]
+            elif piece is Pawn:
+                single = np.where(square < 48, square + 8, NONE)
+                double = np.where((square >= 32) & (square < 40) & ~placement.occupied(square + 8), square + 16, NONE)
+                sources = [single, double]
+            else:
+                for direction in SLIDER_DIRECTIONS[piece]:
+                    open_ray = np.ones(index.shape, dtype=bool)
+                    for k in range(7):
+                        source = RAYS[direction][square, k]
+                        open_ray &= (source != NONE) & ~placement.occupied(source)
+                        sources.append(np.where(open_ray, source, NONE))
+            for source in sources:
+                valid = (source != NONE) & ~placement.occupied(source, ignore=j)
+                if not valid.any():
+                    continue
+                previous = index[valid] + ((source[valid] - square[valid]) << self._shift(j))
+                found.append(previous)
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        previous = np.unique(np.concatenate(found))
+        # legal (black not in check, kings apart) and still undecided
+        return previous[self.values[0, previous] == DRAW]
+
+    def _black_unmoves(self, index: np.ndarray) -> np.ndarray:
+        """Black to move positions one black king step before the positions."""
+        placement = _Placement(self.pieces, index)
+        king = placement.squares[1]
+        found = []
+        for k in range(8):
+            source = KING_STEPS[king, k]
+            valid = (source != NONE) & ~placement.occupied(source, ignore=1)
+            found.append(index[valid] + ((source[valid] - king[valid]) << self._shift(1)))
+        previous = np.unique(np.concatenate(found))
+        return previous[self.values[1, previous] == DRAW]
+
+    def _lost(self, index: np.ndarray) -> np.ndarray:
+        """Which black to move positions only have moves into won white to move positions."""
+        placement = _Placement(self.pieces, index)
+        lost = np.ones(index.shape, dtype=bool)
+        has_move = np.zeros(index.shape, dtype=bool)  # stalemates are not lost
+        king = placement.squares[1]
+        for target, legal, captured in placement.black_moves():
+            has_move |= legal
+            lost &= ~(legal & (captured >= 0))  # taking a piece draws
+            quiet = legal & (captured < 0)
+            following = index[quiet] + ((target[quiet] - king[quiet]) << self._shift(1))
+            won = np.ones(index.shape, dtype=bool)
+            won[quiet] = self.values[0, following] > 0
+            lost &= won
+        return index[lost & has_move]
+
+    def generate(self) -> np.ndarray:
+        frontier = self._initialize()
+        seeds = self._promotions()
+        ply = 0
+        while len(frontier) or any(seed > ply for seed in seeds):
+            ply += 1
+            won = [self._white_unmoves(frontier)] + [
+                seed[self.values[0, seed] == DRAW] for seed in seeds.get(ply, [])
+            ]
+            won = np.unique(np.concatenate(won))
+            self.values[0, won] = ply
+            ply += 1
+            candidates = self._black_unmoves(won) if len(won) else won
+            frontier = self._lost(candidates)
+            self.values[1, frontier] = ply
+        return self.values
+
+
+def generate_table(material: str, tables: dict[str, np.ndarray] | None = None) -> np.ndarray:
+    """Solve the material set by retrograde analysis, KPK needs the KQK and KRK tables."""
+    if material not in MATERIALS:
+        raise ValueError(f"Unsupported material {material!r}, expected one of {', '.join(MATERIALS)}.")
+    return Generator(material, tables or {}).generate()
+
+
+class Tablebases:
+    """Tables loaded on first use from the directory, memory-mapped so a probe is one array read."""
+    def __init__(self, directory: str = TABLEBASE_DIR):
+        self.directory = directory
+        self._tables: dict[str, np.ndarray | None] = {}
+
+    def table(self, material: str) -> np.ndarray | None:
+        if material not in self._tables:
+            path = os.path.join(self.directory, f"{material}.npy")
+            self._tables[material] = np.load(path, mmap_mode="r") if os.path.exists(path) else None
+        return self._tables[material]
+
+    def probe(self, board: Board) -> TablebaseResult | None:
+        """Exact result of the position for the side to move, None if no table covers it."""
+        if (board.width, board.height) != (8, 8) or board.castling:
+            return None
+        pieces = {"white": [], "black": []}
+        for col, row, piece in board.yield_all_pieces():
+            pieces[piece.color].append((piece, col, row))
+        strong = "white" if len(pieces["white"]) > 1 else "black"
+        weak = "black" if strong == "white" else "white"
+        if len(pieces[weak]) != 1:
+            return None
+        if all(isinstance(piece, (King, Knight, Bishop)) for piece, _, _ in pieces[strong]) and len(pieces[strong]) <= 2:
+            return TablebaseResult(0, 0)  # a lone minor piece cannot mate
+        # the strong side plays up the board as white in the table
+        flip = strong == "black"
+        letters = {repr(piece): (col, 7 - row if flip else row) for piece, col, row in pieces[strong]}
+        for material in MATERIALS:
+            extras = material[1:-1]
+            if sorted(letters) != sorted("K" + extras) or len(letters) != len(pieces[strong]):
+                continue
+            table = self.table(material)
+            if table is None:
+                return None
+            weak_king = pieces[weak][0]
+            placement = [letters["K"], (weak_king[1], 7 - weak_king[2] if flip else weak_king[2])]
+            placement += [letters[letter] for letter in extras]
+            index = 0
+            for col, row in placement:
+                index = index << 6 | _square(col, row)
+            strong_to_move = board.turn == strong
+            value = int(table[0 if strong_to_move else 1, index])
+            if value == ILLEGAL:
+                return None
+            if value == DRAW:
+                return TablebaseResult(0, 0)
+            return TablebaseResult(1 if strong_to_move else -1, value)
+        return None
+
+    def best_move(self, game_state: "GameState") -> int | None:
+        """The move keeping the best result, None if the position or a child is not covered."""
+        if self.probe(game_state.board_model) is None:
+            return None
+        best, best_score = None, None
+        for move in game_state.legal_moves():
+            game_state.make_move(move)
+            result = self.probe(game_state.board_model)
+            game_state.unmake_move()
+            if result is None:
+                continue
+            # the child is scored from the opponent's side: its loss is our win
+            score = (-result.wdl, result.dtm if result.wdl > 0 else -result.dtm)
+            if best_score is None or score > best_score:
+                best, best_score = move, score
+        return best
+
+
+@lru_cache(maxsize=None)
+def default_tablebases() -> Tablebases:
+    return Tablebases()
@@ -0,0 +1,124 @@
+from functools import lru_cache
+from typing import NamedTuple
+
+Pos = tuple[int, int]
+
+KNIGHT_OFFSETS = ((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2))
+KING_OFFSETS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+ROOK_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+BISHOP_DIRECTIONS = ((-1, -1), (1, -1), (-1, 1), (1, 1))
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+PAWN_DIRECTIONS = {"white": -1, "black": 1}
+
+# castling right bits, white plays from the bottom row
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+
+# 10x12 mailbox: the 8x8 board sits inside a frame of OFF_BOARD cells, two rows deep at the top
+# and bottom, so any knight or king step from a real square lands in the list
+MAILBOX_WIDTH = 10
+OFF_BOARD = object()
+
+
+def mailbox_index(col: int, row: int) -> int:
+    return (row + 2) * MAILBOX_WIDTH + col + 1
+
+
+class CastlingRule(NamedTuple):
+    right: int
+    color: str
+    king: Pos  # home squares of the king and rook
+    rook: Pos
+    king_to: Pos
+    rook_to: Pos
+    empty: tuple[Pos, ...]  # squares between king and rook
+    safe: tuple[Pos, ...]  # squares the king crosses, its home square included
+
+
+class MoveTables:
+    """On-board targets of every piece from every square of a width x height board, indexed [row][col]."""
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.knight = self._steps(KNIGHT_OFFSETS)
+        self.king = self._steps(KING_OFFSETS)
+        # squares a pawn of the color attacks, and the squares in front of it: two from its home row, else one
+        self.pawn_attacks = {
+            color: self._steps(((-1, direction), (1, direction)))
+            for color, direction in PAWN_DIRECTIONS.items()
+        }
+        self.pawn_pushes = {
+            color: [[self._ray(col, row, 0, direction)[:2 if row == self.pawn_home_row(color) else 1]
+                     for col in range(width)] for row in range(height)]
+            for color, direction in PAWN_DIRECTIONS.items()
+        }
+        self.promotion_rows = {"white": 0, "black": height - 1}
+        # rays[direction][row][col] lists the squares from the nearest outwards
+        self.rays: dict[Pos, list[list[tuple[Pos, ...]]]] = {
+            (dx, dy): [[self._ray(col, row, dx, dy) for col in range(width)] for row in range(height)]
+            for dx, dy in QUEEN_DIRECTIONS
+        }
+        self.castling = self._castling_rules()
+        # rights lost when a piece leaves or lands on the square
+        self.castling_masks: dict[Pos, int] = {}
+        for rule in self.castling:
+            for square in (rule.king, rule.rook):
+                self.castling_masks[square] = self.castling_masks.get(square, 0) | rule.right
+
+    def pawn_home_row(self, color: str) -> int:
+        """Row the pawns of the color start on, the only one they may advance two squares from."""
+        return self.height - 2 if color == "white" else 1
+
+    def _castling_rules(self) -> tuple[CastlingRule, ...]:
+        """King on the middle file, rooks in the corners, the king moving two squares; none on too narrow boards."""
+        king_col = self.width // 2
+        if king_col - 2 < 1 or king_col + 2 > self.width - 2:
+            return ()
+        rules = []
+        for color, row, (kingside, queenside) in (("white", self.height - 1, (WHITE_KINGSIDE, WHITE_QUEENSIDE)),
+                                                  ("black", 0, (BLACK_KINGSIDE, BLACK_QUEENSIDE))):
+            for right, rook_col, step in ((kingside, self.width - 1, 1), (queenside, 0, -1)):
+                rules.append(CastlingRule(
+                    right, color, (king_col, row), (rook_col, row),
+                    (king_col + 2 * step, row), (king_col + step, row),
+                    tuple((col, row) for col in range(min(king_col, rook_col) + 1, max(king_col, rook_col))),
+                    tuple((king_col + offset * step, row) for offset in range(3)),
+                ))
+        return tuple(rules)
+
+    def castling_rule(self, king_to: Pos) -> CastlingRule | None:
+        """The castling move whose king lands on the square."""
+        for rule in self.castling:
+            if rule.king_to == king_to:
+                return rule
+        return None
+
+    def _on_board(self, col: int, row: int) -> bool:
+        return 0 <= col < self.width and 0 <= row < self.height
+
+    def _steps(self, offsets) -> list[list[tuple[Pos, ...]]]:
+        return [
+            [tuple((col + dx, row + dy) for dx, dy in offsets if self._on_board(col + dx, row + dy))
+             for col in range(self.width)]
+            for row in range(self.height)
+        ]
+
+    def _ray(self, col: int, row: int, dx: int, dy: int) -> tuple[Pos, ...]:
+        squares = []
+        col, row = col + dx, row + dy
+        while self._on_board(col, row):
+            squares.append((col, row))
+            col, row = col + dx, row + dy
+        return tuple(squares)
+
+
+@lru_cache(maxsize=None)
+def _tables(width: int, height: int) -> MoveTables:
+    return MoveTables(width, height)
+
+
+def tables_for(width: int = 8, height: int | None = None) -> MoveTables:
+    """The tables of the geometry, built once and shared by every board of it. Height defaults to width."""
+    return _tables(width, height or width)
+
+
+TABLES = tables_for(8)
@@ -0,0 +1,70 @@
+from collections import OrderedDict
+from enum import Enum, auto
+from typing import Any
+
+
+class ReplacementPolicy(Enum):
+    ALWAYS = auto()  # a new entry always overwrites its slot
+    DEPTH = auto()   # keep whichever entry in the slot was computed to the greater depth
+    LRU = auto()     # fully associative, evicts the least recently used entry
+
+
+class TranspositionTable:
+    """Bounded cache keyed by the Zobrist key of a position."""
+    def __init__(self, capacity: int = 1 << 16, policy: ReplacementPolicy = ReplacementPolicy.ALWAYS):
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive.")
+        self.capacity = capacity
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+
+    def clear(self):
+        self._lru: OrderedDict[int, Any] = OrderedDict()
+        self._keys: list[int | None] = [None] * self.capacity if self.policy != ReplacementPolicy.LRU else []
+        self._values: list[Any] = [None] * len(self._keys)
+        self._depths: list[int] = [0] * len(self._keys)
+
+    def get(self, key: int, depth: int = 0) -> Any | None:
+        """Return the stored value if it was computed to at least depth."""
+        if self.policy == ReplacementPolicy.LRU:
+            if key in self._lru:
+                depth_stored, value = self._lru[key]
+                if depth_stored >= depth:
+                    self._lru.move_to_end(key)
+                    self.hits += 1
+                    return value
+        else:
+            slot = key % self.capacity
+            if self._keys[slot] == key and self._depths[slot] >= depth:
+                self.hits += 1
+                return self._values[slot]
+        self.misses += 1
+        return None
+
+    def store(self, key: int, value: Any, depth: int = 0):
+        if self.policy == ReplacementPolicy.LRU:
+            self._lru[key] = (depth, value)
+            self._lru.move_to_end(key)
+            if len(self._lru) > self.capacity:
+                self._lru.popitem(last=False)
+            return
+
+        slot = key % self.capacity
+        if self.policy == ReplacementPolicy.DEPTH and self._keys[slot] not in (None, key) \
+            and self._depths[slot] > depth:
+            return
+        self._keys[slot] = key
+        self._values[slot] = value
+        self._depths[slot] = depth
+
+    def __contains__(self, key: int) -> bool:
+        if self.policy == ReplacementPolicy.LRU:
+            return key in self._lru
+        return self._keys[key % self.capacity] == key
+
+    def __len__(self) -> int:
+        if self.policy == ReplacementPolicy.LRU:
+            return len(self._lru)
+        return sum(key is not None for key in self._keys)
@@ -1,10 +1,10 @@
 from PySide6 import QtCore as qtc, QtWidgets as qtw, QtGui as qtg
 
 from chess.piece_model import ChessPiece
-from chess.piece_view import PieceView
-from chess.chessboard import Chessboard
+from chess.piece_view import PieceView, preload_sprites
+from chess.chessboard import Chessboard, PixmapChessboard
 
-from features.promotion_selection import PromotionSelection
+from features.promotion_selection import PromotionSelection, BUTTON_SIZE
 from features.ending_screen import EndingScreen
 
 from chess.MoveTypes import Move
@@ -14,20 +14,34 @@ class VisualManager(qtc.QObject):
     released = qtc.Signal(int, int, int, int)
     
     
-    def __init__(self, square_size: int, scene: qtw.QGraphicsScene):
+    def __init__(self, square_size: int, scene: qtw.QGraphicsScene,
+                 board_type: type[Chessboard] | type[PixmapChessboard] = PixmapChessboard):
         super().__init__()
         self.square_size = square_size
+        self.board_type = board_type
         self.scene = scene
         self.pieces: dict[tuple[int, int], PieceView] = {}
+        self.board: Chessboard | PixmapChessboard | None = None
         
     
-    def _start_board(self):
-        self.board = Chessboard(8, 8, self.square_size)
-        self.scene.addItem(self.board)
+    def _start_board(self, cols: int, rows: int):
+        # a new game reuses the board, only the pieces are put back, unless the board size changed
+        if self.board is not None and (self.board.length, self.board.width) != (cols, rows):
+            self.scene.removeItem(self.board)
+            self.board = None
+        if self.board is None:
+            self.board = self.board_type(cols, rows, self.square_size)
+            self.scene.addItem(self.board)
+        else:
+            self.board.reset()
+        for piece_view in self.pieces.values():
+            self.scene.removeItem(piece_view)
+        self.pieces.clear()
         self.board.play_wave_animation()
         
     def start(self, board: list[list[ChessPiece | None]]):    
-        self._start_board()
+        self._start_board(len(board[0]), len(board))
+        preload_sprites(self.square_size, BUTTON_SIZE)
         for row in range(len(board)):
             for col in range(len(board[0])):
                 piece = board[row][col]
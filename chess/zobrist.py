@@ -0,0 +1,39 @@
+from functools import lru_cache
+import random
+
+from chess.piece_model import ChessPiece, Pawn, Knight, Bishop, Rook, Queen, King, TestPiece
+
+SEED = 0x5EED_C4E55
+PIECE_TYPES: tuple[type[ChessPiece], ...] = (Pawn, Knight, Bishop, Rook, Queen, King, TestPiece)
+COLORS = ("white", "black")
+
+
+class ZobristKeys:
+    """Random 64-bit keys for every piece on every square plus the side, castling and en passant state."""
+    def __init__(self, width: int, height: int):
+        # square boards keep their original seed, so stored hashes of 8x8 positions stay valid
+        rng = random.Random(SEED + (width if width == height else height << 8 | width))
+        self.width = width
+        self.height = height
+        # pieces are flyweights, so the shared instance itself is the key
+        self.pieces: dict[ChessPiece, list[int]] = {
+            piece_type(color): [rng.getrandbits(64) for _ in range(width * height)]
+            for piece_type in PIECE_TYPES for color in COLORS
+        }
+        self.black_to_move = rng.getrandbits(64)
+        self.castling = [rng.getrandbits(64) for _ in range(16)]
+        self.castling[0] = 0  # no rights hash to nothing, so an empty board has key 0
+        self.en_passant = [rng.getrandbits(64) for _ in range(width)]  # by column
+
+    def piece(self, piece: ChessPiece, col: int, row: int) -> int:
+        return self.pieces[piece][row * self.width + col]
+
+
+def zobrist_keys(width: int = 8, height: int | None = None) -> ZobristKeys:
+    """The key set shared by every board of the size, so equal positions hash equally."""
+    return _zobrist_keys(width, height or width)
+
+
+@lru_cache(maxsize=None)
+def _zobrist_keys(width: int, height: int) -> ZobristKeys:
+    return ZobristKeys(width, height)
@@ -2,9 +2,12 @@ from PySide6 import QtMultimedia as qtmm
 from PySide6 import QtCore as qtc
 from pathlib import Path
 import random
+import logging
 
 DIRECTORY = Path("data/sound")
 
+logger = logging.getLogger(__name__)
+
 PLACE_EFFECTS = "place-{0}.wav"
 CLOCK_TICK = "clock_tick.wav"
 FANFARE = "fanfare.wav"
@@ -26,7 +29,7 @@ class AudioMaster(qtc.QObject):
         effect = qtmm.QSoundEffect(self)
         
         if not filepath.exists():
-            print(f'[AudioMaster] Sound file not found: {filepath}')
+            logger.warning("sound file not found: %s", filepath)
         
         effect.setSource(qtc.QUrl.fromLocalFile(str(filepath)))
         effect.setVolume(volume)
@@ -0,0 +1,68 @@
+from PySide6 import QtCore as qtc
+
+from chess.GameState import GameState
+from chess.engine import Engine, SearchResult
+from chess.move_encoding import PROMOTION, from_square, to_square, move_flags, promotion_kind
+from chess.opening_book import OpeningBook
+from chess.tablebase import default_tablebases
+
+class SearchWorker(qtc.QObject):
+    """Runs the engine inside the computer player's thread."""
+
+    iteration = qtc.Signal(int, int, int)  # depth, nodes, nodes per second
+    move_found = qtc.Signal(int, int, int, int, str, int)  # from col, from row, to col, to row, promotion letter, token
+
+    def __init__(self, think_time: float, book_path: str | None = None):
+        super().__init__()
+        self.engine = Engine(book=OpeningBook(book_path) if book_path else None, tablebases=default_tablebases())
+        self.think_time = think_time
+
+    @qtc.Slot(object, int)
+    def search(self, game_state: GameState, token: int):
+        result = self.engine.search(game_state, self.think_time, on_iteration=self._report)
+        move = result.move
+        if move is None:
+            return
+        width = game_state.board_model.width
+        from_row, from_col = divmod(from_square(move), width)
+        to_row, to_col = divmod(to_square(move), width)
+        promotion = "PNBRQK"[promotion_kind(move)] if move_flags(move) & PROMOTION else ""
+        self.move_found.emit(from_col, from_row, to_col, to_row, promotion, token)
+
+    def _report(self, result: SearchResult):
+        self.iteration.emit(result.depth, result.nodes, result.nps)
+
+
+class ComputerPlayer(qtc.QObject):
+    """Plays one color with the engine on its own QThread."""
+
+    requested = qtc.Signal(object, int)
+    iteration = qtc.Signal(int, int, int)
+    move_found = qtc.Signal(int, int, int, int, str, int)
+
+    def __init__(self, color: str, think_time: float = 2.0, book_path: str | None = None, parent=None):
+        super().__init__(parent)
+        self.color = color
+
+        self.worker = SearchWorker(think_time, book_path)
+        self.thread = qtc.QThread(self)
+        self.worker.moveToThread(self.thread)
+
+        self.requested.connect(self.worker.search)
+        self.worker.iteration.connect(self.iteration)
+        self.worker.move_found.connect(self.move_found)
+
+        if (app := qtc.QCoreApplication.instance()) is not None:
+            app.aboutToQuit.connect(self.stop)
+        self.thread.start()
+
+    def think(self, game_state: GameState, token: int = 0):
+        """Search a copy of the position, move_found echoes the token."""
+        self.worker.engine.stop_event.clear()
+        self.requested.emit(game_state.copy(), token)
+
+    @qtc.Slot()
+    def stop(self):
+        self.worker.engine.stop()
+        self.thread.quit()
+        self.thread.wait()
@@ -9,6 +9,9 @@ class EndingScreen(qtw.QDialog):
         "white": ("You Win!", "Congratulations 🎉", "#00ff00"),
         "black": ("You Lose", "Uh oh.", "#ff0000"),
         "stalemate": ("Stalemate", "It's a draw.", "#0000ff"),
+        "draw": ("Draw", "Neither side can win.", "#0000ff"),
+        "repetition": ("Draw", "The same position came up three times.", "#0000ff"),
+        "fifty moves": ("Draw", "Fifty moves without a capture or pawn move.", "#0000ff"),
         "time out": ("Time's Up!", "That is bad.", "#ffa500"),}
     X_offset = 10
     Y_offset = 50
@@ -1,5 +1,107 @@
+import logging
+from array import array
+from typing import Iterable
+
 from PySide6 import QtCore as qtc, QtWidgets as qtw, QtGui as qtg
-from chess.MoveTypes import Move, MoveType
+from chess.MoveTypes import Move
+from chess.piece_model import KNIGHT, BISHOP, ROOK, QUEEN, KING
+from chess.move_encoding import (CAPTURE, EN_PASSANT, CASTLE, PROMOTION,
+                                 SUFFIX_SHIFT, CHECK_SUFFIX, CHECKMATE_SUFFIX, DRAW_SUFFIX, SQUARE_MASK, TO_SHIFT,
+                                 FLAGS_SHIFT, PROMOTION_SHIFT, KIND_SHIFT, encode_move)
+
+logger = logging.getLogger(__name__)
+
+# history entries are packed moves (chess.move_encoding) with their notation suffix
+SKIPPED = 0  # square 0 to itself, stands in for the white move of a game started with black to move
+KIND_LETTERS = {KNIGHT: "N", BISHOP: "B", ROOK: "R", QUEEN: "Q", KING: "K"}
+
+
+def format_move(encoded: int, width: int = 8, height: int = 8) -> str:
+    if encoded == SKIPPED:
+        return "..."
+    from_col = (encoded & SQUARE_MASK) % width
+    to_row, to_col = divmod(encoded >> TO_SHIFT & SQUARE_MASK, width)
+    flags = encoded >> FLAGS_SHIFT & 31
+    kind = encoded >> KIND_SHIFT & 7
+    notation = ""
+    if flags & CASTLE:
+        if to_col > from_col:
+            notation = "O-O"
+        else:
+            notation = "O-O-O"
+    else:
+        notation += KIND_LETTERS.get(kind, "")
+        if flags & (CAPTURE | EN_PASSANT):
+            if kind not in KIND_LETTERS:
+                notation += chr(from_col + ord('a'))
+            notation += "x"
+        notation += chr(to_col + ord('a')) + str(height - to_row)
+
+        if flags & PROMOTION:
+            notation += "=" + KIND_LETTERS.get(encoded >> PROMOTION_SHIFT & 7, "?")
+    suffix = encoded >> SUFFIX_SHIFT & 3
+    if suffix == CHECKMATE_SUFFIX:
+        notation += "#"
+    elif suffix == DRAW_SUFFIX:
+        notation += "½-½"
+    elif suffix == CHECK_SUFFIX:
+        notation += "+"
+
+    if flags & EN_PASSANT:
+        notation += " e.p."
+
+    return notation
+
+
+class MoveHistoryModel(qtc.QAbstractTableModel):
+    """Move list as a table of full moves, backed by an array of encoded moves."""
+    HEADERS = ("#", "White", "Black")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.moves = array("I")
+        self.board_width = 8
+        self.board_height = 8
+
+    def rowCount(self, parent=qtc.QModelIndex()) -> int:
+        return 0 if parent.isValid() else (len(self.moves) + 1) // 2
+
+    def columnCount(self, parent=qtc.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index: qtc.QModelIndex, role=qtc.Qt.ItemDataRole.DisplayRole):
+        if role != qtc.Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        if index.column() == 0:
+            return str(index.row() + 1)
+        ply = index.row() * 2 + index.column() - 1
+        return format_move(self.moves[ply], self.board_width, self.board_height) if ply < len(self.moves) else None
+
+    def headerData(self, section: int, orientation: qtc.Qt.Orientation, role=qtc.Qt.ItemDataRole.DisplayRole):
+        if role == qtc.Qt.ItemDataRole.DisplayRole and orientation == qtc.Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def extend(self, encoded_moves: Iterable[int]):
+        """Append moves with a single row insertion, however many there are."""
+        new_moves = array("I", encoded_moves)
+        if not new_moves:
+            return
+        rows = self.rowCount()
+        if len(self.moves) % 2:  # the black half of the last row gets filled in
+            self.moves.append(new_moves.pop(0))
+            black = self.index(rows - 1, 2)
+            self.dataChanged.emit(black, black)
+        if new_moves:
+            self.beginInsertRows(qtc.QModelIndex(), rows, rows + (len(new_moves) - 1) // 2)
+            self.moves.extend(new_moves)
+            self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.moves = array("I")
+        self.endResetModel()
+
 
 class HistoryDisplay(qtw.QWidget):
     def __init__(self, parent=None):
@@ -9,8 +111,7 @@ class HistoryDisplay(qtw.QWidget):
         self.view = qtw.QTableView(parent=self)
         self.view.setHorizontalScrollBarPolicy(qtc.Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
 
-        self.model = qtg.QStandardItemModel(0, 3, self)
-        self.model.setHorizontalHeaderLabels(["#", "White", "Black"])
+        self.model = MoveHistoryModel(self)
         self.view.setModel(self.model)
         
         header = self.view.horizontalHeader()
@@ -36,55 +137,28 @@ class HistoryDisplay(qtw.QWidget):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.addWidget(self.view)
     
-    def _format_move(self, move: Move) -> str:
-        piece = str(move['piece'])
-        to_col = move['to_col']
-        to_row = move['to_row']
-        notation = ""
-        if MoveType.CASTLE & move['type']:
-            if to_col == 6:
-                notation = "O-O"
-            else:
-                notation = "O-O-O"
-        else:
-            if piece.upper() != 'P':
-                notation += piece.upper()
-            if MoveType.CAPTURE & move['type']:
-                if piece.lower() == 'p':
-                    notation += chr(move['from_col'] + ord('a'))
-                notation += "x"
-            notation += chr(to_col + ord('a')) + str(8 - to_row)
-
-            if MoveType.PROMOTION & move['type']:
-                notation += "=" + str(move['promotion_piece']).upper()
-        if MoveType.CHECKMATE & move['type']:
-            notation += "#"
-        elif MoveType.STALEMATE & move['type']:
-            notation += "½-½"
-        elif MoveType.CHECK & move['type']:
-            notation += "+"
-
-        if MoveType.EN_PASSANT & move['type']:
-            notation += " e.p."
-
-        return notation
-    
     def add_move(self, move: Move, color: str) -> None:
-        print("Adding move to history:", move, color)
-        formatted_move = self._format_move(move)
-        if color == "white":
-            self._white_move(formatted_move)
+        logger.debug("%s move added to history: %s", color, move)
+        encoded = encode_move(move, self.model.board_width)
+        if color == "black" and not len(self.model.moves) % 2:
+            self.model.extend((SKIPPED, encoded))
         else:
-            self._black_move(formatted_move)
-    
-    def _white_move(self, move: str) -> None:
-        row = self.model.rowCount()
-        self.model.appendRow([])
-        self.model.setItem(row, 0, qtg.QStandardItem(str(row + 1)))
-        self.model.setItem(row, 1, qtg.QStandardItem(move))
-    def _black_move(self, move: str) -> None:
-        row = self.model.rowCount() - 1
-        self.model.setItem(row, 2, qtg.QStandardItem(move))
+            self.model.extend((encoded,))
+        self.view.scrollToBottom()
+
+    def add_moves(self, encoded_moves: Iterable[int]) -> None:
+        """Append a whole game or line at once, as encoded by encode_move."""
+        self.model.extend(encoded_moves)
+        self.view.scrollToBottom()
+
+    def clear(self) -> None:
+        self.model.clear()
+
+    def new_game(self, width: int, height: int) -> None:
+        """Drop the moves of the previous game and take the board size, needed to unpack and name the squares."""
+        self.model.clear()
+        self.model.board_width = width
+        self.model.board_height = height
     
 if __name__ == "__main__":
     import sys
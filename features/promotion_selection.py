@@ -1,14 +1,20 @@
+import logging
+
 from PySide6 import QtCore as qtc, QtWidgets as qtw, QtGui as qtg
 from PySide6.QtCore import Qt
-from chess.piece_view import SPRITE_PATHS
+from chess.piece_view import sprite
 import chess.piece_model as piece_model
 
+logger = logging.getLogger(__name__)
+
+BUTTON_SIZE = 50
+
 class PromotionSelection(qtw.QDialog):
     """
     PromotionSelection class to allow the player to choose a piece for pawn promotion.
     """
     
-    def __init__(self, color: str, parent=None, square_size=50):
+    def __init__(self, color: str, parent=None, square_size=BUTTON_SIZE):
         super().__init__(parent)
         self.setWindowTitle("Promote Pawn")
         self.setWindowFlags(Qt.WindowType.Dialog | Qt.WindowType.FramelessWindowHint)
@@ -29,7 +35,7 @@ class PromotionSelection(qtw.QDialog):
             button = qtw.QPushButton(self)
             
             button.setFixedSize(square_size, square_size)
-            button.setIcon(qtg.QIcon(SPRITE_PATHS[piece].format(color=color)))
+            button.setIcon(qtg.QIcon(sprite(piece, color, square_size)))
             button.setIconSize(qtc.QSize(square_size, square_size))
             button.setStyleSheet("""
                 QPushButton {
@@ -48,7 +54,7 @@ class PromotionSelection(qtw.QDialog):
     def select_piece(self, piece: piece_model.ChessPiece) -> None:
         """Set the selected piece and close the dialog."""
         self.selected_piece = piece
-        print(self.selected_piece)
+        logger.debug("promoting to %r", piece)
         self.accept()  # Close the dialog and signal that a piece has been selected
 
 
@@ -0,0 +1,19 @@
+from PySide6 import QtCore as qtc, QtWidgets as qtw
+
+class SearchStatsDisplay(qtw.QWidget):
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        layout = qtw.QHBoxLayout(self)
+        self.lbl_stats = qtw.QLabel(self.format_stats(0, 0, 0), self)
+        self.lbl_stats.setAlignment(qtc.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.lbl_stats)
+
+    @staticmethod
+    def format_stats(depth: int, nodes: int, nps: int) -> str:
+        return f"Depth: {depth}  Nodes: {nodes}  NPS: {nps}"
+
+    @qtc.Slot(int, int, int)
+    def update_stats(self, depth: int, nodes: int, nps: int):
+        self.lbl_stats.setText(self.format_stats(depth, nodes, nps))
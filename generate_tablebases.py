@@ -0,0 +1,58 @@
+"""
+Generate the endgame tables the engine and GameState.probe_tablebase read.
+
+    python generate_tablebases.py                 # every table into data/tablebases
+    python generate_tablebases.py KQK KRK -o /tmp/tables
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from chess.tablebase import MATERIALS, TABLEBASE_DIR, DRAW, generate_table
+
+# tables other tables are built from, KPK looks its promotions up in the queen and rook tables
+DEPENDENCIES = {"KPK": ("KQK", "KRK")}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate endgame tablebases by retrograde analysis.")
+    parser.add_argument("materials", nargs="*", default=list(MATERIALS),
+                        help=f"material sets to generate out of {', '.join(MATERIALS)}, all of them by default")
+    parser.add_argument("-o", "--output", default=TABLEBASE_DIR, help="directory the .npy tables are written to")
+    args = parser.parse_args(argv)
+    if unknown := set(args.materials) - set(MATERIALS):
+        parser.error(f"unsupported material {', '.join(sorted(unknown))}")
+
+    os.makedirs(args.output, exist_ok=True)
+    tables: dict[str, np.ndarray] = {}
+    for material in MATERIALS:
+        if material not in args.materials:
+            continue
+        for needed in DEPENDENCIES.get(material, ()):
+            if needed in tables:
+                continue
+            path = os.path.join(args.output, f"{needed}.npy")
+            if needed not in args.materials and os.path.exists(path):
+                tables[needed] = np.load(path)
+            else:
+                print(f"{material} needs {needed}, generating it first.")
+                tables[needed] = generate_table(needed, tables)
+
+        start = time.perf_counter()
+        values = tables.get(material)
+        if values is None:
+            values = tables[material] = generate_table(material, tables)
+        elapsed = time.perf_counter() - start
+        np.save(os.path.join(args.output, f"{material}.npy"), values)
+
+        white = values[0]
+        print(f"{material}: {elapsed:.1f}s, {(white > 0).sum()} won and {(white == DRAW).sum()} drawn "
+              f"with white to move, longest mate {white.max()} plies")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
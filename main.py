@@ -1,11 +1,43 @@
+import atexit
+import logging
+import os
+
 from PySide6 import QtCore as qtc, QtWidgets as qtw, QtGui as qtg
 
 from chess.controller import GameController
+from chess.instrumentation import STATS, PROFILER
 
 from features.time import TimeDisplay
+from features.search_stats import SearchStatsDisplay
 from features.history import HistoryDisplay
 
 SQUARE_SIZE = 75  # Default square size for the chessboard
+COMPUTER_COLOR = os.environ.get("CHESS_COMPUTER") or None  # side the engine plays ("white" or "black"), unset for two players
+THINK_TIME = 2.0  # seconds the engine searches per move
+OPENING_BOOK = "data/book.bin"  # Polyglot book the engine plays from while it knows the position
+PROFILE_SHORTCUT = "Ctrl+Shift+P"  # start/stop a cProfile capture, see chess/instrumentation.py
+STATS_SHORTCUT = "Ctrl+Shift+S"  # start/stop collecting counters and timings, logged when stopped
+
+
+def configure():
+    """Set up logging, statistics and profiling from the environment variables listed in chess/instrumentation.py."""
+    level = os.environ.get("CHESS_LOG", "WARNING").upper()
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logging.getLogger("chess").setLevel(level)
+    logging.getLogger("features").setLevel(level)
+
+    logger = logging.getLogger("chess.instrumentation")
+    stats, path = os.environ.get("CHESS_STATS"), os.environ.get("CHESS_PROFILE")
+    if stats or path:
+        # asking for statistics or a profile means wanting to read them
+        logger.setLevel(min(logger.getEffectiveLevel(), logging.INFO))
+    if stats:
+        STATS.enabled = True
+        atexit.register(lambda: logger.info("statistics\n%s", STATS.report()))
+    if path:
+        PROFILER.start(path)
+        atexit.register(PROFILER.stop)
+
 
 class MainWindow(qtw.QMainWindow):
     def __init__(self):
@@ -17,8 +49,8 @@ class MainWindow(qtw.QMainWindow):
         main_layout = qtw.QGridLayout(self)
         
         scene = qtw.QGraphicsScene(self)
-        controller = GameController(scene, SQUARE_SIZE)
-        controller.start_game()
+        book = OPENING_BOOK if os.path.exists(OPENING_BOOK) else None
+        controller = GameController(scene, SQUARE_SIZE, COMPUTER_COLOR, THINK_TIME, book)
         
         view = qtw.QGraphicsView(scene, self)
         view.setRenderHint(qtg.QPainter.RenderHint.Antialiasing)
@@ -30,13 +62,21 @@ class MainWindow(qtw.QMainWindow):
         controller.second_passed.connect(time_display.update_time)
         time_display.timer_ended.connect(lambda: controller.end("time out"))
         
+        stats_display = SearchStatsDisplay(self)
+        if controller.computer is not None:
+            controller.computer.iteration.connect(stats_display.update_stats)
+        else:
+            stats_display.hide()
+        
         history_display = HistoryDisplay(self)
         history_display.setSizePolicy(qtw.QSizePolicy.Policy.Expanding, qtw.QSizePolicy.Policy.Expanding)
         
         controller.moved.connect(history_display.add_move)
+        controller.started.connect(history_display.new_game)
         
         # Create a central widget
-        main_layout.addWidget(time_display, 0, 0, 1, 2)
+        main_layout.addWidget(time_display, 0, 0)
+        main_layout.addWidget(stats_display, 0, 1)
         main_layout.addWidget(view, 1, 0)
         main_layout.addWidget(history_display, 1, 1)
         
@@ -46,12 +86,27 @@ class MainWindow(qtw.QMainWindow):
         central.setLayout(main_layout)
         self.setCentralWidget(central)
         
+        profile_shortcut = qtg.QShortcut(qtg.QKeySequence(PROFILE_SHORTCUT), self)
+        profile_shortcut.activated.connect(PROFILER.toggle)
+        stats_shortcut = qtg.QShortcut(qtg.QKeySequence(STATS_SHORTCUT), self)
+        stats_shortcut.activated.connect(self.toggle_stats)
+        
+        controller.start_game()
+    
+    def toggle_stats(self):
+        STATS.enabled = not STATS.enabled
+        if STATS.enabled:
+            STATS.reset()
+        else:
+            logging.getLogger("chess.instrumentation").info("statistics\n%s", STATS.report())
+        
 
         
 
 
 if __name__ == "__main__":
     import sys
+    configure()
     app = qtw.QApplication(sys.argv)
     
     with open("style.qss", "r") as f:
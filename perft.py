@@ -0,0 +1,240 @@
+"""
+Headless perft benchmark and correctness suite for the move generators.
+
+    python perft.py                     # every position up to depth 3
+    python perft.py -p kiwipete -d 4 --divide
+    python perft.py --board bitboard -d 5
+    python perft.py --final-state
+    python perft.py -p start -d 5 --workers 4 --scaling
+"""
+import argparse
+import contextlib
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import NamedTuple
+
+from chess.GameState import GameState
+from chess.board_model import Board
+from chess.bitboard_model import BitboardBoard
+from chess.board_types import BOARD_TYPES
+from chess.piece_model import COLORS
+import chess.bitboard_generator as bitboard
+from chess.move_encoding import (
+    PROMOTION, SQUARE_MASK, TO_SHIFT, PROMOTION_SHIFT, MoveList, move_flags,
+)
+from chess.parallel import Snapshot, restore, split_root
+
+class PerftPosition(NamedTuple):
+    name: str
+    fen: str
+    nodes: tuple[int, ...]  # reference leaf counts for depth 1, 2, ...
+
+POSITIONS = [
+    PerftPosition("start", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+                  (20, 400, 8902, 197281, 4865609)),
+    PerftPosition("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                  (48, 2039, 97862, 4085603)),
+    PerftPosition("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+                  (14, 191, 2812, 43238, 674624)),
+    PerftPosition("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                  (6, 264, 9467, 422333)),
+    PerftPosition("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+                  (44, 1486, 62379, 2103487)),
+    PerftPosition("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+                  (46, 2079, 89890, 3894594)),
+    PerftPosition("illegal-en-passant", "3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1", (18, 92, 1670, 10138)),
+    PerftPosition("en-passant-check", "8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1", (15, 126, 1928, 13931)),
+    PerftPosition("short-castle-check", "5k2/8/8/8/8/8/8/4K2R w K - 0 1", (15, 66, 1198, 6399)),
+    PerftPosition("long-castle-check", "3k4/8/8/8/8/8/8/R3K3 w Q - 0 1", (16, 71, 1286, 7418)),
+    PerftPosition("castle-rights", "r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1", (26, 1141, 27826)),
+    PerftPosition("castle-prevented", "r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1", (44, 1494, 50509)),
+    PerftPosition("promote-out-of-check", "2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1", (11, 133, 1442, 19174)),
+    PerftPosition("discovered-check", "8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1", (29, 165, 5160, 31961)),
+    PerftPosition("promote-to-check", "4k3/1P6/8/8/8/8/K7/8 w - - 0 1", (9, 40, 472, 2661, 38983)),
+    PerftPosition("underpromote", "8/P1k5/K7/8/8/8/8/8 w - - 0 1", (6, 27, 273, 1329, 18135)),
+    PerftPosition("self-stalemate", "K1k5/8/P7/8/8/8/8/8 w - - 0 1", (2, 6, 13, 63, 382, 2217)),
+    PerftPosition("stalemate-checkmate", "8/k1P5/8/1K6/8/8/8/8 w - - 0 1", (10, 25, 268, 926, 10857, 43261)),
+    PerftPosition("double-check", "8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1", (37, 183, 6559, 23527)),
+]
+
+def move_name(move: int, width: int = 8, height: int = 8) -> str:
+    """Coordinate notation of the packed move on a width x height board, e.g. e7e8q."""
+    from_row, from_col = divmod(move & SQUARE_MASK, width)
+    to_row, to_col = divmod(move >> TO_SHIFT & SQUARE_MASK, width)
+    name = f"{chr(from_col + ord('a'))}{height - from_row}{chr(to_col + ord('a'))}{height - to_row}"
+    if move_flags(move) & PROMOTION:
+        name += "pnbrqk"[move >> PROMOTION_SHIFT & 7]
+    return name
+
+
+def legal_moves(game_state: GameState) -> MoveList:
+    """Every legal move of the side to move, with one move per promotion piece."""
+    return game_state.move_generator.legal_moves(game_state.current_turn)
+
+
+def perft(game_state: GameState, depth: int) -> int:
+    """Count the leaf nodes of the legal move tree through the MoveGenerator API."""
+    if depth == 0:
+        return 1
+    moves = legal_moves(game_state)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        undo = game_state.make_move(move)
+        nodes += perft(game_state, depth - 1)
+        game_state.unmake_move(undo)
+    return nodes
+
+
+def divide(game_state: GameState, depth: int) -> dict[str, int]:
+    """Leaf counts below every root move."""
+    counts = {}
+    board = game_state.board_model
+    for move in legal_moves(game_state):
+        undo = game_state.make_move(move)
+        counts[move_name(move, board.width, board.height)] = perft(game_state, depth - 1)
+        game_state.unmake_move(undo)
+    return counts
+
+
+def bitboard_divide(game_state: GameState, depth: int) -> dict[str, int]:
+    """Leaf counts below every root move, counted on the bitboards."""
+    generator: bitboard.BitboardMoveGenerator = game_state.move_generator #type: ignore
+    color = COLORS[game_state.current_turn]
+    bitboards = generator.board_state.bitboards
+    castling = generator.board_state.castling
+    counts = {}
+    for move in generator.legal_moves(game_state.current_turn):
+        after, after_castling, after_en_passant = bitboard.make_move(bitboards, move, color, castling)
+        counts[move_name(move)] = bitboard.perft(after, color ^ 1, after_castling, after_en_passant, depth - 1)
+    return counts
+
+
+def count_nodes(game_state: GameState, depth: int) -> int:
+    if isinstance(game_state.move_generator, bitboard.BitboardMoveGenerator):
+        return game_state.move_generator.perft(game_state.current_turn, depth) #type: ignore
+    return perft(game_state, depth)
+
+
+def _count_task(snap: Snapshot, depth: int) -> int:
+    return count_nodes(restore(snap), depth)
+
+
+def parallel_count(executor: Executor, game_state: GameState, depth: int) -> int:
+    """Count the leaves below every root move in its own worker process and add them up."""
+    if depth <= 1:
+        return count_nodes(game_state, depth)
+    moves = legal_moves(game_state)
+    return sum(split_root(executor, game_state, moves, _count_task, depth - 1))
+
+
+def _worker_counts(workers: int) -> list[int]:
+    counts = [1]
+    while counts[-1] * 2 < workers:
+        counts.append(counts[-1] * 2)
+    return counts + [workers] if workers > 1 else counts
+
+
+def run_scaling(position: PerftPosition, depth: int, board_type: type[Board], workers: int):
+    """Time the count of the deepest depth with 1, 2, 4 ... workers and print the speedup over one."""
+    game_state = GameState.from_fen(position.fen, board_type)
+    depth = min(depth, len(position.nodes))
+    print(f"{position.name} depth {depth} scaling:")
+    baseline = None
+    for count in _worker_counts(workers):
+        with ProcessPoolExecutor(count) as executor:
+            list(executor.map(abs, range(count)))  # start the processes before the clock does
+            start = time.perf_counter()
+            nodes = parallel_count(executor, game_state, depth)
+            elapsed = time.perf_counter() - start
+        rate = nodes / max(elapsed, 1e-9)
+        baseline = baseline or rate
+        print(f"  {count:>3} workers: {nodes:>10} nodes {elapsed:8.3f}s {rate:>12,.0f} nodes/s"
+              f"  x{rate / baseline:.2f} ({rate / baseline / count:.0%} efficiency)")
+
+
+def run_position(position: PerftPosition, depth: int, board_type: type[Board], show_divide: bool,
+                 executor: Executor | None = None) -> bool:
+    """Run one position up to depth, printing timings; returns whether every count matched."""
+    game_state = GameState.from_fen(position.fen, board_type)
+    depth = min(depth, len(position.nodes))
+    print(f"{position.name}: {position.fen}")
+    passed = True
+    total_nodes, total_time = 0, 0.0
+    for current in range(1, depth + 1):
+        start = time.perf_counter()
+        if executor is not None:
+            nodes = parallel_count(executor, game_state, current)
+        else:
+            nodes = count_nodes(game_state, current)
+        elapsed = time.perf_counter() - start
+        expected = position.nodes[current - 1]
+        status = "ok" if nodes == expected else f"FAIL (expected {expected})"
+        passed &= nodes == expected
+        total_nodes += nodes
+        total_time += elapsed
+        print(f"  depth {current}: {nodes:>10} nodes {elapsed:8.3f}s {nodes / max(elapsed, 1e-9):>12,.0f} nodes/s  {status}")
+    print(f"  total: {total_nodes} nodes {total_time:.3f}s {total_nodes / max(total_time, 1e-9):,.0f} nodes/s")
+
+    if show_divide:
+        counts = (bitboard_divide if board_type is BitboardBoard else divide)(game_state, depth)
+        for name, nodes in sorted(counts.items()):
+            print(f"    {name}: {nodes}")
+        print(f"    moves: {len(counts)} nodes: {sum(counts.values())}")
+    return passed
+
+
+def bench_final_state(positions: list[PerftPosition], board_type: type[Board], seconds: float = 1.0):
+    """Measure how many check_final_state calls per second each position sustains."""
+    for position in positions:
+        game_state = GameState.from_fen(position.fen, board_type)
+        calls = 0
+        start = time.perf_counter()
+        while (elapsed := time.perf_counter() - start) < seconds:
+            game_state.check_final_state(game_state.current_turn)
+            calls += 1
+        print(f"{position.name}: {calls / elapsed:,.1f} check_final_state calls/s")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Perft benchmark and correctness suite.")
+    parser.add_argument("-d", "--depth", type=int, default=3, help="maximum depth (capped by the reference data)")
+    parser.add_argument("-p", "--position", action="append", choices=[p.name for p in POSITIONS],
+                        help="position to run, may be repeated (default: all)")
+    parser.add_argument("--divide", action="store_true", help="print leaf counts per root move at the last depth")
+    parser.add_argument("--board", choices=BOARD_TYPES, default="list",
+                        help="board layout; bitboard also switches to the bitboard move generator")
+    parser.add_argument("--final-state", action="store_true", help="benchmark GameState.check_final_state instead")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="split the root moves over this many processes (0: one per core)")
+    parser.add_argument("--scaling", action="store_true",
+                        help="report throughput at the last depth for 1, 2, 4 ... up to --workers processes")
+    args = parser.parse_args(argv)
+    workers = args.workers or os.cpu_count() or 1
+
+    positions = [p for p in POSITIONS if not args.position or p.name in args.position]
+    if args.final_state:
+        bench_final_state(positions, BOARD_TYPES[args.board])
+        return 0
+
+    if args.scaling:
+        for position in positions:
+            run_scaling(position, args.depth, BOARD_TYPES[args.board], workers)
+        return 0
+
+    with contextlib.ExitStack() as stack:
+        executor = stack.enter_context(ProcessPoolExecutor(workers)) if workers > 1 else None
+        failed = [p.name for p in positions
+                  if not run_position(p, args.depth, BOARD_TYPES[args.board], args.divide, executor)]
+    if failed:
+        print(f"FAILED: {', '.join(failed)}")
+        return 1
+    print("all counts match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Replay PGN archives through the move generator, reporting throughput and any move it rejects.
+
+    python pgn_replay.py games.pgn
+    python pgn_replay.py archive.pgn.gz --board bitboard --limit 10000
+"""
+import argparse
+import gzip
+import sys
+import time
+from typing import TextIO
+
+from chess.GameState import GameState
+from chess.board_types import BOARD_TYPES
+from chess.pgn import read_games, replay
+
+def open_pgn(path: str) -> TextIO:
+    if path == "-":
+        return sys.stdin
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def _max_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # not on Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay and validate PGN files.")
+    parser.add_argument("files", nargs="+", help="PGN files, .gz is read compressed, - reads stdin")
+    parser.add_argument("--board", choices=BOARD_TYPES, default="list", help="board layout to replay on")
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many games per file")
+    parser.add_argument("--cache", type=int, default=1 << 10,
+                        help="positions whose legal moves are kept, bounds memory on large archives")
+    parser.add_argument("--progress", type=int, default=1000, help="print a status line every N games (0: never)")
+    args = parser.parse_args(argv)
+
+    game_state = GameState(BOARD_TYPES[args.board], cache_size=args.cache)
+    games = moves = illegal = 0
+    start = time.perf_counter()
+    for path in args.files:
+        with open_pgn(path) as stream:
+            for game in read_games(stream):
+                if args.limit is not None and game.index >= args.limit:
+                    break
+                try:
+                    moves += replay(game_state, game)
+                except ValueError as error:
+                    illegal += 1
+                    players = f"{game.headers.get('White', '?')} - {game.headers.get('Black', '?')}"
+                    print(f"{path}: game {game.index} ({players}): {error}")
+                games += 1
+                if args.progress and games % args.progress == 0:
+                    elapsed = time.perf_counter() - start
+                    print(f"  {games} games, {moves} moves, {games / elapsed:,.1f} games/s", file=sys.stderr)
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"{games} games, {moves} moves in {elapsed:.2f}s: "
+          f"{games / elapsed:,.1f} games/s, {moves / elapsed:,.0f} moves/s, {illegal} with illegal moves")
+    if (rss := _max_rss_mb()) is not None:
+        print(f"peak memory: {rss:.1f} MB")
+    return 1 if illegal else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
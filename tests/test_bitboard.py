@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from chess.GameState import GameState
+from chess.bitboard_model import BitboardBoard, square
+from chess.piece_model import COLORS
+import chess.bitboard_generator as bitboard
+from perft import POSITIONS
+
+
+@pytest.mark.parametrize("position", POSITIONS, ids=lambda position: position.name)
+def test_legal_moves_match_list_board(position):
+    """Random games from the position, the bitboard generator must find exactly the list board's moves."""
+    rng = random.Random(position.name)
+    for _ in range(4):
+        reference = GameState.from_fen(position.fen)
+        game_state = GameState.from_fen(position.fen, BitboardBoard)
+        for _ in range(60):
+            moves = sorted(reference.legal_moves())
+            assert sorted(game_state.legal_moves()) == moves, reference.to_fen()
+            if not moves:
+                break
+            move = rng.choice(moves)
+            reference.make_move(move)
+            game_state.make_move(move)
+
+
+@pytest.mark.parametrize("position", POSITIONS, ids=lambda position: position.name)
+def test_count_matches_moves(position):
+    board = GameState.from_fen(position.fen, BitboardBoard).board_model
+    color = COLORS[board.turn]
+    en_passant = square(*board.en_passant) if board.en_passant is not None else -1
+    moves = bitboard.legal_moves(board.bitboards, color, board.castling, en_passant)
+    assert bitboard.count_legal_moves(board.bitboards, color, board.castling, en_passant) == len(moves) \
+        == position.nodes[0]
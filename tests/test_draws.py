@@ -0,0 +1,59 @@
+from chess.GameState import GameState, START_FEN
+from chess.MoveTypes import MoveEffect
+from perft import move_name
+
+SHUFFLE = ["g1f3", "g8f6", "f3g1", "f6g8"]
+
+
+def square(name: str) -> tuple[int, int]:
+    return ord(name[0]) - ord("a"), 8 - int(name[1])
+
+
+def play(game_state: GameState, name: str) -> MoveEffect:
+    """Play a move the way the controller does, returning the looked ahead effect."""
+    _, effect = game_state.evaluate_move(*square(name[:2]), *square(name[2:]))
+    game_state.update_board(effect)
+    game_state.switch_turn()
+    return effect
+
+
+def find(game_state: GameState, name: str) -> int:
+    return next(move for move in game_state.legal_moves() if move_name(move) == name)
+
+
+def test_threefold_repetition_ends_game():
+    game_state = GameState.from_fen(START_FEN)
+    effects = [play(game_state, name) for name in SHUFFLE * 2]
+    assert not any(effect.repetition for effect in effects[:-1])
+    assert effects[-1].repetition
+    assert game_state.is_threefold_repetition()
+
+
+def test_repetition_window_closes_on_pawn_move():
+    game_state = GameState.from_fen(START_FEN)
+    for name in SHUFFLE + ["e2e4", "e7e5"] + SHUFFLE:
+        assert not play(game_state, name).repetition
+
+
+def test_fifty_move_rule_ends_game():
+    fen = "4k3/8/8/8/8/8/4P3/4K1N1 w - - 99 80"
+    assert play(GameState.from_fen(fen), "g1f3").fifty_moves
+    # a pawn move resets the clock on the hundredth ply
+    assert not play(GameState.from_fen(fen), "e2e4").fifty_moves
+    assert not play(GameState.from_fen(fen.replace(" 99 ", " 98 ")), "g1f3").fifty_moves
+
+
+def test_unmake_pops_history():
+    game_state = GameState.from_fen(START_FEN)
+    keys = [game_state.board_model.hash]
+    undos = []
+    for name in SHUFFLE * 2:
+        undos.append(game_state.make_move(find(game_state, name)))
+        keys.append(game_state.board_model.hash)
+    assert game_state.history.keys == keys
+    assert game_state.history.repetitions() == 3
+    for count in range(len(keys) - 1, 0, -1):
+        game_state.unmake_move(undos.pop())
+        assert game_state.history.keys == keys[:count]
+        assert game_state.history.repetitions() == keys[:count].count(keys[count - 1])
+    assert not game_state.is_threefold_repetition()
@@ -0,0 +1,35 @@
+import pytest
+
+from chess.GameState import GameState, START_FEN
+from perft import POSITIONS
+
+
+@pytest.mark.parametrize("position", POSITIONS, ids=lambda position: position.name)
+def test_round_trip(position):
+    game_state = GameState.from_fen(position.fen)
+    assert game_state.to_fen() == position.fen
+    game_state.load_fen(game_state.to_fen())
+    assert game_state.to_fen() == position.fen
+
+
+@pytest.mark.parametrize("fen", [
+    "",
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq",  # missing field
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1",  # missing rank
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1",  # side to move
+    "rnbqkbnr/pppppppp/9/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",  # rank too long
+    "rnbqkbnr/pppppppp/7/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",  # rank too short
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNX w KQkq - 0 1",  # unknown piece
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq z3 0 1",  # en passant file off the board
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e9 0 1",  # en passant rank off the board
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e3 x 1",  # move counter
+    "8/8/8/8/8/8/8/8 w - - 0 1",  # no kings
+    "4k3/8/8/8/8/8/8/4K1Kr w - - 0 1",  # two white kings
+    "8/8/8/8/8/8/8/4K3 w - - 0 1",  # no black king
+    "4k3/8/8/8/8/8/8/4RK2 w - - 0 1",  # the side not to move is in check
+])
+def test_rejects_malformed(fen):
+    game_state = GameState.from_fen(START_FEN)
+    with pytest.raises(ValueError):
+        game_state.load_fen(fen)
+    assert game_state.to_fen() == START_FEN  # nothing changed on a rejected FEN
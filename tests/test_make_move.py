@@ -0,0 +1,56 @@
+import copy
+
+import pytest
+
+from chess.GameState import GameState
+from chess.board_types import BOARD_TYPES
+from chess.move_encoding import CASTLE, EN_PASSANT, PROMOTION, move_flags
+
+POSITIONS = {
+    "castling": "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "en-passant": "8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1",
+    "promotion": "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+}
+
+
+def snapshot(game_state: GameState):
+    board = game_state.board_model
+    attackers = [[set(board.attackers(col, row)) for col in range(board.width)] for row in range(board.height)]
+    return (game_state.to_fen(), board.hash, board.castling, board.en_passant, copy.deepcopy(board.attack_counts),
+            attackers, list(getattr(board, "bitboards", ())), len(game_state.history))
+
+
+@pytest.mark.parametrize("board_type", BOARD_TYPES.values(), ids=BOARD_TYPES.keys())
+@pytest.mark.parametrize("fen, flag", [(POSITIONS["castling"], CASTLE), (POSITIONS["en-passant"], EN_PASSANT),
+                                       (POSITIONS["promotion"], PROMOTION)], ids=POSITIONS.keys())
+def test_unmake_restores_position(board_type, fen, flag):
+    game_state = GameState.from_fen(fen, board_type)
+    before = snapshot(game_state)
+    moves = list(game_state.legal_moves())
+    assert any(move_flags(move) & flag for move in moves)
+    for move in moves:
+        game_state.make_move(move)
+        assert game_state.board_model.hash != before[1]
+        game_state.unmake_move()
+        assert snapshot(game_state) == before
+
+
+@pytest.mark.parametrize("board_type", BOARD_TYPES.values(), ids=BOARD_TYPES.keys())
+def test_unmake_two_plies(board_type):
+    game_state = GameState.from_fen(POSITIONS["castling"], board_type)
+    before = snapshot(game_state)
+    for move in game_state.legal_moves():
+        game_state.make_move(move)
+        for reply in list(game_state.legal_moves()):
+            game_state.make_move(reply)
+            game_state.unmake_move()
+        game_state.unmake_move()
+    assert snapshot(game_state) == before
+
+
+def test_unmake_out_of_order():
+    game_state = GameState.from_fen(POSITIONS["castling"])
+    first = game_state.make_move(game_state.legal_moves()[0])
+    game_state.make_move(game_state.legal_moves()[0])
+    with pytest.raises(ValueError):
+        game_state.unmake_move(first)
@@ -0,0 +1,60 @@
+import pytest
+
+from chess.GameState import GameState
+from chess.MoveTypes import MoveType
+from chess.move_encoding import (
+    CAPTURE, PROMOTION, SUFFIX_SHIFT, CHECK_SUFFIX, CHECKMATE_SUFFIX, MoveList, pack_move, encode_move, decode_move,
+    from_square, to_square, move_flags, promotion_kind, moving_kind,
+)
+from chess.piece_model import PAWN, QUEEN, KNIGHT
+from perft import POSITIONS
+
+
+def test_pack_fields():
+    move = pack_move(12, 4, CAPTURE | PROMOTION, KNIGHT, PAWN)
+    assert (from_square(move), to_square(move), move_flags(move), promotion_kind(move), moving_kind(move)) \
+        == (12, 4, CAPTURE | PROMOTION, KNIGHT, PAWN)
+
+
+def test_pack_largest_board():
+    move = pack_move(255, 254, PROMOTION, QUEEN, PAWN)
+    assert (from_square(move), to_square(move), promotion_kind(move)) == (255, 254, QUEEN)
+
+
+@pytest.mark.parametrize("position", POSITIONS, ids=lambda position: position.name)
+def test_encode_decode_round_trip(position):
+    game_state = GameState.from_fen(position.fen)
+    board = game_state.board_model.board
+    for move in game_state.legal_moves():
+        assert encode_move(decode_move(move, board), game_state.board_model.width) == move
+
+
+def test_encode_keeps_notation_suffix():
+    game_state = GameState.from_fen("4k3/8/8/8/8/8/8/R3K3 w Q - 0 1")
+    move = decode_move(game_state.legal_moves().find(56, 0), game_state.board_model.board)  # a1a8
+    move["type"] |= MoveType.CHECKMATE
+    assert encode_move(move) >> SUFFIX_SHIFT == CHECKMATE_SUFFIX
+    move["type"] = MoveType.NORMAL | MoveType.CHECK
+    assert encode_move(move) >> SUFFIX_SHIFT == CHECK_SUFFIX
+
+
+def test_move_list_find():
+    moves = MoveList.of([pack_move(8, 0, PROMOTION, QUEEN, PAWN), pack_move(8, 0, PROMOTION, KNIGHT, PAWN),
+                         pack_move(60, 62)])
+    assert promotion_kind(moves.find(8, 0)) == QUEEN
+    assert moves.find(60, 62) == pack_move(60, 62)
+    assert moves.find(62, 60) is None
+    moves.append(pack_move(62, 60))
+    assert moves.find(62, 60) == pack_move(62, 60)
+
+
+def test_move_list_grows_past_capacity():
+    moves = MoveList(2)
+    for to_sq in range(5):
+        moves.append(pack_move(0, to_sq))
+    assert list(moves) == [pack_move(0, to_sq) for to_sq in range(5)]
+    assert moves[-1] == pack_move(0, 4)
+    with pytest.raises(IndexError):
+        moves[5]
+    moves.clear()
+    assert len(moves) == 0 and moves.find(0, 1) is None
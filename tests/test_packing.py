@@ -0,0 +1,54 @@
+import pytest
+
+from chess.GameState import GameState
+from chess.board_model import Board
+from chess.packing import PACKED_SIZE, pack_board, unpack_board
+from chess.position_db import PositionDB, WHITE_WINS, DRAW
+from perft import POSITIONS
+
+
+@pytest.mark.parametrize("position", POSITIONS, ids=lambda position: position.name)
+def test_pack_round_trip(position):
+    board = GameState.from_fen(position.fen).board_model
+    packed = pack_board(board)
+    assert len(packed) == PACKED_SIZE
+    unpacked = unpack_board(packed)
+    assert unpacked.board == board.board
+    assert (unpacked.turn, unpacked.castling, unpacked.en_passant, unpacked.hash) \
+        == (board.turn, board.castling, board.en_passant, board.hash)
+    assert pack_board(unpacked) == packed
+
+
+def test_pack_rejects_other_sizes():
+    with pytest.raises(ValueError):
+        pack_board(Board(10))
+    with pytest.raises(ValueError):
+        unpack_board(bytes(PACKED_SIZE - 1))
+
+
+def test_position_db_append_lookup_reopen(tmp_path):
+    path = str(tmp_path / "positions.db")
+    boards = [GameState.from_fen(position.fen).board_model for position in POSITIONS]
+    with PositionDB(path, capacity=len(boards)) as db:
+        for index, board in enumerate(boards):
+            db.put(board, legal_moves=index, result=WHITE_WINS, evaluation=-index)
+        db.put(boards[0], legal_moves=20, result=DRAW)
+        assert len(db) == len(boards)
+    
+    with PositionDB(path) as db:
+        assert len(db) == len(boards)
+        assert all(board in db for board in boards)
+        record = db.get(boards[0])
+        assert (record.legal_moves, record.result, record.evaluation) == (20, DRAW, 0)
+        assert db.get(boards[1]).packed == pack_board(boards[1])
+        assert db.get(boards[1]).evaluation == -1
+        assert Board() not in db
+
+
+def test_position_db_rejects_other_files(tmp_path):
+    path = tmp_path / "other.db"
+    path.write_bytes(bytes(256))
+    with pytest.raises(ValueError):
+        PositionDB(str(path))
+    with pytest.raises(FileNotFoundError):
+        PositionDB(str(tmp_path / "missing.db"))
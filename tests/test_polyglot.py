@@ -0,0 +1,60 @@
+import pytest
+
+from chess.GameState import GameState, START_FEN
+from chess.move_encoding import CASTLE, move_flags
+from chess.opening_book import ENTRY, OpeningBook, polyglot_key
+from perft import move_name
+
+# the reference positions and keys of the Polyglot book format specification
+REFERENCE_KEYS = [
+    (START_FEN, 0x463B96181691FC9C),
+    ("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1", 0x823C9B50FD114196),
+    ("rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 2", 0x0756B94461C50FB0),
+    ("rnbqkbnr/ppp1pppp/8/3pP3/8/8/PPPP1PPP/RNBQKBNR b KQkq - 0 2", 0x662FAFB965DB29D4),
+    ("rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3", 0x22A48B5A8E47FF78),
+    ("rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPPKPPP/RNBQ1BNR b kq - 0 3", 0x652A607CA3F242C1),
+    ("rnbq1bnr/ppp1pkpp/8/3pPp2/8/8/PPPPKPPP/RNBQ1BNR w - - 0 4", 0x00FDD303C946BDD9),
+    ("rnbqkbnr/p1pppppp/8/8/PpP4P/8/1P1PPPP1/RNBQKBNR b KQkq c3 0 3", 0x3C8123EA7B067637),
+    ("rnbqkbnr/p1pppppp/8/8/P6P/R1p5/1P1PPPP1/1NBQKBNR b Kkq - 0 4", 0x5C3F9B829B279560),
+]
+
+
+@pytest.mark.parametrize("fen, key", REFERENCE_KEYS, ids=[f"{key:016x}" for _, key in REFERENCE_KEYS])
+def test_reference_keys(fen, key):
+    assert polyglot_key(GameState.from_fen(fen).board_model) == key
+
+
+def test_keys_along_played_moves():
+    game_state = GameState.from_fen(START_FEN)
+    for name, (_, key) in zip(["e2e4", "d7d5", "e4e5", "f7f5", "e1e2", "e8f7"], REFERENCE_KEYS[1:]):
+        move = next(move for move in game_state.legal_moves() if move_name(move) == name)
+        game_state.make_move(move)
+        assert polyglot_key(game_state.board_model) == key
+
+
+def book_file(path, entries):
+    path.write_bytes(b"".join(ENTRY.pack(*entry) for entry in sorted(entries)))
+    return str(path)
+
+
+def test_book_lookup(tmp_path):
+    e2e4 = 4 | 3 << 3 | 4 << 6 | 1 << 9  # to file, to rank, from file, from rank
+    d2d4 = 3 | 3 << 3 | 3 << 6 | 1 << 9
+    path = book_file(tmp_path / "book.bin", [(REFERENCE_KEYS[0][1], e2e4, 10, 0), (REFERENCE_KEYS[0][1], d2d4, 5, 0),
+                                             (REFERENCE_KEYS[1][1], 0, 1, 0)])
+    with OpeningBook(path) as book:
+        game_state = GameState.from_fen(START_FEN)
+        assert len(book) == 3
+        assert sorted((move_name(move), weight) for move, weight in book.book_moves(game_state)) \
+            == [("d2d4", 5), ("e2e4", 10)]
+        assert move_name(book.choose_move(game_state)) in ("d2d4", "e2e4")
+        assert book.choose_move(GameState.from_fen(REFERENCE_KEYS[3][0])) is None
+
+
+def test_book_castling_is_king_takes_rook(tmp_path):
+    fen = "r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1"
+    e1h1 = 7 | 0 << 3 | 4 << 6 | 0 << 9
+    path = book_file(tmp_path / "book.bin", [(polyglot_key(GameState.from_fen(fen).board_model), e1h1, 1, 0)])
+    with OpeningBook(path) as book:
+        (move, _), = book.book_moves(GameState.from_fen(fen))
+        assert move_name(move) == "e1g1" and move_flags(move) & CASTLE
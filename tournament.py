@@ -0,0 +1,275 @@
+"""
+Headless self-play tournaments between engine settings and simple movers, over a process pool.
+
+    python tournament.py engine:0.2 random -n 20
+    python tournament.py engine:d2 engine:d3 greedy -n 50 -w 4 -o runs/depth
+
+Players are "random", "greedy" (takes the most valuable piece it can), "engine:<seconds>" for a
+time per move or "engine:d<depth>" for a fixed depth. Every pair plays -n games, each opening
+once with either color. Results go to <output>.jsonl and <output>.pgn as the games finish;
+running the same command again resumes where it stopped.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, NamedTuple
+
+from chess.GameState import GameState, START_FEN
+from chess.MoveTypes import MoveType
+from chess.engine import Engine, PIECE_VALUES
+from chess.pgn import move_to_san, format_game
+from chess.move_encoding import EN_PASSANT, PROMOTION, KIND_PIECES, to_square, move_flags, promotion_kind
+from chess.piece_model import Pawn, QUEEN
+
+MoveChooser = Callable[[GameState, random.Random], int]
+
+
+class GameTask(NamedTuple):
+    index: int
+    white: str
+    black: str
+    seed: int  # random opening and random movers
+    opening_plies: int
+    max_plies: int
+
+
+def piece_moves(game_state: GameState) -> list[int]:
+    """Packed legal moves of the side to move, promoting to a queen only."""
+    return [move for move in game_state.legal_moves() if not move_flags(move) & PROMOTION or promotion_kind(move) == QUEEN]
+
+
+def random_move(game_state: GameState, rng: random.Random) -> int:
+    return rng.choice(piece_moves(game_state))
+
+
+def greedy_move(game_state: GameState, rng: random.Random) -> int:
+    """The move winning the most material right away, ties broken at random."""
+    board = game_state.board_model.board
+    width = game_state.board_model.width
+    def gain(move: int) -> int:
+        value = 0
+        to_row, to_col = divmod(to_square(move), width)
+        if move_flags(move) & EN_PASSANT:
+            value += PIECE_VALUES[Pawn]
+        elif (captured := board[to_row][to_col]) is not None:
+            value += PIECE_VALUES[type(captured)]
+        if move_flags(move) & PROMOTION:
+            value += PIECE_VALUES[KIND_PIECES[promotion_kind(move)]] - PIECE_VALUES[Pawn]
+        return value
+    moves = piece_moves(game_state)
+    best = max(gain(move) for move in moves)
+    return rng.choice([move for move in moves if gain(move) == best])
+
+
+def make_player(spec: str) -> MoveChooser:
+    """The move chooser of a player spec, raising ValueError on unknown specs."""
+    if spec == "random":
+        return random_move
+    if spec == "greedy":
+        return greedy_move
+    kind, _, setting = spec.partition(":")
+    if kind == "engine":
+        try:
+            if setting.startswith("d"):
+                depth, time_limit = int(setting[1:]), None
+            else:
+                depth, time_limit = 64, float(setting or 1.0)
+        except ValueError:
+            raise ValueError(f"Invalid engine setting {setting!r}, expected seconds or d<depth>.") from None
+        engine = Engine()
+        return lambda game_state, rng: engine.search(game_state, time_limit, depth).move #type: ignore
+    raise ValueError(f"Unknown player {spec!r}.")
+
+
+def _final_result(game_state: GameState) -> tuple[str, str] | None:
+    """Result and reason when the game is over, None while it goes on."""
+    state = game_state.check_final_state(game_state.current_turn)
+    if MoveType.CHECKMATE & state:
+        return ("0-1" if game_state.current_turn == "white" else "1-0"), "checkmate"
+    if MoveType.STALEMATE & state:
+        return "1/2-1/2", "stalemate"
+    if MoveType.REPETITION & state:
+        return "1/2-1/2", "repetition"
+    if MoveType.FIFTY_MOVES & state:
+        return "1/2-1/2", "fifty-move rule"
+    if (known := game_state.probe_tablebase()) is not None:
+        if known.wdl == 0:
+            return "1/2-1/2", "tablebase"
+        white_wins = (known.wdl > 0) == (game_state.current_turn == "white")
+        return ("1-0" if white_wins else "0-1"), "tablebase"
+    return None
+
+
+def play_game(task: GameTask) -> dict:
+    """Play one game and return its record, as written to the results file."""
+    rng = random.Random(task.seed)
+    game_state = GameState.from_fen(START_FEN)
+    players = {"white": make_player(task.white), "black": make_player(task.black)}
+    moves: list[str] = []
+    result, reason = "1/2-1/2", "move limit"
+    start = time.perf_counter()
+    while len(moves) < task.max_plies:
+        if (over := _final_result(game_state)) is not None:
+            result, reason = over
+            break
+        if len(moves) < task.opening_plies:
+            move = random_move(game_state, rng)
+        else:
+            move = players[game_state.current_turn](game_state, rng)
+        moves.append(move_to_san(game_state, move))
+        game_state.make_move(move)
+    else:
+        # the last allowed ply can still end the game
+        if (over := _final_result(game_state)) is not None:
+            result, reason = over
+    return {"game": task.index, "white": task.white, "black": task.black, "result": result, "reason": reason,
+            "plies": len(moves), "seconds": round(time.perf_counter() - start, 3), "seed": task.seed, "moves": moves}
+
+
+def schedule(players: list[str], games: int, seed: int, opening_plies: int, max_plies: int) -> list[GameTask]:
+    """Every pair plays games games, consecutive games share an opening with the colors swapped."""
+    tasks = []
+    for pair, (first, second) in enumerate(itertools.combinations(players, 2)):
+        for game in range(games):
+            white, black = (first, second) if game % 2 == 0 else (second, first)
+            opening_seed = seed * 1_000_003 + pair * games + game // 2
+            tasks.append(GameTask(len(tasks), white, black, opening_seed, opening_plies, max_plies))
+    return tasks
+
+
+def load_results(path: str) -> list[dict]:
+    """Records of a previous run, dropping a last line cut short by an interruption."""
+    if not os.path.exists(path):
+        return []
+    records, valid_bytes = [], 0
+    with open(path, "rb") as file:
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            valid_bytes += len(line)
+    with open(path, "r+b") as file:
+        file.truncate(valid_bytes)
+    return records
+
+
+def pgn_text(record: dict) -> str:
+    headers = {"Event": "Self-play tournament", "Site": "?", "Date": "????.??.??", "Round": str(record["game"] + 1),
+               "White": record["white"], "Black": record["black"], "Result": record["result"],
+               "Termination": record["reason"]}
+    return format_game(headers, record["moves"], record["result"])
+
+
+def elo_difference(wins: int, draws: int, losses: int) -> tuple[float, float]:
+    """Elo difference of a result and the half width of its 95% confidence interval."""
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+
+    def elo(points: float) -> float:
+        if points <= 0:
+            return -math.inf
+        if points >= 1:
+            return math.inf
+        return 400 * math.log10(points / (1 - points))
+    return elo(score), (elo(min(score + margin, 1)) - elo(max(score - margin, 0))) / 2
+
+
+def report(players: list[str], records: list[dict], elapsed: float, played: int):
+    """Print the result of every pairing with its Elo difference, then the throughput."""
+    print()
+    for first, second in itertools.combinations(players, 2):
+        wins = draws = losses = 0
+        for record in records:
+            if {record["white"], record["black"]} != {first, second}:
+                continue
+            if record["result"] == "1/2-1/2":
+                draws += 1
+            elif (record["result"] == "1-0") == (record["white"] == first):
+                wins += 1
+            else:
+                losses += 1
+        games = wins + draws + losses
+        if not games:
+            continue
+        difference, margin = elo_difference(wins, draws, losses)
+        error = f" +/- {margin:.0f}" if math.isfinite(margin) else ""
+        print(f"{first} vs {second}: +{wins} ={draws} -{losses} ({(wins + draws / 2) / games:.1%}), "
+              f"Elo {difference:+.0f}{error}")
+
+    plies = sum(record["plies"] for record in records)
+    busy = sum(record["seconds"] for record in records)
+    print(f"{len(records)} games, {plies} plies, {plies / max(busy, 1e-9):,.1f} plies/s per worker")
+    if played:
+        print(f"this run: {played} games in {elapsed:.1f}s, {played / max(elapsed, 1e-9) * 3600:,.0f} games/hour")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Play a round robin between engine settings and simple movers.")
+    parser.add_argument("players", nargs="+", help="random, greedy, engine:<seconds> or engine:d<depth>")
+    parser.add_argument("-n", "--games", type=int, default=10, help="games per pair of players")
+    parser.add_argument("-w", "--workers", type=int, default=0, help="processes playing games (0: one per core)")
+    parser.add_argument("-o", "--output", default="tournament", help="path prefix of the .jsonl and .pgn files")
+    parser.add_argument("--opening-plies", type=int, default=4, help="random plies played before the players take over")
+    parser.add_argument("--max-plies", type=int, default=400, help="plies after which a game is scored a draw")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the openings and random movers")
+    args = parser.parse_args(argv)
+    if len(args.players) < 2:
+        parser.error("at least two players are needed")
+    for spec in args.players:
+        try:
+            make_player(spec)
+        except ValueError as error:
+            parser.error(str(error))
+    workers = args.workers or os.cpu_count() or 1
+
+    tasks = schedule(args.players, args.games, args.seed, args.opening_plies, args.max_plies)
+    results_path, pgn_path = f"{args.output}.jsonl", f"{args.output}.pgn"
+    records = load_results(results_path)
+    for record in records:
+        task = tasks[record["game"]] if record["game"] < len(tasks) else None
+        if task is None or (record["white"], record["black"], record["seed"]) != (task.white, task.black, task.seed):
+            parser.error(f"{results_path} holds games of another tournament, pick another --output")
+    done = {record["game"] for record in records}
+    pending = [task for task in tasks if task.index not in done]
+    if records:
+        print(f"resuming: {len(records)} of {len(tasks)} games already played")
+
+    # the PGN is rebuilt from the results, so a game cut off while being written is never left half done
+    with open(pgn_path, "w", encoding="utf-8") as pgn:
+        pgn.writelines(pgn_text(record) for record in records)
+
+    start = time.perf_counter()
+    played = 0
+    with open(results_path, "a", encoding="utf-8") as results, open(pgn_path, "a", encoding="utf-8") as pgn, \
+            ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(play_game, task) for task in pending]
+        try:
+            for future in as_completed(futures):
+                record = future.result()
+                results.write(json.dumps(record) + "\n")
+                results.flush()
+                pgn.write(pgn_text(record))
+                pgn.flush()
+                records.append(record)
+                played += 1
+                print(f"[{len(records)}/{len(tasks)}] game {record['game'] + 1}: {record['white']} - {record['black']} "
+                      f"{record['result']} ({record['reason']}, {record['plies']} plies, {record['seconds']:.1f}s)")
+        except (KeyboardInterrupt, BrokenProcessPool):  # ctrl-c reaches the workers too
+            executor.shutdown(wait=False, cancel_futures=True)
+            print(f"\ninterrupted after {len(records)} of {len(tasks)} games, run the same command again to resume")
+    report(args.players, records, time.perf_counter() - start, played)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+UCI front end for the engine, without Qt, for GUIs, tournament managers and benchmark scripts.
+
+    python uci.py
+    python uci.py --book data/book.bin --hash 1048576
+
+Besides the standard commands it answers "perft <depth>" (and "go perft <depth>") with a divide
+of the current position, and "d" with its FEN.
+"""
+import argparse
+import asyncio
+import contextlib
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TextIO
+
+from chess.GameState import GameState, START_FEN
+from chess.engine import Engine, SearchResult, MATE
+from chess.opening_book import OpeningBook
+from perft import move_name, legal_moves, divide
+
+NAME = "ultimate-chess"
+AUTHOR = "ultimate-chess contributors"
+MOVE_OVERHEAD = 0.05  # seconds kept back from every move for the GUI round trip
+
+
+def score_text(score: int) -> str:
+    """UCI score of a search result: centipawns, or moves to mate."""
+    if abs(score) >= MATE - 1000:
+        moves = (MATE - abs(score) + 1) // 2
+        return f"mate {moves if score > 0 else -moves}"
+    return f"cp {score}"
+
+
+def time_budget(options: dict[str, int], color: str) -> float | None:
+    """Seconds to spend on the move from the go options, None to search without a clock."""
+    if "movetime" in options:
+        return max(options["movetime"] / 1000 - MOVE_OVERHEAD, 0.01)
+    remaining = options.get("wtime" if color == "white" else "btime")
+    if remaining is None:
+        return None
+    increment = options.get("winc" if color == "white" else "binc", 0)
+    moves_to_go = options.get("movestogo", 30)
+    budget = remaining / moves_to_go + increment * 0.8
+    return max(min(budget, remaining / 2) / 1000 - MOVE_OVERHEAD, 0.01)
+
+
+class UciEngine:
+    """Reads commands on the asyncio loop while searches run on a worker thread."""
+    def __init__(self, output: TextIO, book: OpeningBook | None = None, tt_size: int = 1 << 16):
+        self.output = output
+        self.book = book
+        self.tt_size = tt_size
+        self.engine = Engine(tt_size, book)
+        self.game_state = GameState.from_fen(START_FEN)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.search: asyncio.Future | None = None
+        self._stopped = threading.Event()  # set by stop or quit, an infinite search holds its bestmove until then
+        self._write_lock = threading.Lock()
+        self._tables_loaded = False
+
+    def send(self, line: str):
+        with self._write_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def _load_tables(self):
+        # numpy is only imported once a GUI asks whether the engine is ready, keeping startup instant
+        if not self._tables_loaded:
+            from chess.tablebase import default_tablebases
+            self.engine.tablebases = default_tablebases()
+            self._tables_loaded = True
+
+    async def run(self, lines: asyncio.Queue):
+        while (line := await lines.get()) is not None:
+            try:
+                if not await self.handle(line.strip()):
+                    return
+            except (ValueError, IndexError):
+                self.send(f"info string malformed command {line.strip()}")
+        await self._finish_search()
+
+    async def handle(self, line: str) -> bool:
+        """Run one command, False when the engine should exit."""
+        command, _, rest = line.partition(" ")
+        args = rest.split()
+        if command == "uci":
+            self.send(f"id name {NAME}")
+            self.send(f"id author {AUTHOR}")
+            self.send("uciok")
+        elif command == "isready":
+            self._load_tables()
+            self.send("readyok")
+        elif command == "ucinewgame":
+            await self._finish_search()
+            self.engine = Engine(self.tt_size, self.book, self.engine.tablebases)
+        elif command == "position":
+            await self._finish_search()
+            self.set_position(args)
+        elif command == "go":
+            if args[:1] == ["perft"]:
+                self.perft(int(args[1]))
+            else:
+                await self._finish_search()  # bestmove goes out just before the previous search returns
+                self.go(args)
+        elif command == "perft":
+            self.perft(int(args[0]))
+        elif command == "stop":
+            await self._finish_search()
+        elif command == "d":
+            self.send(self.game_state.to_fen())
+        elif command == "quit":
+            await self._finish_search()
+            return False
+        elif command:
+            self.send(f"info string unknown command {command}")
+        return True
+
+    def set_position(self, args: list[str]):
+        if not args:
+            return
+        if args[0] == "startpos":
+            fen, rest = START_FEN, args[1:]
+        elif args[0] == "fen":
+            end = args.index("moves") if "moves" in args else len(args)
+            fen, rest = " ".join(args[1:end]), args[end:]
+        else:
+            self.send(f"info string invalid position {' '.join(args)}")
+            return
+        try:
+            game_state = GameState.from_fen(fen)
+        except ValueError as error:
+            self.send(f"info string {error}")
+            return
+        for name in rest[1:] if rest[:1] == ["moves"] else []:
+            move = self.find_move(game_state, name)
+            if move is None:
+                self.send(f"info string illegal move {name}")
+                break
+            game_state.make_move(move)
+        self.game_state = game_state
+
+    @staticmethod
+    def find_move(game_state: GameState, name: str) -> int | None:
+        board = game_state.board_model
+        for move in legal_moves(game_state):
+            if move_name(move, board.width, board.height) == name:
+                return move
+        return None
+
+    def go(self, args: list[str]):
+        self._load_tables()
+        options: dict[str, int] = {}
+        for key, value in zip(args, args[1:]):
+            if key in ("wtime", "btime", "winc", "binc", "movestogo", "movetime", "depth") and value.lstrip("-").isdigit():
+                options[key] = int(value)
+        infinite = "infinite" in args
+        time_limit = None if infinite else time_budget(options, self.game_state.current_turn)
+        max_depth = options.get("depth", 64)
+        self._stopped.clear()
+        self.engine.stop_event.clear()
+        loop = asyncio.get_running_loop()
+        self.search = loop.run_in_executor(self.executor, self._search, self.game_state.copy(), time_limit, max_depth,
+                                           infinite)
+
+    def _search(self, game_state: GameState, time_limit: float | None, max_depth: int, infinite: bool = False):
+        result = self.engine.search(game_state, time_limit, max_depth, on_iteration=self._report)
+        if infinite:
+            # book and tablebase moves, mates and the depth limit end the search early, go infinite still waits for stop
+            self._stopped.wait()
+        self.send(f"bestmove {self._move_name(result.move)}" if result.move is not None else "bestmove 0000")
+
+    def _move_name(self, move: int) -> str:
+        board = self.game_state.board_model
+        return move_name(move, board.width, board.height)
+
+    def _report(self, result: SearchResult):
+        if result.move is None:
+            return
+        self.send(f"info depth {result.depth} score {score_text(result.score)} nodes {result.nodes} "
+                  f"nps {result.nps} time {int(result.elapsed * 1000)} pv {self._move_name(result.move)}")
+
+    async def _finish_search(self):
+        """Stop a running search and wait for its bestmove to go out."""
+        if self.search is not None:
+            self._stopped.set()
+            self.engine.stop()
+            await self.search
+            self.search = None
+
+    def perft(self, depth: int):
+        start = time.perf_counter()
+        counts = divide(self.game_state.copy(), depth)
+        for name, count in counts.items():
+            self.send(f"{name}: {count}")
+        elapsed = time.perf_counter() - start
+        total = sum(counts.values())
+        self.send("")
+        self.send(f"Nodes searched: {total}")
+        self.send(f"info string {elapsed:.3f}s {total / elapsed if elapsed else 0:,.0f} nodes/s")
+
+
+def _read_lines(loop: asyncio.AbstractEventLoop, lines: asyncio.Queue, stream: TextIO):
+    # a daemon thread, so a blocked read never keeps the process alive after quit
+    for line in stream:
+        loop.call_soon_threadsafe(lines.put_nowait, line)
+    loop.call_soon_threadsafe(lines.put_nowait, None)
+
+
+async def serve(uci: UciEngine, stream: TextIO):
+    lines: asyncio.Queue = asyncio.Queue()
+    threading.Thread(target=_read_lines, args=(asyncio.get_running_loop(), lines, stream), daemon=True).start()
+    await uci.run(lines)
+    uci.executor.shutdown()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the engine as a UCI engine on stdin and stdout.")
+    parser.add_argument("--book", default=None, help="Polyglot opening book to play from")
+    parser.add_argument("--hash", type=int, default=1 << 16, help="transposition table entries")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout
+    uci = UciEngine(output, OpeningBook(args.book) if args.book else None, args.hash)
+    # anything else printing must not end up in the protocol stream
+    with contextlib.redirect_stdout(sys.stderr):
+        asyncio.run(serve(uci, sys.stdin))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())